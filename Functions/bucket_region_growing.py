@@ -0,0 +1,206 @@
+from collections import deque
+import numpy as np
+from Functions import seeded_region_growing as srg
+from Functions import heap_region_growing as hrg
+from Functions import unseeded_region_growing as urg
+from Functions import connectivity as con
+from Functions import dice_score as ds
+from Functions import mean_index as mi
+
+
+def distance_scale(img, levels):
+    """
+    calculates the factor that turns an intensity difference into a bucket number, the relative distance
+    |pixel - mean| / max_intensity from 0 to 1 is divided into levels buckets of equal width
+    :param img: intensity values (2D/3D array)
+    :param levels: number of buckets (int)
+    :return: bucket number per intensity difference (float)
+    """
+    max_intensity = float(np.amax(img))
+    if max_intensity == 0:
+        return 0.0
+    return levels / max_intensity
+
+
+def pop_bucket(buckets, current):
+    """
+    takes the oldest pixel out of the first non-empty bucket
+    :param buckets: one queue of (flat index, region number) per distance level (list of deques)
+    :param current: number of the first bucket that can be non-empty (int)
+    :return: flat index and region number of the pixel (ints), number of its bucket (int),
+    None, None, number of buckets if all buckets are empty
+    """
+    while current < len(buckets) and not buckets[current]:
+        current += 1
+    if current == len(buckets):
+        return None, None, current
+    position, region = buckets[current].popleft()
+    return position, region, current
+
+
+def bucket_region_growing(img, reg, levels=256, connectivity=4):
+    """
+    performs region growing algorithm on image or volume with defined seeds (reg) with a bucket queue,
+    the distance of a pixel is quantized to one of levels buckets when it is added to the frontier and is not
+    updated when the region mean changes afterwards, so adding and taking a pixel costs O(1) instead of
+    log(number of frontier pixels), the result is close to the exact engines (see bucket_dice_difference)
+    :param img: intensity values (2D/3D array, with an additional last axis for several channels), images with
+    several channels are grown by the exact engine (see heap_region_growing.region_growing)
+    :param reg: region numbers (2D/3D array)
+    :param levels: number of distance levels, more levels are closer to the exact result (int)
+    :param connectivity: 4, 8 (2D), 6, 26 (3D) or a footprint (int or array), see connectivity.neighbor_offsets
+    :return: labeled image with region numbers (2D/3D array)
+    """
+    if srg.is_multi_channel(img, reg):
+        return hrg.region_growing(img, reg, connectivity)
+    table = hrg.neighbor_table(reg.shape, connectivity)
+    strides = con.flat_neighbor_offsets(reg.shape, np.eye(reg.ndim, dtype=int))
+    label_array, is_copy = hrg.flat_labels(reg)
+    labels = memoryview(label_array)
+    intensities = memoryview(np.ascontiguousarray(img).reshape(-1))
+    scale = distance_scale(img, levels)
+    region_sums, region_counts = srg.region_statistics(img, reg)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        means = (region_sums / region_counts).tolist()
+    sums = region_sums.tolist()
+    counts = region_counts.tolist()
+
+    buckets = [deque() for _ in range(levels)]
+    seed_frontier = srg.find_seed_neighbors(reg, connectivity)
+    for neighbor, region in zip(seed_frontier['position'].tolist(), seed_frontier['region'].tolist()):
+        buckets[min(int(abs(intensities[neighbor] - means[region]) * scale), levels - 1)].append((neighbor, region))
+
+    position, region, current = pop_bucket(buckets, 0)
+    while position is not None:
+        if labels[position] == 0:
+            labels[position] = region
+            sums[region] += intensities[position]
+            counts[region] += 1
+            means[region] = sums[region] / counts[region]
+
+            coordinates = []
+            rest = position
+            for stride in strides:
+                coordinate, rest = divmod(rest, stride)
+                coordinates.append(coordinate)
+            for _, flat_offset, border_tests in table:
+                for axis, axis_offset, size in border_tests:
+                    if not 0 <= coordinates[axis] + axis_offset < size:
+                        break
+                else:
+                    neighbor = position + flat_offset
+                    if labels[neighbor] == 0:
+                        level = min(int(abs(intensities[neighbor] - means[region]) * scale), levels - 1)
+                        buckets[level].append((neighbor, region))
+                        current = min(current, level)
+        position, region, current = pop_bucket(buckets, current)
+
+    if is_copy:
+        reg[...] = label_array.reshape(reg.shape)
+    return reg
+
+
+def bucket_unseeded_region_growing(img, start_pixel, t, levels=256, connectivity=4):
+    """
+    performs the unseeded region growing algorithm with a bucket queue (see bucket_region_growing),
+    when a pixel is taken out of the queue, it is compared with the current mean of its region like in
+    unseeded_region_growing, so the threshold t keeps its meaning
+    :param img: array with intensity values (2D/3D array, with an additional last axis for several channels),
+    images with several channels are grown by the exact algorithm (see
+    unseeded_region_growing.unseeded_region_growing_algorithm)
+    :param start_pixel: pixel which defines the starting seed (tuple)
+    :param t: threshold to decide whether a pixel is similar enough to a region (float)
+    :param levels: number of distance levels, more levels are closer to the exact result (int)
+    :param connectivity: 4, 8 (2D), 6, 26 (3D) or a footprint (int or array), see connectivity.neighbor_offsets
+    :return: array with region numbers in the smallest unsigned integer type for them (2D/3D array)
+    """
+    # the region numbers start in the smallest type and get a larger one when they do not fit anymore
+    reg = np.zeros(img.shape[:len(start_pixel)], np.uint8)
+    if srg.is_multi_channel(img, reg):
+        return urg.unseeded_region_growing_algorithm(img, start_pixel, t, connectivity)
+    table = hrg.neighbor_table(reg.shape, connectivity)
+    strides = con.flat_neighbor_offsets(reg.shape, np.eye(reg.ndim, dtype=int))
+    labels = memoryview(reg.reshape(-1))
+    intensities = memoryview(np.ascontiguousarray(img).reshape(-1))
+    scale = distance_scale(img, levels)
+    # region statistics, the region number is the index
+    sums = [0]
+    counts = [0]
+    means = [np.nan]
+    # region numbers ordered by their means for the search of the most similar region
+    mean_index = []
+
+    buckets = [deque() for _ in range(levels)]
+    # the start pixel has no region yet, so it becomes region 1
+    position, region, current = int(np.ravel_multi_index(start_pixel, img.shape)), 0, 0
+    while position is not None:
+        if labels[position] == 0:
+            intensity = intensities[position]
+            if region == 0 or not int(abs(intensity - means[region])) < t:  # cut to whole numbers like urg
+                similarity, region = mi.nearest_mean(mean_index, intensity)
+                if not similarity < t:
+                    region = len(means)
+                    if region > np.iinfo(reg.dtype).max:
+                        reg = reg.astype(srg.label_dtype(region))
+                        labels = memoryview(reg.reshape(-1))
+                    sums.append(0)
+                    counts.append(0)
+                    means.append(intensity)
+                    mi.insert_mean(mean_index, intensity, region)
+            labels[position] = region
+            sums[region] += intensity
+            counts[region] += 1
+            mean = sums[region] / counts[region]
+            mi.update_mean(mean_index, means[region], mean, region)
+            means[region] = mean
+
+            coordinates = []
+            rest = position
+            for stride in strides:
+                coordinate, rest = divmod(rest, stride)
+                coordinates.append(coordinate)
+            for _, flat_offset, border_tests in table:
+                for axis, axis_offset, size in border_tests:
+                    if not 0 <= coordinates[axis] + axis_offset < size:
+                        break
+                else:
+                    neighbor = position + flat_offset
+                    if labels[neighbor] == 0:
+                        level = min(int(abs(intensities[neighbor] - means[region]) * scale), levels - 1)
+                        buckets[level].append((neighbor, region))
+                        current = min(current, level)
+        position, region, current = pop_bucket(buckets, current)
+    return srg.compact_labels(reg)
+
+
+def bucket_dice_difference(img, reg, gt, levels=256, connectivity=4):
+    """
+    compares the seeded bucket queue growth with the exact heap engine
+    :param img: intensity values (2D array)
+    :param reg: region numbers of the seeds (2D array)
+    :param gt: ground truth (2D array)
+    :param levels: number of distance levels (int)
+    :param connectivity: 4 or 8 or a footprint (int or array), see connectivity.neighbor_offsets
+    :return: dice score of the exact engine, dice score of the bucket queue and their difference (bucket - exact)
+    (floats)
+    """
+    dice_exact = ds.dice_score(hrg.region_growing(img, reg.copy(), connectivity), gt)
+    dice_bucket = ds.dice_score(bucket_region_growing(img, reg.copy(), levels, connectivity), gt)
+    return dice_exact, dice_bucket, dice_bucket - dice_exact
+
+
+def bucket_unseeded_dice_difference(img, start_pixel, t, gt, levels=256, connectivity=4):
+    """
+    compares the unseeded bucket queue growth with the exact unseeded region growing
+    :param img: intensity values (2D array)
+    :param start_pixel: pixel which defines the starting seed (tuple)
+    :param t: threshold to decide whether a pixel is similar enough to a region (float)
+    :param gt: ground truth (2D array)
+    :param levels: number of distance levels (int)
+    :param connectivity: 4 or 8 or a footprint (int or array), see connectivity.neighbor_offsets
+    :return: dice score of the exact algorithm, dice score of the bucket queue and their difference (bucket - exact)
+    (floats)
+    """
+    dice_exact = ds.dice_score(urg.unseeded_region_growing_algorithm(img, start_pixel, t, connectivity), gt)
+    dice_bucket = ds.dice_score(bucket_unseeded_region_growing(img, start_pixel, t, levels, connectivity), gt)
+    return dice_exact, dice_bucket, dice_bucket - dice_exact
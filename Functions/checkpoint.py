@@ -0,0 +1,162 @@
+import hashlib
+import os
+import numpy as np
+
+# number of pixels that are read at once when the fingerprint of a run is calculated
+FINGERPRINT_BLOCK_SIZE = 2 ** 22
+
+
+def run_fingerprint(algorithm, img, reg, **parameters):
+    """
+    identifies a run, so a checkpoint is only resumed by the run that wrote it and not by another run with an array of
+    the same shape, the arrays are read in blocks along the first axis, so memory mapped volumes are never loaded
+    completely
+    :param algorithm: name of the algorithm that writes the checkpoint (str)
+    :param img: intensity values (2D/3D array, with an additional last axis for several channels)
+    :param reg: region numbers the run started from, None if the run labels them in place, they are checked with
+    the seed labels of the checkpoint instead (2D/3D array, see seed_labels)
+    :param parameters: parameters that change the result, e.g. connectivity, norm and threshold (numbers or arrays)
+    :return: fingerprint (str)
+    """
+    fingerprint = hashlib.sha256(algorithm.encode())
+    for name in sorted(parameters):
+        fingerprint.update("{}={!r};".format(name, np.asarray(parameters[name]).tolist()).encode())
+    for array in (img, reg):
+        if array is None:
+            continue
+        fingerprint.update("{}{};".format(array.shape, array.dtype).encode())
+        for block in array_blocks(array):
+            fingerprint.update(np.ascontiguousarray(block).tobytes())
+    return fingerprint.hexdigest()
+
+
+def array_blocks(array):
+    """
+    reads an array in blocks of about FINGERPRINT_BLOCK_SIZE pixels along the first axis
+    :param array: (nd array)
+    :return: blocks of the array (generator of nd arrays)
+    """
+    block_length = max(1, FINGERPRINT_BLOCK_SIZE // max(1, int(np.prod(array.shape[1:]))))
+    for start in range(0, array.shape[0], block_length):
+        yield np.asarray(array[start:start + block_length])
+
+
+def seed_labels(reg):
+    """
+    stores the labeled pixels a growth starts from, before it labels reg in place, so a resumed run can be checked
+    against them when reg already holds the labels written before the interruption
+    :param reg: region numbers the run starts from (2D/3D array)
+    :return: flat indices of the labeled pixels (1D int64 array), their region numbers (1D int64 array)
+    """
+    positions, labels = [np.zeros(0, np.int64)], [np.zeros(0, np.int64)]
+    start = 0
+    for block in array_blocks(reg):
+        block = block.reshape(-1)
+        labeled = np.flatnonzero(block)
+        positions.append(labeled + start)
+        labels.append(block[labeled].astype(np.int64))
+        start += block.size
+    return np.concatenate(positions), np.concatenate(labels)
+
+
+def matches_seed_labels(state, reg):
+    """
+    decides whether reg belongs to the run of a checkpoint saved with seed labels: the seeds have their region numbers
+    and reg either holds only the seeds (a new copy of the start) or the labels of the checkpoint (labeled in place by
+    the interrupted run, which can have labeled more pixels after its last checkpoint)
+    :param state: named arrays of the checkpoint with seed_positions, seed_labels and labels (dict)
+    :param reg: region numbers of the resumed run (2D/3D array)
+    :return: True if reg belongs to the run (bool)
+    """
+    seed_positions, seeds = state["seed_positions"], state["seed_labels"]
+    checkpoint_labels = state["labels"].reshape(-1)
+    labeled_pixels = 0
+    holds_checkpoint = True
+    start = 0
+    for block in array_blocks(reg):
+        block = block.reshape(-1)
+        in_block = (seed_positions >= start) & (seed_positions < start + block.size)
+        if not np.array_equal(block[seed_positions[in_block] - start], seeds[in_block]):
+            return False
+        labeled_pixels += np.count_nonzero(block)
+        block_checkpoint = checkpoint_labels[start:start + block.size]
+        checkpoint_labeled = block_checkpoint != 0
+        holds_checkpoint &= bool(np.array_equal(block[checkpoint_labeled], block_checkpoint[checkpoint_labeled]))
+        start += block.size
+    return labeled_pixels == seeds.size or holds_checkpoint
+
+
+def save_checkpoint(path, **arrays):
+    """
+    saves the state of an algorithm as compressed .npz file, the file is written under another name first and then
+    renamed, so an interruption while saving never destroys the previous checkpoint
+    :param path: path of the checkpoint file (str)
+    :param arrays: named arrays of the state (arrays)
+    :return: None
+    """
+    temporary_path = path + ".tmp"
+    with open(temporary_path, "wb") as file:
+        np.savez_compressed(file, **arrays)
+    os.replace(temporary_path, path)
+
+
+def load_checkpoint(path, shape, fingerprint=None, reg=None):
+    """
+    loads the state of an algorithm if a checkpoint exists, a checkpoint of another run is not resumed
+    :param path: path of the checkpoint file, None if no checkpoints are used (str)
+    :param shape: shape of the region array the checkpoint has to belong to (tuple)
+    :param fingerprint: run_fingerprint of the run, it has to match the one saved with the checkpoint,
+    None for no check (str)
+    :param reg: region numbers of a run that labels them in place, checked with the seed labels saved with the
+    checkpoint (see matches_seed_labels), None for no check (2D/3D array)
+    :return: named arrays of the state, None if there is no checkpoint (dict)
+    """
+    if path is None or not os.path.exists(path):
+        return None
+    with np.load(path, allow_pickle=False) as file:
+        state = {name: file[name] for name in file.files}
+    if tuple(state["shape"]) != tuple(shape):
+        raise ValueError("checkpoint {} belongs to an array with shape {}, not {}".format(path, tuple(state["shape"]),
+                                                                                          tuple(shape)))
+    if (fingerprint is not None and str(state.get("fingerprint", "")) != fingerprint) or \
+            (reg is not None and ("seed_positions" not in state or not matches_seed_labels(state, reg))):
+        raise ValueError("checkpoint {} was written by another run (other image, region numbers, algorithm or "
+                         "parameters), remove it to start again".format(path))
+    return state
+
+
+def remove_checkpoint(path):
+    """
+    removes the checkpoint of a finished algorithm, so the next run starts from the beginning
+    :param path: path of the checkpoint file, None if no checkpoints are used (str)
+    :return: None
+    """
+    if path is not None and os.path.exists(path):
+        os.remove(path)
+
+
+def pack_heaps(heaps, columns):
+    """
+    stores a list of heaps of tuples in arrays, the order of the elements inside every heap is kept,
+    so the heaps can be restored exactly
+    :param heaps: heaps (list of lists of tuples)
+    :param columns: data type of every tuple element (list of dtypes)
+    :return: start of every heap and the end of the last one (1D array), one array per tuple element (list of arrays)
+    """
+    offsets = np.zeros(len(heaps) + 1, np.int64)
+    offsets[1:] = np.cumsum([len(heap) for heap in heaps])
+    elements = [element for heap in heaps for element in heap]
+    packed = [np.asarray([element[i] for element in elements], dtype) for i, dtype in enumerate(columns)]
+    return offsets, packed
+
+
+def unpack_heaps(offsets, packed):
+    """
+    restores the heaps stored by pack_heaps
+    :param offsets: start of every heap and the end of the last one (1D array)
+    :param packed: one array per tuple element (list of arrays)
+    :return: heaps (list of lists of tuples)
+    """
+    elements = list(zip(*(column.tolist() for column in packed)))
+    offsets = offsets.tolist()
+    return [elements[start:stop] for start, stop in zip(offsets[:-1], offsets[1:])]
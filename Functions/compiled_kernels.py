@@ -0,0 +1,358 @@
+import heapq
+import os
+import numpy as np
+
+try:
+    import numba
+except ImportError:  # numba is optional, without it the numpy implementations are used
+    numba = None
+
+# backend used when a function is called with backend=None: "auto" (numba if installed), "numba" or "numpy"
+DEFAULT_BACKEND = os.environ.get("REGION_GROWING_BACKEND", "auto")
+
+
+def jit(function):
+    """
+    compiles a kernel with numba, the machine code is cached on disk next to this module (__pycache__), so it is
+    only compiled again after the kernel changed and not on every process start
+    :param function: kernel written in the numba subset of python (function)
+    :return: compiled kernel, the function itself if numba is not installed (function)
+    """
+    if numba is None:
+        return function
+    return numba.njit(cache=True)(function)
+
+
+def use_numba(backend=None):
+    """
+    decides whether the compiled kernels are used
+    :param backend: "auto" (numba if it is installed), "numba" or "numpy", None uses DEFAULT_BACKEND (str)
+    :return: True for the numba kernels, False for the numpy implementation (bool)
+    """
+    if backend is None:
+        backend = DEFAULT_BACKEND
+    if backend == "auto":
+        return numba is not None
+    if backend == "numba":
+        if numba is None:
+            raise ImportError("backend 'numba' needs numba to be installed")
+        return True
+    if backend == "numpy":
+        return False
+    raise ValueError("backend has to be 'auto', 'numba' or 'numpy', not {}".format(backend))
+
+
+def neighbor_arrays(shape, offsets, flat_offsets):
+    """
+    converts a neighbor table to the arrays used by the kernels
+    :param shape: shape of the image (tuple)
+    :param offsets: neighbor offsets (2D array, see connectivity.neighbor_offsets)
+    :param flat_offsets: offsets of the neighbors in flat indices (list of ints)
+    :return: offsets (2D int64 array), flat offsets, shape and flat distance of neighboring pixels along every axis
+    (1D int64 arrays)
+    """
+    shape = np.asarray(shape, np.int64)
+    strides = np.ones(shape.size, np.int64)
+    strides[:-1] = np.cumprod(shape[::-1])[::-1][1:]
+    return np.asarray(offsets, np.int64), np.asarray(flat_offsets, np.int64), shape, strides
+
+
+@jit
+def is_inside(position, offset, shape, strides):
+    """
+    tests whether the neighbor of a pixel in the direction of offset lies inside the image
+    :param position: flat index of the pixel (int)
+    :param offset: neighbor offset (1D array)
+    :param shape: shape of the image (1D array)
+    :param strides: flat distance of neighboring pixels along every axis (1D array)
+    :return: True if the neighbor is inside the image (bool)
+    """
+    rest = position
+    for axis in range(shape.size):
+        coordinate = rest // strides[axis]
+        rest = rest % strides[axis]
+        if offset[axis] != 0 and not 0 <= coordinate + offset[axis] < shape[axis]:
+            return False
+    return True
+
+
+@jit
+def closest_frontier_pixel(labels, upper, lower, mean, max_intensity):
+    """
+    compiled version of heap_region_growing.closest_frontier_pixel
+    :param labels: flat region numbers (1D array)
+    :param upper: heap of frontier pixels with intensity >= mean (list)
+    :param lower: heap of frontier pixels with intensity < mean (list)
+    :param mean: mean intensity value of the region (float)
+    :param max_intensity: maximal intensity value (float)
+    :return: distance, direction and flat index of the closest pixel, distance inf if the frontier is empty (tuple)
+    """
+    while upper and labels[upper[0][2]] != 0:
+        heapq.heappop(upper)
+    while lower and labels[lower[0][2]] != 0:
+        heapq.heappop(lower)
+    closest = (np.inf, 0, 0)
+    if upper:
+        intensity, direction, position = upper[0]
+        closest = (abs((intensity - mean) / max_intensity), direction, position)
+    if lower:
+        intensity, direction, position = lower[0]
+        candidate = (abs((-intensity - mean) / max_intensity), direction, position)
+        if candidate < closest:
+            closest = candidate
+    return closest
+
+
+@jit
+def seeded_growth(labels, intensities, max_intensity, sums, counts, seed_positions, seed_directions, seed_regions,
+                  offsets, flat_offsets, shape, strides):
+    """
+    compiled version of the growth loop of heap_region_growing.region_growing, labels are changed in place
+    :param labels: flat region numbers (1D array)
+    :param intensities: flat intensity values (1D array)
+    :param max_intensity: maximal intensity value (float)
+    :param sums: sums of intensity values, the region number is the index (1D float array)
+    :param counts: pixel counts, the region number is the index (1D array)
+    :param seed_positions: flat indices of the frontier pixels of the seeds (1D array)
+    :param seed_directions: directions of the frontier pixels of the seeds (1D array)
+    :param seed_regions: region numbers of the frontier pixels of the seeds (1D array)
+    :param offsets: neighbor offsets (2D array)
+    :param flat_offsets: offsets of the neighbors in flat indices (1D array)
+    :param shape: shape of the image (1D array)
+    :param strides: flat distance of neighboring pixels along every axis (1D array)
+    :return: None
+    """
+    max_region = sums.size - 1
+    means = sums / counts
+    # the first element types the heaps and is removed again, heaps have to be non-empty to be created by numba
+    upper = [[(0.0, 0, 0)] for _ in range(max_region + 1)]
+    lower = [[(0.0, 0, 0)] for _ in range(max_region + 1)]
+    for region in range(max_region + 1):
+        upper[region].pop()
+        lower[region].pop()
+    for i in range(seed_positions.size):
+        region = seed_regions[i]
+        intensity = float(intensities[seed_positions[i]])
+        if intensity >= means[region]:
+            heapq.heappush(upper[region], (intensity, np.int64(seed_directions[i]), np.int64(seed_positions[i])))
+        else:
+            heapq.heappush(lower[region], (-intensity, np.int64(seed_directions[i]), np.int64(seed_positions[i])))
+
+    versions = np.zeros(max_region + 1, np.int64)
+    frontier = [(0.0, 0, 0, 0, 0)]
+    frontier.pop()
+    for region in range(1, max_region + 1):
+        distance, direction, position = closest_frontier_pixel(labels, upper[region], lower[region], means[region],
+                                                               max_intensity)
+        if distance != np.inf:
+            frontier.append((distance, direction, position, region, 0))
+    heapq.heapify(frontier)
+
+    while frontier:
+        distance, direction, position, region, version = heapq.heappop(frontier)
+        if version != versions[region]:
+            continue
+        closest = closest_frontier_pixel(labels, upper[region], lower[region], means[region], max_intensity)
+        if closest[0] == np.inf:
+            continue
+        versions[region] += 1
+        if closest != (distance, direction, position):  # pixel was labeled by another region in the meantime
+            heapq.heappush(frontier, (closest[0], closest[1], closest[2], region, versions[region]))
+            continue
+
+        labels[position] = region
+        sums[region] += intensities[position]
+        counts[region] += 1
+        means[region] = sums[region] / counts[region]
+
+        for neighbor_direction in range(flat_offsets.size):
+            if is_inside(position, offsets[neighbor_direction], shape, strides):
+                neighbor = position + flat_offsets[neighbor_direction]
+                if labels[neighbor] == 0:
+                    intensity = float(intensities[neighbor])
+                    if intensity >= means[region]:
+                        heapq.heappush(upper[region], (intensity, neighbor_direction, neighbor))
+                    else:
+                        heapq.heappush(lower[region], (-intensity, neighbor_direction, neighbor))
+        while upper[region] and upper[region][0][0] < means[region]:
+            intensity, neighbor_direction, neighbor = heapq.heappop(upper[region])
+            heapq.heappush(lower[region], (-intensity, neighbor_direction, neighbor))
+        while lower[region] and -lower[region][0][0] >= means[region]:
+            intensity, neighbor_direction, neighbor = heapq.heappop(lower[region])
+            heapq.heappush(upper[region], (-intensity, neighbor_direction, neighbor))
+
+        closest = closest_frontier_pixel(labels, upper[region], lower[region], means[region], max_intensity)
+        if closest[0] != np.inf:
+            heapq.heappush(frontier, (closest[0], closest[1], closest[2], region, versions[region]))
+
+
+@jit
+def find_region(merged_into, region):
+    """
+    follows the merges of a region to the region it belongs to now and shortens the path for the next search
+    :param merged_into: region every region was merged into, the region itself if it was not merged (1D array)
+    :param region: region number -1 (int)
+    :return: region number -1 of the current region (int)
+    """
+    root = region
+    while merged_into[root] != root:
+        root = merged_into[root]
+    while merged_into[region] != root:
+        next_region = merged_into[region]
+        merged_into[region] = root
+        region = next_region
+    return root
+
+
+@jit
+def merge_distance(means, merged, max_intensity, region1, region2):
+    """
+    calculates the distance between two neighboring regions like region_merging.region_distance and update_distances,
+    regions with equal means count as distance 1 until one of them takes part in a merge
+    :param means: means of the regions (1D array)
+    :param merged: True for regions that took part in a merge (1D bool array)
+    :param max_intensity: maximal intensity value (float)
+    :param region1: region number -1 (int)
+    :param region2: region number -1 (int)
+    :return: distance between the regions (float)
+    """
+    distance = abs(means[region1] - means[region2]) / max_intensity
+    if distance == 0 and not merged[region1] and not merged[region2]:
+        return 1.0
+    return distance
+
+
+@jit
+def compact_neighbors(region, heads, tails, nexts, neighbors, merged_into, marks, mark):
+    """
+    replaces the neighbors in the list of a region by the regions they were merged into and removes duplicates and
+    the region itself, the removed entries are not used anymore
+    :param region: region number -1 (int)
+    :param heads: first entry of the neighbor list of every region, -1 for an empty list (1D array)
+    :param tails: last entry of the neighbor list of every region, -1 for an empty list (1D array)
+    :param nexts: next entry of the same list, -1 for the last one (1D array)
+    :param neighbors: region number -1 of the neighbor of every entry (1D array)
+    :param merged_into: region every region was merged into (1D array)
+    :param marks: number of the last call that found a region (1D array)
+    :param mark: number of this call, different from all previous calls (int)
+    :return: None
+    """
+    previous = -1
+    entry = heads[region]
+    while entry != -1:
+        neighbor = find_region(merged_into, neighbors[entry])
+        if neighbor != region and marks[neighbor] != mark:
+            marks[neighbor] = mark
+            neighbors[entry] = neighbor
+            if previous == -1:
+                heads[region] = entry
+            else:
+                nexts[previous] = entry
+            previous = entry
+        entry = nexts[entry]
+    if previous == -1:
+        heads[region] = -1
+    else:
+        nexts[previous] = -1
+    tails[region] = previous
+
+
+@jit
+def distance_merging(neighbor_offsets, neighbor_regions, sums, counts, max_intensity, threshold):
+    """
+    compiled version of the loop of region_merging.distance_merging_while, the merges are recorded in merged_into
+    and the pixels are relabeled afterwards by region_merging.relabel_merged_regions,
+    the neighbors of every region are a linked list that is appended to the list of the region it is merged into,
+    so the memory grows with the number of neighboring pairs and not with the square of the number of regions,
+    the pairs are taken from a heap ordered by (distance, region1, region2) like region_merging.merge_queue, after a
+    merge only the pairs of the merged region are pushed again and entries with an old version of one of their
+    regions are skipped
+    :param neighbor_offsets: start of the neighbors of every region and the end of the last one (1D int64 array)
+    :param neighbor_regions: neighbors of all regions, region number -1 (1D int64 array)
+    (see region_merging.pack_neighbors)
+    :param sums: sums of intensity values, region number -1 is the index (1D float array)
+    :param counts: pixel counts, region number -1 is the index (1D array)
+    :param max_intensity: maximal intensity value (float)
+    :param threshold: distance intensity value below which regions are merged (float)
+    :return: means of the regions, 500 for merged regions (1D array),
+    region every region was merged into, the region itself for remaining regions, region number -1 (1D array),
+    merged pairs (region1, region2) in the order of the merges, region2 was merged into region1, region number -1
+    (2D array), distance and pixel count of the merged region of every merge (1D arrays)
+    """
+    number_of_regions = neighbor_offsets.size - 1
+    means = sums / counts
+    merged = np.zeros(number_of_regions, np.bool_)
+    merged_into = np.arange(number_of_regions)
+    neighbors = neighbor_regions.copy()
+    nexts = np.arange(1, neighbors.size + 1)
+    heads = np.full(number_of_regions, -1)
+    tails = np.full(number_of_regions, -1)
+    for region in range(number_of_regions):
+        if neighbor_offsets[region + 1] > neighbor_offsets[region]:
+            heads[region] = neighbor_offsets[region]
+            tails[region] = neighbor_offsets[region + 1] - 1
+            nexts[tails[region]] = -1
+    marks = np.full(number_of_regions, -1)
+    mark = 0
+    versions = np.zeros(number_of_regions, np.int64)
+    # the first element types the heap and is removed again, heaps have to be non-empty to be created by numba
+    queue = [(0.0, 0, 0, 0, 0)]
+    queue.pop()
+    for region in range(number_of_regions):
+        for entry in range(neighbor_offsets[region], neighbor_offsets[region + 1]):
+            neighbor = neighbors[entry]
+            if neighbor > region:
+                distance = merge_distance(means, merged, max_intensity, region, neighbor)
+                if distance == distance:  # nan is left out like in np.nanmin
+                    queue.append((distance, region, neighbor, 0, 0))
+    heapq.heapify(queue)
+    merge_pairs = np.empty((max(number_of_regions - 1, 0), 2), np.int64)
+    merge_distances = np.empty(max(number_of_regions - 1, 0))
+    merge_sizes = np.empty(max(number_of_regions - 1, 0), counts.dtype)
+    number_of_merges = 0
+
+    while queue:
+        distance, region1, region2, version1, version2 = heapq.heappop(queue)
+        if version1 != versions[region1] or version2 != versions[region2]:
+            continue
+        if not distance < threshold:
+            break
+        merged_into[region2] = region1
+        merged[region1] = True
+        versions[region1] += 1
+        versions[region2] += 1
+
+        if heads[region2] != -1:  # the neighbors of region2 become neighbors of region1
+            if heads[region1] == -1:
+                heads[region1] = heads[region2]
+            else:
+                nexts[tails[region1]] = heads[region2]
+            tails[region1] = tails[region2]
+        heads[region2] = -1
+        tails[region2] = -1
+        mark += 1
+        compact_neighbors(region1, heads, tails, nexts, neighbors, merged_into, marks, mark)
+
+        sums[region1] += sums[region2]
+        counts[region1] += counts[region2]
+        means[region1] = sums[region1] / counts[region1]
+        means[region2] = 500
+        merge_pairs[number_of_merges, 0] = region1
+        merge_pairs[number_of_merges, 1] = region2
+        merge_distances[number_of_merges] = distance
+        merge_sizes[number_of_merges] = counts[region1]
+        number_of_merges += 1
+
+        entry = heads[region1]
+        while entry != -1:
+            region = neighbors[entry]
+            distance = merge_distance(means, merged, max_intensity, region1, region)
+            if distance == distance:
+                first, second = min(region1, region), max(region1, region)
+                heapq.heappush(queue, (distance, first, second, versions[first], versions[second]))
+            entry = nexts[entry]
+
+    for region in range(number_of_regions):  # follow the merges to the final region
+        merged_into[region] = find_region(merged_into, region)
+    return (means, merged_into, merge_pairs[:number_of_merges], merge_distances[:number_of_merges],
+            merge_sizes[:number_of_merges])
@@ -0,0 +1,107 @@
+import numpy as np
+
+# 4-neighborhood in the order left, right, top, bottom, the order decides between equally good neighbors
+FOUR_NEIGHBORS = ((0, -1), (0, 1), (-1, 0), (1, 0))
+DIAGONAL_NEIGHBORS = ((-1, -1), (-1, 1), (1, -1), (1, 1))
+# 6-neighborhood of volumes (plane, row, col) in the order left, right, top, bottom, front, back
+SIX_NEIGHBORS = ((0, 0, -1), (0, 0, 1), (0, -1, 0), (0, 1, 0), (-1, 0, 0), (1, 0, 0))
+
+
+def neighbor_offsets(connectivity=4):
+    """
+    creates the table of neighbor offsets for a connectivity
+    :param connectivity: 4 or 8 for images, 6 or 26 for volumes or a footprint where the neighbors of the center pixel
+    are True (int or 2D/3D array with odd side lengths)
+    :return: offsets of the neighbors, the direct neighbors first in the order left, right, top, bottom (front, back),
+    then the diagonal neighbors in raster order, for a footprint all in raster order (2D array with one row per
+    neighbor)
+    """
+    if isinstance(connectivity, int):
+        if connectivity == 4:
+            return np.asarray(FOUR_NEIGHBORS)
+        if connectivity == 8:
+            return np.asarray(FOUR_NEIGHBORS + DIAGONAL_NEIGHBORS)
+        if connectivity in (6, 26):
+            offsets = np.asarray(SIX_NEIGHBORS)
+            if connectivity == 26:
+                cube_offsets = neighbor_offsets(np.ones((3, 3, 3)))
+                diagonal = np.count_nonzero(cube_offsets, axis=1) > 1
+                offsets = np.concatenate((offsets, cube_offsets[diagonal]))
+            return offsets
+        raise ValueError("connectivity has to be 4, 8, 6, 26 or a footprint, not {}".format(connectivity))
+    footprint = np.asarray(connectivity, bool)
+    if any(side % 2 == 0 for side in footprint.shape):
+        raise ValueError("footprint needs odd side lengths, not {}".format(footprint.shape))
+    center = np.asarray(footprint.shape) // 2
+    offsets = np.argwhere(footprint) - center
+    offsets = offsets[np.any(offsets != 0, axis=1)]  # center pixel is not its own neighbor
+    return offsets
+
+
+def undirected_offsets(offsets):
+    """
+    keeps one offset of every pair of opposite directions, the one whose first non-zero element is positive,
+    so every pair of neighboring pixels is visited once, also for footprints that only contain one of the directions
+    :param offsets: neighbor offsets (2D array, see neighbor_offsets)
+    :return: offsets without opposite directions in raster order (2D array)
+    """
+    offsets = np.asarray(offsets)
+    if len(offsets) == 0:
+        return offsets
+    first_non_zero = offsets[np.arange(len(offsets)), np.argmax(offsets != 0, axis=1)]
+    return np.unique(offsets * np.sign(first_non_zero)[:, None], axis=0)
+
+
+def neighbor_pixels(shape, positions, offsets):
+    """
+    determines the neighbors of pixels for all offsets at once
+    :param shape: shape of the image (tuple)
+    :param positions: flat indices of the pixels (1D array)
+    :param offsets: neighbor offsets (2D array, see neighbor_offsets)
+    :return: flat indices of the neighbors inside the image (1D array), index of the pixel in positions for every
+    neighbor (1D array), number of the offset (direction) for every neighbor (1D array)
+    the neighbors are ordered by direction
+    """
+    if offsets.shape[1] != len(shape):
+        raise ValueError("connectivity for {}D arrays used for an array with shape {}".format(offsets.shape[1], shape))
+    positions = np.asarray(positions)
+    coordinates = np.unravel_index(positions, shape)
+    inside = np.ones((len(offsets), positions.size), bool)
+    neighbor_coordinates = []
+    for axis, size in enumerate(shape):
+        axis_coordinates = coordinates[axis][np.newaxis, :] + offsets[:, axis, np.newaxis]
+        inside &= (axis_coordinates >= 0) & (axis_coordinates < size)
+        neighbor_coordinates.append(axis_coordinates)
+    directions, sources = np.nonzero(inside)
+    neighbors = np.ravel_multi_index(tuple(axis_coordinates[inside] for axis_coordinates in neighbor_coordinates),
+                                     shape)
+    return neighbors, sources, directions
+
+
+def shifted_views(array, offset):
+    """
+    pairs every pixel with its neighbor in one direction by slicing, without copying the array
+    :param array: (2D/3D array)
+    :param offset: offset of the neighbor (1D array or tuple, see neighbor_offsets)
+    :return: view of the pixels that have a neighbor in this direction inside the array, view of these neighbors,
+    both with the same shape (2D/3D arrays)
+    """
+    if len(offset) != array.ndim:
+        raise ValueError("offset {} used for an array with shape {}".format(tuple(offset), array.shape))
+    pixels = []
+    neighbors = []
+    for axis_offset, size in zip(offset, array.shape):
+        pixels.append(slice(max(-axis_offset, 0), max(size - max(axis_offset, 0), 0)))
+        neighbors.append(slice(max(axis_offset, 0), max(size - max(-axis_offset, 0), 0)))
+    return array[tuple(pixels)], array[tuple(neighbors)]
+
+
+def flat_neighbor_offsets(shape, offsets):
+    """
+    calculates how far the neighbors are away from a pixel in the flattened image
+    :param shape: shape of the image (tuple)
+    :param offsets: neighbor offsets (2D array, see neighbor_offsets)
+    :return: offsets of the neighbors in flat indices (list of ints)
+    """
+    strides = np.cumprod((shape[1:] + (1,))[::-1])[::-1]
+    return (offsets @ strides).tolist()
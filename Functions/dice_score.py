@@ -7,8 +7,7 @@ def find_background_number(reg):
     :param reg: segmented image with region number (2D array)
     :return: number of background/ region with maximal number of elements (int)
     """
-    reg = reg.astype(int)
-    background_number = np.bincount(reg.flatten()).argmax()
+    background_number = np.bincount(np.ravel(reg).astype(np.intp, copy=False)).argmax()
     return background_number
 
 
@@ -72,7 +71,7 @@ def dice_score(segmented_img, gt):
     :return: dice score (float between 0 and 1)
     """
     clipped_gt = gt_clip(gt.copy())
-    background_number = find_background_number(segmented_img.copy())
+    background_number = find_background_number(segmented_img)
     clipped_segmented_image = segmented_image_clip(segmented_img.copy(), background_number)
 
     true_positive = intersection_count(clipped_segmented_image, clipped_gt, 1)
@@ -83,12 +82,30 @@ def dice_score(segmented_img, gt):
     return dice_score_value
 
 
+def separation_score(img, clipped_img):
+    """
+    rates a clipped segmentation without ground truth by how well nuclei and background separate the intensity
+    values: the share of the intensity variance between the two classes (the criterion of the otsu threshold)
+    :param img: intensity values (2d array)
+    :param clipped_img: clipped image where all cells have value 1 and background has value 0 (2d array)
+    :return: score between 0 and 1, higher is better (float)
+    """
+    values = np.asarray(img, float).ravel()
+    nucleus = np.asarray(clipped_img).ravel() != 0
+    total_variance = values.var()
+    if total_variance == 0 or nucleus.all() or not nucleus.any():
+        return 0.0
+    nucleus_share = nucleus.mean()
+    between_variance = nucleus_share * (1 - nucleus_share) * (values[nucleus].mean() - values[~nucleus].mean()) ** 2
+    return float(between_variance / total_variance)
+
+
 def final_clipping(segmented_img):
     """
     use segmented image to define nuclei and background
     :param segmented_img: (2d array)
     :return: clipped image (background: 0, nucleus: 1)
     """
-    background_number = find_background_number(segmented_img.copy())
+    background_number = find_background_number(segmented_img)
     clipped_segmented_image = segmented_image_clip(segmented_img.copy(), background_number)
     return clipped_segmented_image
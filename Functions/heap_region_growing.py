@@ -0,0 +1,417 @@
+import heapq
+import numpy as np
+from Functions import seeded_region_growing as srg
+from Functions import connectivity as con
+from Functions import compiled_kernels as ck
+from Functions import checkpoint as cp
+from Functions import mean_index as mi
+
+
+def add_to_frontier(upper, lower, mean, intensity, direction, position):
+    """
+    adds an unlabeled pixel to the frontier of a region
+    pixels at least as bright as the region mean are stored in upper (ordered by intensity), the others in lower
+    (ordered by negative intensity), so the top of both heaps are the pixels closest to the mean
+    :param upper: heap of frontier pixels with intensity >= mean (list)
+    :param lower: heap of frontier pixels with intensity < mean (list)
+    :param mean: mean intensity value of the region (float)
+    :param intensity: intensity value of the pixel (float)
+    :param direction: number of the neighbor direction, left:0, right:1, top:2, bottom:3 (int)
+    :param position: flat index of the pixel (int)
+    :return: None
+    """
+    if intensity >= mean:
+        heapq.heappush(upper, (intensity, direction, position))
+    else:
+        heapq.heappush(lower, (-intensity, direction, position))
+
+
+def balance_frontier(upper, lower, mean):
+    """
+    moves frontier pixels between the two heaps of a region after its mean value changed
+    :param upper: heap of frontier pixels with intensity >= mean (list)
+    :param lower: heap of frontier pixels with intensity < mean (list)
+    :param mean: new mean intensity value of the region (float)
+    :return: None
+    """
+    while upper and upper[0][0] < mean:
+        intensity, direction, position = heapq.heappop(upper)
+        heapq.heappush(lower, (-intensity, direction, position))
+    while lower and -lower[0][0] >= mean:
+        intensity, direction, position = heapq.heappop(lower)
+        heapq.heappush(upper, (-intensity, direction, position))
+
+
+def closest_frontier_pixel(labels, upper, lower, mean, max_intensity):
+    """
+    finds the frontier pixel of a region with the smallest distance to the region,
+    already labeled pixels are removed from the heaps on the way (lazy invalidation)
+    :param labels: flat region numbers (list)
+    :param upper: heap of frontier pixels with intensity >= mean (list)
+    :param lower: heap of frontier pixels with intensity < mean (list)
+    :param mean: mean intensity value of the region (float)
+    :param max_intensity: maximal intensity value (float)
+    :return: distance, direction and flat index of the closest pixel (tuple), None if the frontier is empty
+    """
+    while upper and labels[upper[0][2]] != 0:
+        heapq.heappop(upper)
+    while lower and labels[lower[0][2]] != 0:
+        heapq.heappop(lower)
+    closest = None
+    if upper:
+        intensity, direction, position = upper[0]
+        closest = (abs((intensity - mean) / max_intensity), direction, position)
+    if lower:
+        intensity, direction, position = lower[0]
+        candidate = (abs((-intensity - mean) / max_intensity), direction, position)
+        if closest is None or candidate < closest:
+            closest = candidate
+    return closest
+
+
+def closest_unseeded_pixel(labels, upper, lower, mean):
+    """
+    finds the frontier pixel of a region with the smallest distance cut to a whole number like in
+    unseeded_region_growing, for equal distances the first direction and then the first pixel is used,
+    for whole-numbered intensity values only the top of each heap can have the smallest cut distance,
+    already labeled pixels are removed from the heaps on the way (lazy invalidation)
+    :param labels: flat region numbers (list)
+    :param upper: heap of frontier pixels with intensity >= mean (list)
+    :param lower: heap of frontier pixels with intensity < mean (list)
+    :param mean: mean intensity value of the region (float)
+    :return: distance, direction and flat index of the closest pixel (tuple), None if the frontier is empty
+    """
+    while upper and labels[upper[0][2]] != 0:
+        heapq.heappop(upper)
+    while lower and labels[lower[0][2]] != 0:
+        heapq.heappop(lower)
+    closest = None
+    if upper:
+        intensity, direction, position = upper[0]
+        closest = (int(intensity - mean), direction, position)
+    if lower:
+        intensity, direction, position = lower[0]
+        candidate = (int(mean + intensity), direction, position)
+        if closest is None or candidate < closest:
+            closest = candidate
+    return closest
+
+
+def neighbor_table(shape, connectivity):
+    """
+    creates the neighbor table for labeling single pixels
+    :param shape: shape of the image (tuple)
+    :param connectivity: 4, 8 (2D), 6, 26 (3D) or a footprint (int or array), see connectivity.neighbor_offsets
+    :return: direction, flat offset and the (axis, offset, size) of every axis that has to be tested for the image
+    border for every neighbor (list of tuples)
+    """
+    offsets = con.neighbor_offsets(connectivity)
+    table = []
+    for direction, (offset, flat_offset) in enumerate(zip(offsets.tolist(), con.flat_neighbor_offsets(shape, offsets))):
+        border_tests = [(axis, axis_offset, shape[axis]) for axis, axis_offset in enumerate(offset) if axis_offset != 0]
+        table.append((direction, flat_offset, border_tests))
+    return table
+
+
+def flat_labels(reg):
+    """
+    gives flat access to the region numbers, without a copy if reg is a writable, contiguous integer array
+    (e.g. a memory mapped .npy file)
+    :param reg: region numbers (2D/3D array)
+    :return: flat region numbers (1D array), True if they are a copy that has to be written back to reg
+    """
+    if np.issubdtype(reg.dtype, np.integer) and reg.flags.c_contiguous and reg.flags.writeable:
+        return reg.reshape(-1), False
+    return reg.astype(np.int64).ravel(), True
+
+
+def save_growth_checkpoint(path, shape, label_array, sums, counts, means, versions, upper, lower, frontier,
+                           fingerprint, seeds):
+    """
+    saves the complete state of the growth loop of region_growing
+    :param path: path of the checkpoint file (str)
+    :param shape: shape of the region array (tuple)
+    :param label_array: flat region numbers (1D array)
+    :param sums: intensity sums, the region number is the index (list)
+    :param counts: pixel counts, the region number is the index (list)
+    :param means: mean intensity values, the region number is the index (list)
+    :param versions: version of the frontier entry of every region (list)
+    :param upper: heaps of frontier pixels with intensity >= mean of every region (list of lists)
+    :param lower: heaps of frontier pixels with intensity < mean of every region (list of lists)
+    :param frontier: heap with the closest frontier pixel of every region (list)
+    :param fingerprint: checkpoint.run_fingerprint of the growth (str)
+    :param seeds: flat indices and region numbers of the seeds (tuple of 1D arrays, see checkpoint.seed_labels)
+    :return: None
+    """
+    upper_offsets, upper_columns = cp.pack_heaps(upper, [float, np.int64, np.int64])
+    lower_offsets, lower_columns = cp.pack_heaps(lower, [float, np.int64, np.int64])
+    _, frontier_columns = cp.pack_heaps([frontier], [float, np.int64, np.int64, np.int64, np.int64])
+    cp.save_checkpoint(path, shape=np.asarray(shape), fingerprint=np.asarray(fingerprint), labels=label_array,
+                       seed_positions=seeds[0], seed_labels=seeds[1], sums=np.asarray(sums, float),
+                       counts=np.asarray(counts, np.int64), means=np.asarray(means, float),
+                       versions=np.asarray(versions, np.int64), upper_offsets=upper_offsets,
+                       lower_offsets=lower_offsets, frontier_length=np.asarray(len(frontier)),
+                       **{"upper_{}".format(i): column for i, column in enumerate(upper_columns)},
+                       **{"lower_{}".format(i): column for i, column in enumerate(lower_columns)},
+                       **{"frontier_{}".format(i): column for i, column in enumerate(frontier_columns)})
+
+
+def compiled_region_growing(img, reg, connectivity=4, statistics=None):
+    """
+    region_growing with the growth loop compiled by numba (see compiled_kernels.seeded_growth), same result
+    :param img: intensity values (2D/3D array)
+    :param reg: region numbers (2D/3D array)
+    :param connectivity: 4, 8 (2D), 6, 26 (3D) or a footprint (int or array), see connectivity.neighbor_offsets
+    :param statistics: intensity sums and pixel counts of the regions (see seeded_region_growing.region_statistics)
+    and maximal intensity (see seeded_region_growing.maximal_intensity) to start from instead of the ones of img and
+    reg, e.g. of the whole image when only a part of it is grown, they are not changed, can not be combined with
+    checkpoints (tuple)
+    :return: labeled image with region numbers (2D/3D array)
+    """
+    offsets = con.neighbor_offsets(connectivity)
+    label_array, is_copy = flat_labels(reg)
+    if statistics is None:
+        region_sums, region_counts = srg.region_statistics(img, reg)
+        max_intensity = float(np.amax(img))
+    else:
+        region_sums, region_counts = np.array(statistics[0], float), np.array(statistics[1])
+        max_intensity = float(statistics[2])
+    seed_frontier = srg.find_seed_neighbors(reg, connectivity)
+    ck.seeded_growth(np.asarray(label_array), np.asarray(np.ascontiguousarray(img)).reshape(-1), max_intensity,
+                     region_sums, region_counts, seed_frontier['position'], seed_frontier['direction'],
+                     seed_frontier['region'],
+                     *ck.neighbor_arrays(reg.shape, offsets, con.flat_neighbor_offsets(reg.shape, offsets)))
+    if is_copy:
+        reg[...] = label_array.reshape(reg.shape)
+    return reg
+
+
+def region_growing(img, reg, connectivity=4, backend=None, norm=2, checkpoint_path=None, checkpoint_interval=10 ** 6,
+                   statistics=None):
+    """
+    performs region growing algorithm on image or volume with defined seeds (reg)
+    same result as seeded_region_growing.region_growing, but the frontier pixels are kept in heaps instead of
+    distance arrays, so labeling a pixel costs log(number of frontier pixels) instead of several full image scans
+    img and reg can be memory mapped (np.memmap, np.load(..., mmap_mode='r')), both are only read pixel by pixel
+    or in blocks and all other data structures only grow with the frontier and the number of regions
+    :param img: intensity values (2D/3D array)
+    :param reg: region numbers (2D/3D array)
+    :param connectivity: 4, 8 (2D), 6, 26 (3D) or a footprint (int or array), see connectivity.neighbor_offsets
+    :param backend: "auto", "numba" or "numpy", None uses compiled_kernels.DEFAULT_BACKEND (str)
+    :param norm: order of the norm that combines the channels of an image with several channels (last axis of img),
+    such images are grown by seeded_region_growing.region_growing, the heaps need one intensity per pixel
+    :param checkpoint_path: file for the state of the growth, if it exists the growth continues from there with the
+    same result as without interruption, it is removed at the end, None for no checkpoints (str)
+    checkpoints are only written by the numpy backend
+    :param checkpoint_interval: number of labeled pixels between two checkpoints (int)
+    :param statistics: intensity sums and pixel counts of the regions (see seeded_region_growing.region_statistics)
+    and maximal intensity (see seeded_region_growing.maximal_intensity) to start from instead of the ones of img and
+    reg, e.g. of the whole image when only a part of it is grown, they are not changed, can not be combined with
+    checkpoints (tuple)
+    :return: labeled image with region numbers (2D/3D array)
+    """
+    if statistics is not None and checkpoint_path is not None:
+        raise ValueError("statistics can not be combined with checkpoint_path")
+    if srg.is_multi_channel(img, reg):
+        return srg.region_growing(img, reg, connectivity, norm, checkpoint_path, checkpoint_interval, statistics)
+    if ck.use_numba(backend) and checkpoint_path is None:
+        return compiled_region_growing(img, reg, connectivity, statistics)
+    table = neighbor_table(reg.shape, connectivity)
+    strides = con.flat_neighbor_offsets(reg.shape, np.eye(reg.ndim, dtype=int))
+    label_array, is_copy = flat_labels(reg)
+    labels = memoryview(label_array)  # element access with python numbers, as fast as a list without copying
+    intensities = memoryview(np.ascontiguousarray(img).reshape(-1))
+    max_intensity = float(np.amax(img) if statistics is None else statistics[2])
+    # reg can be labeled in place (see flat_labels), so it is checked with the seeds of the checkpoint and not hashed
+    fingerprint = None if checkpoint_path is None else cp.run_fingerprint(
+        "heap_region_growing.region_growing", img, None, connectivity=con.neighbor_offsets(connectivity))
+    state = cp.load_checkpoint(checkpoint_path, reg.shape, fingerprint, None if checkpoint_path is None else reg)
+    if state is None:
+        seeds = None if checkpoint_path is None else cp.seed_labels(reg)
+        region_sums, region_counts = srg.region_statistics(img, reg) if statistics is None else statistics[:2]
+        with np.errstate(invalid='ignore', divide='ignore'):
+            means = (region_sums / region_counts).tolist()
+        sums = region_sums.tolist()
+        counts = region_counts.tolist()
+        max_region = len(counts) - 1
+
+        upper = [[] for _ in range(max_region + 1)]
+        lower = [[] for _ in range(max_region + 1)]
+        seed_frontier = srg.find_seed_neighbors(reg, connectivity)
+        for neighbor, direction, region in zip(seed_frontier['position'].tolist(),
+                                               seed_frontier['direction'].tolist(), seed_frontier['region'].tolist()):
+            add_to_frontier(upper[region], lower[region], means[region], intensities[neighbor], direction, neighbor)
+
+        # one entry per region with the distance of its closest frontier pixel, the version marks outdated entries
+        versions = [0] * (max_region + 1)
+        frontier = []
+        for region in range(1, max_region + 1):
+            closest = closest_frontier_pixel(labels, upper[region], lower[region], means[region], max_intensity)
+            if closest is not None:
+                frontier.append(closest + (region, 0))
+        heapq.heapify(frontier)
+    else:
+        label_array[:] = state["labels"]
+        seeds = state["seed_positions"], state["seed_labels"]
+        sums = state["sums"].tolist()
+        counts = state["counts"].tolist()
+        means = state["means"].tolist()
+        versions = state["versions"].tolist()
+        upper = cp.unpack_heaps(state["upper_offsets"], [state["upper_{}".format(i)] for i in range(3)])
+        lower = cp.unpack_heaps(state["lower_offsets"], [state["lower_{}".format(i)] for i in range(3)])
+        frontier = cp.unpack_heaps(np.asarray([0, state["frontier_length"]]),
+                                   [state["frontier_{}".format(i)] for i in range(5)])[0]
+
+    labeled_pixels = 0
+    while frontier:
+        distance, direction, position, region, version = heapq.heappop(frontier)
+        if version != versions[region]:
+            continue
+        closest = closest_frontier_pixel(labels, upper[region], lower[region], means[region], max_intensity)
+        if closest is None:
+            continue
+        versions[region] += 1
+        if closest != (distance, direction, position):  # pixel was labeled by another region in the meantime
+            heapq.heappush(frontier, closest + (region, versions[region]))
+            continue
+
+        labels[position] = region
+        sums[region] += intensities[position]
+        counts[region] += 1
+        means[region] = sums[region] / counts[region]
+
+        coordinates = []
+        rest = position
+        for stride in strides:
+            coordinate, rest = divmod(rest, stride)
+            coordinates.append(coordinate)
+        for neighbor_direction, flat_offset, border_tests in table:
+            for axis, axis_offset, size in border_tests:
+                if not 0 <= coordinates[axis] + axis_offset < size:
+                    break
+            else:
+                neighbor = position + flat_offset
+                if labels[neighbor] == 0:
+                    add_to_frontier(upper[region], lower[region], means[region], intensities[neighbor],
+                                    neighbor_direction, neighbor)
+        balance_frontier(upper[region], lower[region], means[region])
+
+        closest = closest_frontier_pixel(labels, upper[region], lower[region], means[region], max_intensity)
+        if closest is not None:
+            heapq.heappush(frontier, closest + (region, versions[region]))
+
+        labeled_pixels += 1
+        if checkpoint_path is not None and labeled_pixels % checkpoint_interval == 0:
+            save_growth_checkpoint(checkpoint_path, reg.shape, label_array, sums, counts, means, versions, upper,
+                                   lower, frontier, fingerprint, seeds)
+
+    cp.remove_checkpoint(checkpoint_path)
+    if is_copy:
+        reg[...] = label_array.reshape(reg.shape)
+    return reg
+
+
+def unseeded_region_growing(img, start_pixel, t, connectivity=4):
+    """
+    performs the unseeded region growing algorithm with the heaps of region_growing, same result as
+    unseeded_region_growing.unseeded_region_growing_algorithm for images with whole-numbered intensity values:
+    the closest frontier pixel joins its neighboring region if the cut distance is below t, otherwise the region
+    with the most similar mean if that distance is below t, otherwise it starts a new region
+    :param img: intensity values with whole numbers (2D/3D array)
+    :param start_pixel: pixel which defines the starting seed (tuple)
+    :param t: threshold to decide whether a pixel is similar enough to a region (float)
+    :param connectivity: 4, 8 (2D), 6, 26 (3D) or a footprint (int or array), see connectivity.neighbor_offsets
+    :return: array with region numbers in the smallest unsigned integer type for them (2D/3D array)
+    """
+    # the region numbers start in the smallest type and get a larger one when they do not fit anymore
+    reg = np.zeros(img.shape, np.uint8)
+    pending = np.iinfo(reg.dtype).max  # marks a pixel that is taken out of the frontier but has no region yet
+    table = neighbor_table(reg.shape, connectivity)
+    strides = con.flat_neighbor_offsets(reg.shape, np.eye(reg.ndim, dtype=int))
+    labels = memoryview(reg.reshape(-1))
+    intensities = memoryview(np.ascontiguousarray(img).reshape(-1))
+    # region statistics and heaps, the region number is the index, a new region gets the next number
+    sums = [0]
+    counts = [0]
+    means = [np.nan]
+    upper = [[]]
+    lower = [[]]
+    versions = [0]
+    frontier = []
+    # region numbers ordered by their means for the search of the most similar region
+    mean_index = []
+
+    # the start pixel has no region yet, so it becomes region 1
+    position, region = int(np.ravel_multi_index(start_pixel, img.shape)), 0
+    while True:
+        intensity = intensities[position]
+        if region == 0:
+            region = len(means)
+            if region == pending:
+                reg = reg.astype(srg.label_dtype(pending + 1))
+                pending = np.iinfo(reg.dtype).max
+                labels = memoryview(reg.reshape(-1))
+            sums.append(0)
+            counts.append(0)
+            means.append(intensity)
+            versions.append(0)
+            upper.append([])
+            lower.append([])
+            mi.insert_mean(mean_index, intensity, region)
+        labels[position] = region
+        sums[region] += intensity
+        counts[region] += 1
+        mean = sums[region] / counts[region]
+        mi.update_mean(mean_index, means[region], mean, region)
+        means[region] = mean
+
+        coordinates = []
+        rest = position
+        for stride in strides:
+            coordinate, rest = divmod(rest, stride)
+            coordinates.append(coordinate)
+        for neighbor_direction, flat_offset, border_tests in table:
+            for axis, axis_offset, size in border_tests:
+                if not 0 <= coordinates[axis] + axis_offset < size:
+                    break
+            else:
+                neighbor = position + flat_offset
+                if labels[neighbor] == 0:
+                    add_to_frontier(upper[region], lower[region], means[region], intensities[neighbor],
+                                    neighbor_direction, neighbor)
+        balance_frontier(upper[region], lower[region], means[region])
+        versions[region] += 1
+        closest = closest_unseeded_pixel(labels, upper[region], lower[region], means[region])
+        if closest is not None:
+            heapq.heappush(frontier, closest + (region, versions[region]))
+
+        position = None
+        while frontier:
+            distance, direction, candidate, record_region, version = heapq.heappop(frontier)
+            if version != versions[record_region]:
+                continue
+            closest = closest_unseeded_pixel(labels, upper[record_region], lower[record_region], means[record_region])
+            if closest is None:
+                continue
+            versions[record_region] += 1
+            if closest != (distance, direction, candidate):  # pixel was labeled by another region in the meantime
+                heapq.heappush(frontier, closest + (record_region, versions[record_region]))
+                continue
+            position = candidate
+            break
+        if position is None:
+            break
+
+        if distance < t:
+            region = record_region
+        else:
+            similarity, region = mi.nearest_mean(mean_index, intensities[position])
+            if not similarity < t:
+                region = 0
+            if region != record_region:  # the region of the frontier pixel needs its next closest pixel
+                labels[position] = pending  # counts as labeled for the heaps until it gets its region
+                closest = closest_unseeded_pixel(labels, upper[record_region], lower[record_region],
+                                                 means[record_region])
+                if closest is not None:
+                    heapq.heappush(frontier, closest + (record_region, versions[record_region]))
+    return srg.compact_labels(reg)
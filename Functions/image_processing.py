@@ -2,6 +2,7 @@ import numpy as np
 import scipy.ndimage as ndimage
 import matplotlib.pyplot as plt
 from medpy.filter.smoothing import anisotropic_diffusion
+from Functions import connectivity as con
 
 
 def show_two_images_title(img1, img2, f_title, img1_title, img2_title, colorbar_size):
@@ -338,7 +339,7 @@ def filter_iteration_sum(img, pixel, size):
     :return: sum of intensity values (float)
     """
     n = (size - 1) // 2
-    neighborhood_sum = 0
+    neighborhood_sum = 0.0
     for filter_pixel in np.ndindex(size, size):
         filter_neighbors_row = pixel[0] + filter_pixel[0] - n
         filter_neighbors_col = pixel[1] + filter_pixel[1] - n
@@ -370,36 +371,36 @@ def add_border(array):
     :param array: array that should get a border (2D array)
     :return: array with added border of zeros (2D array)
     """
-    array_with_border = np.zeros((array.shape[0] + 2, array.shape[1] + 2))
-    array_with_border[1:array.shape[0] + 1, 1:array.shape[1] + 1] = array
-    return array_with_border
+    return add_border_variable(array, 1)
 
 
 def add_border_variable(array, border_size):
-    array_with_border = np.zeros((array.shape[0] + 2 * border_size, array.shape[1] + 2 * border_size))
-    array_with_border[border_size:array.shape[0] + border_size, border_size:array.shape[1] + border_size] = array
-    return array_with_border
+    """
+    adds a border with zeros of a given width to an array
+    :param array: array that should get a border (2D array)
+    :param border_size: width of the border (int)
+    :return: array with added border of zeros, same dtype as array (2D array)
+    """
+    return np.pad(array, border_size)
 
 
 def remove_border_variable(array, border_size):
-    array = np.delete(array, np.s_[0:border_size], axis=1)
-    array = np.delete(array, np.s_[0:border_size], axis=0)
-    array = np.delete(array, np.s_[array.shape[1] - border_size:array.shape[1]], axis=1)
-    array = np.delete(array, np.s_[array.shape[0] - border_size:array.shape[0]], axis=0)
-    return array
+    """
+    removes a border of a given width of an array
+    :param array: array which border should be removed (2D array)
+    :param border_size: width of the border (int)
+    :return: view of the array without its border (2D array)
+    """
+    return array[border_size:array.shape[0] - border_size, border_size:array.shape[1] - border_size]
 
 
 def remove_border(array):
     """
     removes the border of an array
     :param array: array which border should be removed (2D array)
-    :return: array without its border (2D array)
+    :return: view of the array without its border (2D array)
     """
-    array = np.delete(array, 0, axis=1)
-    array = np.delete(array, array.shape[1] - 1, axis=1)
-    array = np.delete(array, 0, axis=0)
-    array = np.delete(array, array.shape[0] - 1, axis=0)
-    return array
+    return remove_border_variable(array, 1)
 
 
 def histogram(img):
@@ -473,15 +474,15 @@ def remove_bright_spots_with_border(img, t_bright, t_background, t_border):
     :return: image with changed intensity values (2D array)
     """
     img_copy = img.copy()
-    img_copy = add_border_variable(img_copy, t_border)
-    pos_bright_spot = np.where(img_copy > t_bright)
-    img_copy[pos_bright_spot[0], pos_bright_spot[1]] = t_background
-    for border_number in range(1, t_border + 1):
-        img_copy[pos_bright_spot[0] - border_number, pos_bright_spot[1]] = t_background
-        img_copy[pos_bright_spot[0] + border_number, pos_bright_spot[1]] = t_background
-        img_copy[pos_bright_spot[0], pos_bright_spot[1] - border_number] = t_background
-        img_copy[pos_bright_spot[0], pos_bright_spot[1] + border_number] = t_background
-    img_copy = remove_border_variable(img_copy, t_border)
+    bright_spots = img_copy > t_bright
+    changed = bright_spots.copy()
+    for border_number in range(1, t_border + 1):  # pixels up to t_border left, right, above or below a bright spot
+        for offset in con.FOUR_NEIGHBORS:
+            shift = np.multiply(offset, border_number)
+            spots, _ = con.shifted_views(bright_spots, shift)
+            _, neighbors = con.shifted_views(changed, shift)  # views, the assignment changes changed
+            neighbors[spots] = True
+    img_copy[changed] = t_background
     return img_copy
 
 
@@ -540,3 +541,25 @@ def normalize_intensity(img):
 def subtract_minimum(img):
     img_subtracted = img.copy() - np.amin(img)
     return img_subtracted
+
+
+def load_volume(path):
+    """
+    opens a z-stack saved as .npy file as memory mapped array, so it is read from disk only where it is used
+    :param path: path of the .npy file (str)
+    :return: read-only memory mapped intensity values (3D array)
+    """
+    volume = np.load(path, mmap_mode='r')
+    return volume
+
+
+def create_label_volume(path, shape, dtype=np.int32):
+    """
+    creates a memory mapped .npy file filled with zeros for the region numbers of a z-stack
+    :param path: path of the new .npy file (str)
+    :param shape: shape of the z-stack (tuple)
+    :param dtype: data type of the region numbers (numpy integer type)
+    :return: writable memory mapped region numbers (3D array)
+    """
+    labels = np.lib.format.open_memmap(path, mode='w+', dtype=dtype, shape=shape)
+    return labels
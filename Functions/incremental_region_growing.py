@@ -0,0 +1,242 @@
+import numpy as np
+from scipy import ndimage
+from Functions import seeded_region_growing as srg
+from Functions import heap_region_growing as hrg
+from Functions import connectivity as con
+
+
+def region_boxes(reg):
+    """
+    calculates the bounding box of every region in one pass, regrow_after_seed_edit keeps them up to date, so an edit
+    only reads the pixels around the edited regions and not the whole image
+    :param reg: region numbers after region growing (2D/3D array)
+    :return: box of every region, region number -1 is the index, None for region numbers without pixels
+    (list of tuples of slices)
+    """
+    return ndimage.find_objects(np.asarray(reg))
+
+
+def union_box(boxes, shape, margin=0):
+    """
+    calculates the smallest box around several boxes, enlarged by a margin
+    :param boxes: boxes, None is ignored (list of tuples of slices)
+    :param shape: shape of the image (tuple)
+    :param margin: number of pixels added on every side (int)
+    :return: box (tuple of slices), None if there is no box
+    """
+    boxes = [box for box in boxes if box is not None]
+    if not boxes:
+        return None
+    return tuple(slice(max(min(box[axis].start for box in boxes) - margin, 0),
+                       min(max(box[axis].stop for box in boxes) + margin, shape[axis])) for axis in range(len(shape)))
+
+
+def pixel_box(pixel):
+    """
+    :param pixel: coordinates of a pixel (tuple)
+    :return: box that only contains the pixel (tuple of slices)
+    """
+    return tuple(slice(int(coordinate), int(coordinate) + 1) for coordinate in pixel)
+
+
+def region_box(boxes, region):
+    """
+    :param boxes: box of every region (list of tuples of slices, see region_boxes)
+    :param region: region number (int)
+    :return: box of the region, None if it has no pixels (tuple of slices)
+    """
+    region = int(region)
+    return boxes[region - 1] if 0 < region <= len(boxes) else None
+
+
+def edit_seeds(seeds, reg, added_seeds=(), removed_seeds=(), boxes=None):
+    """
+    adds and removes seeds, every added seed pixel becomes a new region, a removed seed pixel removes the whole seed
+    region it belongs to
+    :param seeds: region numbers of the seeds that reg was grown from, changed in place if the new region numbers
+    fit into its dtype (2D/3D array)
+    :param reg: region numbers after region growing (2D/3D array)
+    :param added_seeds: pixels that become new seeds (list of tuples)
+    :param removed_seeds: pixels of seeds that are removed (list of tuples)
+    :param boxes: box of every region of reg, None calculates them (list of tuples of slices, see region_boxes)
+    :return: seeds: changed seeds (2D/3D array), region numbers of the regions touched by the edit (1D array)
+    """
+    if boxes is None:
+        boxes = region_boxes(reg)
+    touched = []
+    for pixel in removed_seeds:
+        seed_number = seeds[tuple(pixel)]
+        touched.append(reg[tuple(pixel)])
+        if seed_number != 0:  # a seed lies inside the region grown from it
+            box = union_box([region_box(boxes, seed_number), pixel_box(pixel)], seeds.shape)
+            seeds_in_box = seeds[box]
+            seeds_in_box[seeds_in_box == seed_number] = 0
+    # every seed grew to the region with its number, so the largest region number is also the largest seed number
+    next_region = next((region for region in range(len(boxes), 0, -1) if boxes[region - 1] is not None), 0) + 1
+    seeds = seeds.astype(np.promote_types(seeds.dtype, srg.label_dtype(next_region + len(added_seeds))), copy=False)
+    for pixel in added_seeds:
+        touched.append(reg[tuple(pixel)])
+        seeds[tuple(pixel)] = next_region
+        next_region += 1
+    touched = np.unique(np.asarray(touched, int))
+    return seeds, touched[touched != 0]
+
+
+def affected_pixels(reg, touched, added_seeds=(), connectivity=4, boxes=None):
+    """
+    determines the pixels that have to be grown again: the touched regions, their neighboring regions and the new seeds,
+    only the pixels inside the boxes of these regions are read
+    :param reg: region numbers after region growing (2D/3D array)
+    :param touched: region numbers of the regions touched by the edit (1D array)
+    :param added_seeds: pixels that become new seeds (list of tuples)
+    :param connectivity: 4, 8 (2D), 6, 26 (3D) or a footprint (int or array), see connectivity.neighbor_offsets
+    :param boxes: box of every region of reg, None calculates them (list of tuples of slices, see region_boxes)
+    :return: box around the pixels that have to be grown again enlarged by one pixel, None if there are none
+    (tuple of slices), True for the pixels inside the box that have to be grown again (2D/3D bool array)
+    """
+    if boxes is None:
+        boxes = region_boxes(reg)
+    affected_regions = np.asarray(touched, int)
+    offsets = con.neighbor_offsets(connectivity)
+    touched_box = union_box([region_box(boxes, region) for region in touched], reg.shape,
+                            margin=int(np.amax(np.abs(offsets))))
+    if touched_box is not None:
+        reg_around_touched = reg[touched_box]
+        touched_pixels = np.flatnonzero(np.isin(reg_around_touched, touched))
+        neighbors = con.neighbor_pixels(reg_around_touched.shape, touched_pixels, offsets)[0]
+        affected_regions = np.union1d(affected_regions, reg_around_touched.flat[neighbors])
+    affected_regions = affected_regions[affected_regions != 0]
+    box = union_box([region_box(boxes, region) for region in affected_regions] +
+                    [pixel_box(pixel) for pixel in added_seeds], reg.shape, margin=1)
+    if box is None:
+        return None, None
+    affected = np.isin(reg[box], affected_regions)
+    for pixel in added_seeds:
+        affected[tuple(int(coordinate) - axis_box.start for coordinate, axis_box in zip(pixel, box))] = True
+    # the boxes kept by update_region_boxes may be larger than their regions
+    tight_box = bounding_box(affected)
+    return tuple(slice(axis_box.start + tight.start, axis_box.start + tight.stop)
+                 for axis_box, tight in zip(box, tight_box)), affected[tight_box]
+
+
+def bounding_box(mask, margin=1):
+    """
+    calculates the smallest box around all True pixels of a mask, enlarged by a margin
+    :param mask: (2D/3D bool array)
+    :param margin: number of pixels added on every side (int)
+    :return: box (tuple of slices), None if the mask has no True pixel
+    """
+    if not np.any(mask):
+        return None
+    box = []
+    for axis in range(mask.ndim):
+        other_axes = tuple(other_axis for other_axis in range(mask.ndim) if other_axis != axis)
+        used = np.flatnonzero(np.any(mask, axis=other_axes))
+        box.append(slice(max(int(used[0]) - margin, 0), min(int(used[-1]) + 1 + margin, mask.shape[axis])))
+    return tuple(box)
+
+
+def update_region_boxes(boxes, reg_box, box, regions_before, shape):
+    """
+    updates the boxes of the regions after the pixels inside a box were grown again, a region whose box was inside it
+    gets its new box, a region that reaches out of it keeps its pixels outside and its box is enlarged
+    :param boxes: box of every region, changed in place (list of tuples of slices, see region_boxes)
+    :param reg_box: region numbers inside the box after the growth (2D/3D array)
+    :param box: box that was grown again (tuple of slices)
+    :param regions_before: region numbers inside the box before the growth (1D array)
+    :param shape: shape of the image (tuple)
+    :return: None
+    """
+    for region in regions_before[regions_before != 0].tolist():
+        old_box = boxes[region - 1]
+        if old_box is not None and all(axis_box.start <= old.start and old.stop <= axis_box.stop
+                                       for old, axis_box in zip(old_box, box)):
+            boxes[region - 1] = None  # set again below if the region kept pixels
+    local_boxes = region_boxes(reg_box)
+    boxes.extend([None] * (len(local_boxes) - len(boxes)))
+    for index, local_box in enumerate(local_boxes):
+        if local_box is not None:
+            moved_box = tuple(slice(local.start + axis_box.start, local.stop + axis_box.start)
+                              for local, axis_box in zip(local_box, box))
+            boxes[index] = union_box([boxes[index], moved_box], shape) if boxes[index] is not None else moved_box
+
+
+def image_statistics(img, reg):
+    """
+    calculates the statistics regrow_after_seed_edit keeps up to date, so the regions that reach out of the grown box
+    keep the means of all their pixels
+    :param img: intensity values (2D/3D array, with an additional last axis for several channels)
+    :param reg: region numbers after region growing (2D/3D array)
+    :return: intensity sums and pixel counts of the regions (see seeded_region_growing.region_statistics), maximal
+    intensity (see seeded_region_growing.maximal_intensity) (list)
+    """
+    return list(srg.region_statistics(img, reg)) + [srg.maximal_intensity(img, reg)]
+
+
+def change_statistics(region_sums, region_counts, img_box, reg_box, sign):
+    """
+    adds the pixels of a box to the statistics of their regions or subtracts them, pixels with region number 0 are
+    left out
+    :param region_sums: intensity sums, the region number is the index, changed in place (1D/2D array)
+    :param region_counts: pixel counts, the region number is the index, changed in place (1D array)
+    :param img_box: intensity values inside the box (2D/3D array, with an additional last axis for several channels)
+    :param reg_box: region numbers inside the box (2D/3D array)
+    :param sign: 1 adds the pixels, -1 subtracts them (int)
+    :return: region_sums, region_counts, enlarged for region numbers they did not have (1D/2D array, 1D array)
+    """
+    box_sums, box_counts = srg.region_statistics(img_box, reg_box)
+    if box_counts.size > region_counts.size:
+        region_sums = np.pad(region_sums, ((0, box_counts.size - region_counts.size),) + ((0, 0),) *
+                             (region_sums.ndim - 1))
+        region_counts = np.pad(region_counts, (0, box_counts.size - region_counts.size))
+    region_sums[1:box_counts.size] += sign * box_sums[1:]
+    region_counts[1:box_counts.size] += sign * box_counts[1:]
+    return region_sums, region_counts
+
+
+def regrow_after_seed_edit(img, reg, seeds, added_seeds=(), removed_seeds=(), connectivity=4, boxes=None,
+                           statistics=None):
+    """
+    updates a region growing result after seeds were added or removed without growing the whole image again:
+    the touched regions and their neighbors are cleared and grown again from their seeds, the regions around them keep
+    their pixels and take part in the growth into the cleared area with their pixels in the box around it,
+    so the growth only processes the pixels of the cleared area, with boxes and statistics only the pixels in the boxes
+    of the edited regions are read, the growth uses the means of all pixels of the regions like a growth of the whole
+    image
+    :param img: intensity values (2D/3D array, with an additional last axis for several channels)
+    :param reg: region numbers after region growing, changed in place if the new region numbers fit into its dtype
+    (2D/3D array)
+    :param seeds: region numbers of the seeds that reg was grown from, changed in place if the new region numbers
+    fit into its dtype (2D/3D array)
+    :param added_seeds: pixels that become new seeds, every pixel is a new region (list of tuples)
+    :param removed_seeds: pixels of seeds that are removed together with their seed region (list of tuples)
+    :param connectivity: 4, 8 (2D), 6, 26 (3D) or a footprint (int or array), see connectivity.neighbor_offsets
+    :param boxes: box of every region of reg, updated in place for the next edit, None calculates them
+    (list of tuples of slices, see region_boxes)
+    :param statistics: statistics of the regions of reg, updated in place for the next edit, None calculates them
+    (list, see image_statistics)
+    :return: reg: updated region numbers (2D/3D array), seeds: updated seeds (2D/3D array)
+    """
+    if boxes is None:
+        boxes = region_boxes(reg)
+    if statistics is None:
+        statistics = image_statistics(img, reg)
+    seeds, touched = edit_seeds(seeds, reg, added_seeds, removed_seeds, boxes)
+    reg = reg.astype(np.promote_types(reg.dtype, seeds.dtype), copy=False)
+    box, affected_box = affected_pixels(reg, touched, added_seeds, connectivity, boxes)
+    if box is None:
+        return reg, seeds
+
+    img_box = img[box]
+    reg_box = np.array(reg[box])
+    regions_before = np.unique(reg_box)
+    region_sums, region_counts = change_statistics(statistics[0], statistics[1], img_box,
+                                                   np.where(affected_box, reg_box, 0), -1)
+    reg_box[affected_box] = seeds[box][affected_box]
+    seed_sums, seed_counts = change_statistics(region_sums.copy(), region_counts.copy(), img_box,
+                                               np.where(affected_box, reg_box, 0), 1)
+    reg[box] = hrg.region_growing(img_box, reg_box, connectivity,
+                                  statistics=(seed_sums, seed_counts, statistics[2]))
+    statistics[:2] = change_statistics(region_sums, region_counts, img_box, np.where(affected_box, reg[box], 0), 1)
+    update_region_boxes(boxes, reg[box], box, regions_before, reg.shape)
+    return reg, seeds
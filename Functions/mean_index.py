@@ -0,0 +1,122 @@
+from bisect import bisect_left, insort
+
+MEAN_INDEX_BLOCK_SIZE = 512
+
+
+def split_block(mean_index, b):
+    """
+    splits a block of the index of region means in two if it has more than 2 * MEAN_INDEX_BLOCK_SIZE entries
+    :param mean_index: sorted blocks of (mean, region number) (list of lists of tuples)
+    :param b: index of the block (int)
+    :return: None
+    """
+    block = mean_index[b]
+    if len(block) > 2 * MEAN_INDEX_BLOCK_SIZE:
+        mean_index[b:b + 1] = [block[:MEAN_INDEX_BLOCK_SIZE], block[MEAN_INDEX_BLOCK_SIZE:]]
+
+
+def find_block(mean_index, entry):
+    """
+    finds the first block whose last entry is not smaller than an entry by a binary search over the blocks, like
+    bisect_left with a key function, which needs python 3.10
+    :param mean_index: sorted blocks of (mean, region number) (list of lists of tuples)
+    :param entry: (mean, region number) or (mean,) to find the first entry with a mean that is not smaller (tuple)
+    :return: index of the block, the number of blocks if all entries are smaller (int)
+    """
+    low, high = 0, len(mean_index)
+    while low < high:
+        middle = (low + high) // 2
+        if mean_index[middle][-1] < entry:
+            low = middle + 1
+        else:
+            high = middle
+    return low
+
+
+def insert_mean(mean_index, mean, region):
+    """
+    adds a region to the index of region means, the index is ordered by mean and then by region number and is split
+    into blocks of at most 2 * MEAN_INDEX_BLOCK_SIZE entries, so an insertion finds its block and its place in the
+    block by binary searches in O(log(number of regions)) and only moves the entries behind it in its block
+    :param mean_index: sorted blocks of (mean, region number) (list of lists of tuples)
+    :param mean: mean intensity value of the region (float)
+    :param region: region number (int)
+    :return: None
+    """
+    entry = (mean, region)
+    if not mean_index:
+        mean_index.append([entry])
+        return
+    b = min(find_block(mean_index, entry), len(mean_index) - 1)
+    insort(mean_index[b], entry)
+    split_block(mean_index, b)
+
+
+def remove_mean(mean_index, mean, region):
+    """
+    removes a region from the index of region means, like insert_mean in O(log(number of regions)) plus the entries
+    behind it in its block, a block with less than MEAN_INDEX_BLOCK_SIZE / 2 entries is joined with its neighbor
+    :param mean_index: sorted blocks of (mean, region number) (list of lists of tuples)
+    :param mean: mean intensity value of the region when it was added to the index (float)
+    :param region: region number (int)
+    :return: None
+    """
+    entry = (mean, region)
+    b = find_block(mean_index, entry)
+    block = mean_index[b]
+    del block[bisect_left(block, entry)]
+    if len(block) < MEAN_INDEX_BLOCK_SIZE // 2 and len(mean_index) > 1:
+        b = min(b, len(mean_index) - 2)
+        mean_index[b:b + 2] = [mean_index[b] + mean_index[b + 1]]
+        split_block(mean_index, b)
+    elif not block:
+        del mean_index[b]
+
+
+def update_mean(mean_index, old_mean, new_mean, region):
+    """
+    moves a region to its new place in the index of region means after its mean changed, see remove_mean and
+    insert_mean
+    :param mean_index: sorted blocks of (mean, region number) (list of lists of tuples)
+    :param old_mean: mean intensity value of the region in the index (float)
+    :param new_mean: new mean intensity value of the region (float)
+    :param region: region number (int)
+    :return: None
+    """
+    if new_mean != old_mean:
+        remove_mean(mean_index, old_mean, region)
+        insert_mean(mean_index, new_mean, region)
+
+
+def nearest_mean(mean_index, intensity):
+    """
+    finds the region with the mean closest to an intensity value with binary searches instead of comparing all
+    regions, for equal distances the smallest region number is used like np.argmin over the means of all regions
+    :param mean_index: sorted blocks of (mean, region number) (list of lists of tuples)
+    :param intensity: intensity value of the pixel (float)
+    :return: distance to the closest mean (float), region number (int), inf and 0 for an empty index
+    """
+    distance, region = float("inf"), 0
+    if not mean_index:
+        return distance, region
+    b = min(find_block(mean_index, (intensity,)), len(mean_index) - 1)
+    i = bisect_left(mean_index[b], (intensity,))
+    # the distances grow away from i on both sides, equal distances further away can only come from equal means or
+    # from rounding, so the search stops at the first larger distance
+    for step, j in ((1, i), (-1, i - 1)):
+        block_index, block = b, mean_index[b]
+        while True:
+            if not 0 <= j < len(block):  # continues in the next block in the direction of the search
+                block_index += step
+                if not 0 <= block_index < len(mean_index):
+                    break
+                block = mean_index[block_index]
+                j = 0 if step == 1 else len(block) - 1
+            candidate_mean, candidate_region = block[j]
+            candidate_distance = abs(intensity - candidate_mean)
+            if candidate_distance > distance:
+                break
+            if candidate_distance < distance or candidate_region < region:
+                distance, region = candidate_distance, candidate_region
+            j += step
+    return distance, region
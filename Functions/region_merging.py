@@ -1,240 +1,453 @@
+import heapq
 import numpy as np
-from Functions import image_processing as ip
 from Functions import seeded_region_growing as srg
+from Functions import connectivity as con
+from Functions import compiled_kernels as ck
+from Functions import checkpoint as cp
+
+
+def region_adjacency(reg, connectivity=4):
+    """
+    finds all pairs of touching regions in one vectorized pass: the region array is compared with its shifted views
+    once per direction (opposite directions give the same pairs), the pairs of different regions are packed into one
+    number and made unique, which also counts the length of the shared boundary,
+    the array is read in blocks along the first axis (see seeded_region_growing.block_length), so the temporary arrays
+    have the size of a block and not of the whole array
+    :param reg: array with region numbers (2D/3D array)
+    :param connectivity: 4, 8 (2D), 6, 26 (3D) or a footprint (int or array), see connectivity.neighbor_offsets
+    :return: smaller region number -1 of every pair (1D array), larger region number -1 of every pair (1D array),
+    number of neighboring pixel pairs between the two regions (1D array), the pairs are sorted
+    """
+    pair_base = int(np.amax(reg)) + 1
+    offsets = con.undirected_offsets(con.neighbor_offsets(connectivity))
+    reach = int(np.amax(offsets[:, 0])) if len(offsets) else 0  # the first element of the offsets is never negative
+    rows = srg.block_length(reg.shape)
+    keys = [np.zeros(0, np.int64)]
+    boundary_lengths = [np.zeros(0, int)]
+    for start in range(0, reg.shape[0], rows):
+        window = np.asarray(reg[start:start + rows + reach])
+        block_keys = [np.zeros(0, np.int64)]
+        for offset in offsets:
+            regions, neighboring_regions = con.shifted_views(window, offset)
+            # a pair belongs to the block of its first pixel, the rows after the block only hold neighbors
+            regions, neighboring_regions = regions[:rows], neighboring_regions[:rows]
+            touching = (regions != neighboring_regions) & (regions != 0) & (neighboring_regions != 0)
+            regions = regions[touching].astype(np.int64)
+            neighboring_regions = neighboring_regions[touching].astype(np.int64)
+            block_keys.append(np.minimum(regions, neighboring_regions) * pair_base +
+                              np.maximum(regions, neighboring_regions))
+        block_keys, block_lengths = np.unique(np.concatenate(block_keys), return_counts=True)
+        keys.append(block_keys)
+        boundary_lengths.append(block_lengths)
+    keys, pairs = np.unique(np.concatenate(keys), return_inverse=True)
+    boundary_lengths = np.bincount(pairs, weights=np.concatenate(boundary_lengths), minlength=keys.size).astype(int)
+    return keys // pair_base - 1, keys % pair_base - 1, boundary_lengths
+
+
+def find_neighboring_regions(reg, connectivity=4):
+    """
+    determines adjacent regions of every region as sparse adjacency graph, so the memory grows with the number of
+    touching pairs and not with the square of the number of regions
+    :param reg: array with region numbers (2D/3D array)
+    :param connectivity: 4, 8 (2D), 6, 26 (3D) or a footprint (int or array), see connectivity.neighbor_offsets
+    :return: one set of neighboring regions per region, region number -1 is the index of the list and the elements
+    of the sets. Example: 4 is a neighbor of 2: 3 in inter_region_neighbors[1] and 1 in inter_region_neighbors[3]
+    (list of sets)
+    """
+    inter_region_neighbors = [set() for _ in range(int(np.amax(reg)))]
+    first_regions, second_regions, _ = region_adjacency(reg, connectivity)
+    for region, neighbor in zip(first_regions.tolist(), second_regions.tolist()):
+        inter_region_neighbors[region].add(neighbor)
+        inter_region_neighbors[neighbor].add(region)
+    return inter_region_neighbors
 
 
-def find_neighboring_regions(reg):
+def pack_neighbors(inter_region_neighbors):
     """
-    determines adjacent regions of every region in an array where columns and row represent regions
-    :param reg: array with region numbers (2D array)
-    :return: 2D array where the rows are the regions and the columns are the neighboring regions.
-    If a region is a neighbor, True is written in the cell, if not False. Example: 4 is a neighbor of 2: row 2 col 4: 1
-    At the beginning, this array is symmetrical (2D array)
+    stores the neighbor sets in two arrays like the rows of a compressed sparse matrix, for checkpoints and kernels
+    :param inter_region_neighbors: one set of neighboring regions per region (list of sets)
+    :return: start of the neighbors of every region and the end of the last one (1D int64 array),
+    sorted neighbors of all regions (1D int64 array)
     """
-    max_region = max(reg.flatten())
-    inter_region_neighbors = np.full((int(max_region), int(max_region)), False)
-    for region_number in range(1, int(max_region) + 1):
-        neighboring_regions = find_neighbors_one_region(reg, region_number)
-        inter_region_neighbors[int(region_number) - 1, neighboring_regions - 1] = True
-    return inter_region_neighbors
+    offsets = np.zeros(len(inter_region_neighbors) + 1, np.int64)
+    offsets[1:] = np.cumsum([len(neighbors) for neighbors in inter_region_neighbors])
+    packed = [neighbor for neighbors in inter_region_neighbors for neighbor in sorted(neighbors)]
+    return offsets, np.asarray(packed, np.int64)
 
 
-def find_neighbors_one_region(reg, region_number):
+def pack_adjacency(first_regions, second_regions, number_of_regions):
     """
-    finds all neighbors for a specific region (region_number)
-    :param reg: array with region numbers (2D array)
-    :param region_number: number of a region (int)
-    :return: array with all region numbers of neighbors from region_number (1D array)
+    stores the pairs of region_adjacency like pack_neighbors without building the neighbor sets
+    :param first_regions: smaller region number -1 of every pair (1D array)
+    :param second_regions: larger region number -1 of every pair (1D array)
+    :param number_of_regions: number of regions (int)
+    :return: start of the neighbors of every region and the end of the last one (1D int64 array),
+    sorted neighbors of all regions (1D int64 array)
     """
-    neighboring_regions = np.zeros((reg.shape[0] + 2, reg.shape[1] + 2))
-    reg_with_border = ip.add_border(reg)
-    reg_with_border = reg_with_border.astype(int)
-    pos_pixel_region = np.where(reg_with_border == region_number)
-    neighboring_regions[pos_pixel_region[0], pos_pixel_region[1] - 1] = reg_with_border[
-        pos_pixel_region[0], pos_pixel_region[1] - 1]
-    neighboring_regions[pos_pixel_region[0], pos_pixel_region[1] + 1] = reg_with_border[
-        pos_pixel_region[0], pos_pixel_region[1] + 1]
-    neighboring_regions[pos_pixel_region[0] - 1, pos_pixel_region[1]] = reg_with_border[
-        pos_pixel_region[0] - 1, pos_pixel_region[1]]
-    neighboring_regions[pos_pixel_region[0] + 1, pos_pixel_region[1]] = reg_with_border[
-        pos_pixel_region[0] + 1, pos_pixel_region[1]]
+    regions = np.concatenate((first_regions, second_regions))
+    neighbors = np.concatenate((second_regions, first_regions))
+    order = np.lexsort((neighbors, regions))
+    offsets = np.zeros(number_of_regions + 1, np.int64)
+    offsets[1:] = np.cumsum(np.bincount(regions, minlength=number_of_regions))
+    return offsets, neighbors[order].astype(np.int64)
+
 
-    neighboring_regions[pos_pixel_region[0], pos_pixel_region[1]] = 0
-    neighboring_regions_unique = np.unique(neighboring_regions.flatten())
-    pos_zero = np.where(neighboring_regions_unique == 0)
-    neighboring_regions_unique = np.delete(neighboring_regions_unique, pos_zero[0])
-    neighboring_regions_unique = neighboring_regions_unique.astype(int)
-    return neighboring_regions_unique
+def unpack_neighbors(offsets, packed):
+    """
+    restores the neighbor sets stored by pack_neighbors
+    :param offsets: start of the neighbors of every region and the end of the last one (1D array)
+    :param packed: neighbors of all regions (1D array)
+    :return: one set of neighboring regions per region (list of sets)
+    """
+    packed = packed.tolist()
+    offsets = offsets.tolist()
+    return [set(packed[start:stop]) for start, stop in zip(offsets[:-1], offsets[1:])]
 
 
-def region_distance(img, reg):
+def region_distance(img, reg, connectivity=4, norm=2):
     """
     calculates distance between all regions
-    :param img: intensity values (2D array)
-    :param reg: region numbers (2D array)
-    :return: 2D array with distances between all regions, only in upper triangle
-    (region numbers are row and col number)
-    inter_region_distances is upper triangle matrix with mean intensity distances between regions (2D array)
+    :param img: intensity values (2D/3D array, with an additional last axis for several channels)
+    :param reg: region numbers (2D/3D array)
+    :param connectivity: 4, 8 (2D), 6, 26 (3D) or a footprint (int or array), see connectivity.neighbor_offsets
+    :param norm: order of the norm that combines the channels, e.g. 1, 2 or np.inf (see np.linalg.norm)
+    :return: distances between neighboring regions, only pairs without distance are no neighbors
+    inter_region_distances: mean intensity distances with the pair (smaller region, larger region) as key, both
+    region number -1, regions with equal means start with distance 1 (dict)
     mean values of all regions (list of floats)
-    inter_region_neighbors: all neighbors have 1 in an array where region numbers are row and col numbers (2D array)
+    inter_region_neighbors: one set of neighboring regions per region (list of sets, see find_neighboring_regions)
     """
-    max_region = int(max(reg.flatten()))
-    max_intensity = np.amax(img)
-    inter_region_distances = np.ones((max_region, max_region))
+    max_intensity = srg.maximal_intensity(img, reg)
     means = srg.mean_region(img, reg)
-    inter_region_neighbors = find_neighboring_regions(reg)
+    inter_region_neighbors = find_neighboring_regions(reg, connectivity)
 
-    for row_number in range(0, int(max_region)):
-        neighboring_regions = np.where(inter_region_neighbors[row_number, :] == 1)[0]
+    inter_region_distances = {}
+    for row_number, neighboring_regions in enumerate(inter_region_neighbors):
         for col_number in neighboring_regions:
-            inter_region_distances[row_number][col_number] = distance_between_regions(row_number, col_number,
-                                                                                      max_intensity, means)
-    inter_region_distances = np.triu(inter_region_distances)
-    lower_triangle = np.where(inter_region_distances == 0)
-    inter_region_distances[lower_triangle[0], lower_triangle[1]] = 1
+            if col_number > row_number:
+                distance = distance_between_regions(row_number, col_number, max_intensity, means, norm)
+                inter_region_distances[(row_number, col_number)] = distance if distance != 0 else 1.
     return inter_region_distances, means, inter_region_neighbors
 
 
-def distance_between_regions(region1, region2, max_intensity, means):
+def distance_between_regions(region1, region2, max_intensity, means, norm=2):
     """
     calculates the distance between two regions
     :param region1: number of region1 -1 (matches the index in the distance, neighbors array, region 1 has index 0, int)
     :param region2: number of region1 -2 (matches the index in the distance, neighbors array, region 1 has index 0, int)
-    :param max_intensity: maximal intensity (float)
-    :param means: list of means (list of floats)
+    :param max_intensity: maximal intensity (float, 1D array for several channels)
+    :param means: list of means (list of floats, list of 1D arrays for several channels)
+    :param norm: order of the norm that combines the channels, e.g. 1, 2 or np.inf (see np.linalg.norm)
     :return: distance between the two regions (float)
     """
-    distance = abs(means[region1] - means[region2]) / max_intensity
+    distance = srg.channel_distance((means[region1] - means[region2]) / max_intensity, np.ndim(max_intensity) > 0,
+                                    norm)
     return distance
 
 
-def one_merged_region_mean(img, reg, region_number):
-    """
-    calculates the mean of changed region
-    :param img: intensity values (2D array)
-    :param reg: region numbers (2D array)
-    :param region_number: number of the changed region (int)
-    :return: mean value of changed position (float)
-    """
-    pos_new_reg = np.where(reg == region_number)
-    single_mean = np.mean(img[pos_new_reg[0], pos_new_reg[1]])
-    return single_mean
-
-
-def region_distance_new(img, reg, pos_min_dist, means, inter_region_distances, inter_region_neighbors):
-    """
-    updates array of distances of mean intensity values between all changed regions
-    :param img: intensity values (2D array)
-    :param reg: region numbers (2D array)
-    :param pos_min_dist: tuple with the smallest distance (coordinates are the two regions, both -1 to match the index)
-    :param means: mean values of all regions (list of floats)
-    :param inter_region_distances: distances between mean intensity values of regions (2D array)
-    :param inter_region_neighbors: rows are the regions and the columns are the neighboring regions (2D array)
-    :return: inter_region_distances: updated distances between mean intensity values of regions (2D array)
-    """
-    maximal_intensity = np.amax(img)
-    changed_region1 = int(pos_min_dist[0])  # new region is region 1
-    changed_region2 = int(pos_min_dist[1])
-    means = update_mean_values(means, changed_region1, changed_region2, img, reg)
-    inter_region_distances = update_distances(changed_region1, changed_region2, inter_region_distances, means,
-                                              maximal_intensity, inter_region_neighbors)
-    return inter_region_distances
-
-
 def update_distances(changed_region1, changed_region2, inter_region_distances, means, maximal_intensity,
-                     inter_region_neighbors):
+                     inter_region_neighbors, norm=2, queue=None):
     """
-    updates distance values of changed regions, value 1 for removed regions
+    updates distance values of changed regions, the pairs of removed regions are deleted
     :param changed_region1: resulting region number for merged region (-1 to match the index) (int)
     :param changed_region2: region number which is going to be removed (-1 to match the index) (int)
-    :param inter_region_distances: distances between mean intensity values of regions (2D array)
+    :param inter_region_distances: distances between mean intensity values of neighboring regions (dict)
     :param means: mean intensity values of regions (list)
-    :param maximal_intensity: maximal intensity value of image (float)
-    :param inter_region_neighbors: rows are the regions and the columns are the neighboring regions (2D array)
-    :return: updated inter_region distances (2D array)
-    """
-    neighboring_regions = np.where(inter_region_neighbors[changed_region1, :] != 0)[0]
-    for element in neighboring_regions:
-        if element > changed_region1:
-            inter_region_distances[changed_region1, element] = distance_between_regions(changed_region1, element,
-                                                                                        maximal_intensity, means)
-        elif element < changed_region1:
-            inter_region_distances[element, changed_region1] = distance_between_regions(changed_region1, element,
-                                                                                        maximal_intensity, means)
-    inter_region_distances[changed_region2, :] = 1
-    inter_region_distances[:, changed_region2] = 1
+    :param maximal_intensity: maximal intensity value of image (float, 1D array for several channels)
+    :param inter_region_neighbors: one set of neighboring regions per region, already updated by
+    update_neighboring_regions (list of sets)
+    :param norm: order of the norm that combines the channels, e.g. 1, 2 or np.inf (see np.linalg.norm)
+    :param queue: merge queue that gets the new distances, None for no queue (list, see merge_queue)
+    :return: updated inter_region distances (dict)
+    """
+    for element in inter_region_neighbors[changed_region1]:
+        pair = (min(changed_region1, element), max(changed_region1, element))
+        distance = distance_between_regions(changed_region1, element, maximal_intensity, means, norm)
+        inter_region_distances[pair] = distance
+        if queue is not None and distance == distance:
+            heapq.heappush(queue, (distance,) + pair)
+    # the former neighbors of the removed region are neighbors of the merged region now
+    for element in inter_region_neighbors[changed_region1] | {changed_region1}:
+        inter_region_distances.pop((min(changed_region2, element), max(changed_region2, element)), None)
     return inter_region_distances
 
 
 def update_neighboring_regions(inter_region_neighbors, changed_region1, changed_region2):
     """
     updates neighboring regions of changed regions
-    :param inter_region_neighbors: all neighbors have values from 1 or higher in an array where region numbers are row
-    and col numbers (2D array)
+    :param inter_region_neighbors: one set of neighboring regions per region (list of sets)
     :param changed_region1: merged region number (-1 to match the index) (int)
     :param changed_region2: region that doesn't exist anymore because of merging (-1 to match the index) (int)
-    :return: updated inter_region_neighbors (2D array)
-    """
-    neighbors_changed_region2 = np.where(inter_region_neighbors[changed_region2, :] == 1)[0]
-    inter_region_neighbors[neighbors_changed_region2, changed_region1] = 1
-    inter_region_neighbors[changed_region1, neighbors_changed_region2] = 1
-    inter_region_neighbors[changed_region2, :] = 0
-    inter_region_neighbors[:, changed_region2] = 0
-    inter_region_neighbors[changed_region1, changed_region1] = 0
+    :return: updated inter_region_neighbors (list of sets)
+    """
+    for region in inter_region_neighbors[changed_region2]:
+        inter_region_neighbors[region].discard(changed_region2)
+        inter_region_neighbors[region].add(changed_region1)
+    inter_region_neighbors[changed_region1] |= inter_region_neighbors[changed_region2]
+    inter_region_neighbors[changed_region2] = set()
+    inter_region_neighbors[changed_region1].discard(changed_region1)
+    inter_region_neighbors[changed_region1].discard(changed_region2)
     return inter_region_neighbors
 
 
-def update_mean_values(means, changed_region1, changed_region2, img, reg):
+def update_mean_values(means, changed_region1, changed_region2, region_sums, region_counts):
     """
-    updates mean value for merged regions in list of mean values, value 500 for unused means
+    updates mean value for merged regions in list of mean values from the intensity sums and pixel counts of the
+    regions, so the pixels of the merged region are not searched, value 500 for unused means
     :param means: means of intensity for regions (list of floats)
     :param changed_region1: region number for merged region (-1 to match the index) (int)
     :param changed_region2: region number to be removed (-1 to match the index) (int)
-    :param img: intensity values (2D array)
-    :param reg: region numbers (2D array)
-    :return: updated list of means (list of floats)
-    """
-    means[changed_region2] = 500
-    means[int(changed_region1)] = one_merged_region_mean(img, reg, int(changed_region1) + 1)
+    :param region_sums: intensity sums of all regions, updated in place, region number -1 is the index (1D/2D array)
+    :param region_counts: pixel counts of all regions, updated in place, region number -1 is the index (1D array)
+    :return: updated list of means (list of floats, list of 1D arrays for several channels)
+    """
+    region_sums[changed_region1] += region_sums[changed_region2]
+    region_counts[changed_region1] += region_counts[changed_region2]
+    means[changed_region2] = 500 if np.ndim(means[changed_region2]) == 0 else np.full(len(means[changed_region2]), 500.)
+    means[int(changed_region1)] = region_sums[changed_region1] / region_counts[changed_region1]
     return means
 
 
-def position_of_minimal_distance(inter_region_distances, min_distance):
+def find_merged_region(merged_into, region):
     """
-    searches the two regions with the minimal difference of the intensity value
-    :param inter_region_distances: distances between mean intensity values of regions (2D array)
-    :param min_distance: minimum of inter_region_distance array (float)
-    :return: tuple with the position that shows the regions with the minimal distance mean (both - to match the index)
+    follows the merges of a region to the region it belongs to now, the path is shortened for the next search
+    :param merged_into: region every region was merged into, the region itself if it was not merged
+    (region number -1 is the index and the value, list of ints)
+    :param region: region number -1 (int)
+    :return: region number -1 of the region it belongs to now (int)
     """
-    minimal_distances = np.where(inter_region_distances == min_distance)
-    pos_min_dist = list(zip(minimal_distances[0], minimal_distances[1]))[0]
-    pos_min_dist = (int(pos_min_dist[0]), int(pos_min_dist[1]))
-    return pos_min_dist
+    root = region
+    while merged_into[root] != root:
+        root = merged_into[root]
+    while merged_into[region] != root:
+        merged_into[region], region = root, merged_into[region]
+    return root
 
 
-def updates_region_numbers(inter_region_distances, reg, min_distance):
+def merge_regions(merged_into, changed_region1, changed_region2):
     """
-    changes region number to region number of merged region
-    :param inter_region_distances: distances between mean intensity values of regions (2D array)
-    :param reg: region numbers (2D array)
-    :param min_distance: minimal distance of mean intensity values between the regions (float)
-    :return: reg: updated region numbers (2D array)
-    :return: pos_min_dist: position of minimal distance in inter_region_distances array (tuple)
+    records that a region was merged into another one instead of changing its pixels (union-find),
+    the pixels are changed once at the end by relabel_merged_regions
+    :param merged_into: region every region was merged into (list of ints)
+    :param changed_region1: region number for merged region (-1 to match the index) (int)
+    :param changed_region2: region number to be removed (-1 to match the index) (int)
+    :return: updated merged_into (list of ints)
+    """
+    merged_into[find_merged_region(merged_into, changed_region2)] = find_merged_region(merged_into, changed_region1)
+    return merged_into
+
+
+def relabel_merged_regions(reg, merged_into):
+    """
+    changes the region numbers of all merged regions with one lookup table, the remaining regions are numbered from
+    1 to their number in the order of their former region numbers
+    :param reg: array with region numbers, whole numbers of any type (2D/3D array)
+    :param merged_into: region every region was merged into (list of ints)
+    :return: region numbers in the smallest unsigned integer type for them (2D/3D array),
+    former region number -1 of every remaining region, new region number -1 is the index (1D array)
+    """
+    number_of_regions = len(merged_into)
+    final_regions = np.asarray([find_merged_region(merged_into, region) for region in range(number_of_regions)],
+                               np.intp)
+    region_counts = region_pixel_counts(reg, number_of_regions + 1)
+    remaining = np.zeros(number_of_regions, bool)
+    remaining[final_regions[region_counts[1:number_of_regions + 1] > 0]] = True
+    kept_regions = np.flatnonzero(remaining)
+    new_numbers = np.zeros(number_of_regions, np.intp)
+    new_numbers[kept_regions] = np.arange(1, kept_regions.size + 1)
+    lookup_table = np.zeros(number_of_regions + 1, srg.label_dtype(kept_regions.size))
+    lookup_table[1:] = new_numbers[final_regions]
+    relabeled = np.empty(reg.shape, lookup_table.dtype)
+    rows = srg.block_length(reg.shape)
+    for start in range(0, reg.shape[0], rows):
+        relabeled[start:start + rows] = lookup_table[np.asarray(reg[start:start + rows]).astype(np.intp, copy=False)]
+    return relabeled, kept_regions
+
+
+def compact_region_lists(kept_regions, inter_region_neighbors, means):
+    """
+    keeps the neighbors and means of the remaining regions after relabel_merged_regions
+    :param kept_regions: former region number -1 of every remaining region (1D array)
+    :param inter_region_neighbors: one set of neighboring regions per region (list of sets)
+    :param means: mean values of all regions (list of floats)
+    :return: neighbors and means with the new region number -1 as index (list of sets, list)
+    """
+    kept_regions = kept_regions.tolist()
+    new_indices = {region: index for index, region in enumerate(kept_regions)}
+    inter_region_neighbors = [{new_indices[neighbor] for neighbor in inter_region_neighbors[region]}
+                              for region in kept_regions]
+    return inter_region_neighbors, [means[region] for region in kept_regions]
+
+
+def merge_queue(inter_region_distances):
+    """
+    creates the priority queue of the pairs of neighboring regions, ordered by distance and for equal distances by the
+    region numbers of the pair, so the first pair in the order of the region numbers is merged first, nan distances
+    are left out
+    :param inter_region_distances: distances between mean intensity values of neighboring regions (dict)
+    :return: heap of (distance, region1, region2) (list)
+    """
+    queue = [(distance,) + pair for pair, distance in inter_region_distances.items() if distance == distance]
+    heapq.heapify(queue)
+    return queue
+
+
+def pop_minimal_distance(queue, inter_region_distances):
+    """
+    takes the pair with the smallest distance out of the merge queue, a changed distance is pushed as new entry, so
+    entries whose distance does not match inter_region_distances anymore or whose pair was removed are skipped
+    :param queue: heap of (distance, region1, region2) (list, see merge_queue)
+    :param inter_region_distances: distances between mean intensity values of neighboring regions (dict)
+    :return: smallest distance, inf if the queue is empty (float),
+    pair of regions (both -1 to match the index, tuple), None if the queue is empty
     """
-    pos_min_dist = position_of_minimal_distance(inter_region_distances, min_distance)
-    pixel_to_change = np.where(reg == pos_min_dist[1] + 1)
-    #  column in inter_region_distances is region to be changed(column number bigger than row number)
-    pixel_to_change_rows = pixel_to_change[0]
-    pixel_to_change_cols = pixel_to_change[1]
-    reg[pixel_to_change_rows, pixel_to_change_cols] = pos_min_dist[0] + 1
-    return reg, pos_min_dist
+    while queue:
+        distance, region1, region2 = heapq.heappop(queue)
+        if inter_region_distances.get((region1, region2)) == distance:
+            return distance, (region1, region2)
+    return np.inf, None
 
 
-def distance_merging_while(reg, threshold, img):
+def distance_merging_while(reg, threshold, img, connectivity=4, backend=None, norm=2, checkpoint_path=None,
+                           checkpoint_interval=1000, merge_tree=None, kept_regions=None):
     """
     region merging algorithm by similarity of mean intensity values of regions
-    :param reg: region numbers (2D array)
+    :param reg: region numbers (2D/3D array)
     :param threshold: distance intensity value below which regions are merged (float between 0 and 1)
-    :param img: intensity value (2D array)
-    :return: merged regions by intensity similarity (2D array)
-    """
-    inter_region_distances, means, inter_region_neighbors = region_distance(img, reg)
-    min_distance = np.nanmin(inter_region_distances)
-    #  print(np.amax(reg))
-    #  i = 1
+    :param img: intensity value (2D/3D array, with an additional last axis for several channels)
+    :param connectivity: 4, 8 (2D), 6, 26 (3D) or a footprint (int or array), see connectivity.neighbor_offsets
+    :param backend: "auto", "numba" or "numpy", None uses compiled_kernels.DEFAULT_BACKEND (str),
+    images with several channels always use numpy
+    :param norm: order of the norm that combines the channels, e.g. 1, 2 or np.inf (see np.linalg.norm)
+    :param checkpoint_path: file for the state of the merging, if it exists the merging continues from there with the
+    same result as without interruption, it is removed at the end, None for no checkpoints (str)
+    checkpoints are only written by the numpy backend
+    :param checkpoint_interval: number of merges between two checkpoints (int)
+    :param merge_tree: list that gets one (region1, region2, distance, size) tuple per merge, region2 (region number
+    -1) was merged into region1 at this distance and the merged region has size pixels, None for no record, can not be
+    combined with checkpoints (list)
+    :param kept_regions: list that gets the former region number -1 of every remaining region, new region number -1 is
+    the index, None for no record (list)
+    :return: merged regions by intensity similarity, numbered from 1 to the number of regions in the smallest unsigned
+    integer type for them (2D/3D array), one set of neighboring regions per region (list of sets),
+    mean values of all regions (list), region number -1 is the index of both lists
+    """
+    if merge_tree is not None and checkpoint_path is not None:
+        raise ValueError("merge_tree can not be combined with checkpoint_path")
+    region_sums, region_counts = srg.region_statistics(img, reg)
+    if ck.use_numba(backend) and not srg.is_multi_channel(img, reg) and checkpoint_path is None:
+        first_regions, second_regions, _ = region_adjacency(reg, connectivity)
+        neighbor_offsets, neighbor_regions = pack_adjacency(first_regions, second_regions, len(region_counts) - 1)
+        means, merged_into, merge_pairs, merge_distances, merge_sizes = ck.distance_merging(
+            neighbor_offsets, neighbor_regions, region_sums[1:], region_counts[1:], float(np.amax(img)), threshold)
+        if merge_tree is not None:
+            merge_tree.extend(zip(merge_pairs[:, 0].tolist(), merge_pairs[:, 1].tolist(), merge_distances.tolist(),
+                                  merge_sizes.tolist()))
+        reg, kept = relabel_merged_regions(reg, merged_into.tolist())
+        if kept_regions is not None:
+            kept_regions.extend(kept.tolist())
+        # the neighbors of merged regions are the union of their neighbors, which are the neighbors in the result
+        return reg, find_neighboring_regions(reg, connectivity), means[kept].tolist()
+    region_sums, region_counts = region_sums[1:], region_counts[1:]
+    maximal_intensity = srg.maximal_intensity(img, reg)
+    fingerprint = None if checkpoint_path is None else cp.run_fingerprint(
+        "region_merging.distance_merging_while", img, reg, connectivity=con.neighbor_offsets(connectivity), norm=norm,
+        threshold=threshold)
+    state = cp.load_checkpoint(checkpoint_path, reg.shape, fingerprint)
+    if state is not None:
+        inter_region_distances = dict(zip(map(tuple, state["distance_pairs"].tolist()), state["distances"].tolist()))
+        inter_region_neighbors = unpack_neighbors(state["neighbor_offsets"], state["neighbors"])
+        means = list(state["means"])
+        merged_into = state["merged_into"].tolist()
+        region_sums, region_counts = state["sums"], state["counts"]
+    else:
+        inter_region_distances, means, inter_region_neighbors = region_distance(img, reg, connectivity, norm)
+        merged_into = list(range(len(means)))
+    queue = merge_queue(inter_region_distances)  # only the pairs of a merged region are added, not all pairs
+    min_distance, pos_min_dist = pop_minimal_distance(queue, inter_region_distances)
+    merges = 0
     while minimal_distance_is_similar(threshold, min_distance):
-        #  i += 1
-        #  if i % 100 == 0:
-            #  print(i)
-
-        reg, pos_min_dist = updates_region_numbers(inter_region_distances, reg, min_distance)
+        merged_into = merge_regions(merged_into, pos_min_dist[0], pos_min_dist[1])
         inter_region_neighbors = update_neighboring_regions(inter_region_neighbors, pos_min_dist[0], pos_min_dist[1])
-        inter_region_distances = region_distance_new(img, reg, pos_min_dist, means, inter_region_distances,
-                                                     inter_region_neighbors)
-        min_distance = np.nanmin(inter_region_distances)
+        means = update_mean_values(means, pos_min_dist[0], pos_min_dist[1], region_sums, region_counts)
+        inter_region_distances = update_distances(pos_min_dist[0], pos_min_dist[1], inter_region_distances, means,
+                                                  maximal_intensity, inter_region_neighbors, norm, queue)
+        if merge_tree is not None:
+            merge_tree.append((pos_min_dist[0], pos_min_dist[1], min_distance, int(region_counts[pos_min_dist[0]])))
+        min_distance, pos_min_dist = pop_minimal_distance(queue, inter_region_distances)
+        merges += 1
+        if checkpoint_path is not None and merges % checkpoint_interval == 0:
+            neighbor_offsets, neighbors = pack_neighbors(inter_region_neighbors)
+            cp.save_checkpoint(checkpoint_path, shape=np.asarray(reg.shape), fingerprint=np.asarray(fingerprint),
+                               merged_into=np.asarray(merged_into, np.int64), sums=region_sums, counts=region_counts,
+                               distance_pairs=np.asarray(list(inter_region_distances), np.int64).reshape(-1, 2),
+                               distances=np.asarray(list(inter_region_distances.values()), float),
+                               neighbor_offsets=neighbor_offsets, neighbors=neighbors, means=np.asarray(means, float))
+    cp.remove_checkpoint(checkpoint_path)
+    reg, kept = relabel_merged_regions(reg, merged_into)
+    if kept_regions is not None:
+        kept_regions.extend(kept.tolist())
+    inter_region_neighbors, means = compact_region_lists(kept, inter_region_neighbors, means)
     return reg, inter_region_neighbors, means
 
 
+def distance_merging_tree(reg, img, threshold=np.inf, connectivity=4, backend=None, norm=2):
+    """
+    runs the region merging by similarity until no neighboring regions are left and records every merge,
+    the threshold only decides when distance_merging_while stops, the merges happen in the same order for every
+    threshold, so its result for any threshold can be cut from this tree by cut_merging_tree without merging again,
+    the distances are not sorted (a merge changes the mean of the merged region, so a later pair can be closer than
+    an earlier one), the sizes grow along the merges of every region
+    :param reg: region numbers (2D/3D array)
+    :param img: intensity value (2D/3D array, with an additional last axis for several channels)
+    :param threshold: largest threshold the tree is cut at, the merging stops there, inf merges until no neighboring
+    regions are left (float)
+    :param connectivity: 4, 8 (2D), 6, 26 (3D) or a footprint (int or array), see connectivity.neighbor_offsets
+    :param backend: "auto", "numba" or "numpy", None uses compiled_kernels.DEFAULT_BACKEND (str)
+    :param norm: order of the norm that combines the channels, e.g. 1, 2 or np.inf (see np.linalg.norm)
+    :return: merged pairs (region1, region2) in the order of the merges, region2 was merged into region1,
+    region number -1 (2D array), distance of the pair at the time of the merge (1D array),
+    number of pixels of the merged region (1D array)
+    """
+    merge_tree = []
+    distance_merging_while(reg, threshold, img, connectivity, backend, norm, merge_tree=merge_tree)
+    merge_pairs = np.asarray([merge[:2] for merge in merge_tree], np.int64).reshape(-1, 2)
+    merge_distances = np.asarray([merge[2] for merge in merge_tree], float)
+    merge_sizes = np.asarray([merge[3] for merge in merge_tree], np.int64)
+    return merge_pairs, merge_distances, merge_sizes
+
+
+def cut_merging_tree(reg, img, merge_pairs, merge_distances, threshold, connectivity=4, statistics=None):
+    """
+    produces the result of distance_merging_while for a threshold from the tree of distance_merging_tree:
+    distance_merging_while stops at the first merge that is not below the threshold, the merges before it are repeated
+    with the union-find and the running sums, which costs O(number of regions) and not a new merging
+    :param reg: region numbers the tree was calculated for (2D/3D array)
+    :param img: intensity value (2D/3D array, with an additional last axis for several channels)
+    :param merge_pairs: merged pairs in the order of the merges, region number -1 (2D array)
+    :param merge_distances: distance of the pair at the time of the merge (1D array)
+    :param threshold: distance intensity value below which regions are merged, at most the threshold of the tree
+    (float between 0 and 1)
+    :param connectivity: 4, 8 (2D), 6, 26 (3D) or a footprint (int or array), see connectivity.neighbor_offsets
+    :param statistics: intensity sums and pixel counts of srg.region_statistics for reg, they are not changed,
+    None calculates them (tuple of arrays)
+    :return: merged regions, neighbors and means like distance_merging_while (2D/3D array, list of sets, list)
+    """
+    not_similar = np.flatnonzero(~(merge_distances < threshold))
+    number_of_merges = int(not_similar[0]) if not_similar.size else len(merge_distances)
+    region_sums, region_counts = srg.region_statistics(img, reg) if statistics is None else statistics
+    region_sums, region_counts = region_sums[1:].copy(), region_counts[1:].copy()
+    with np.errstate(invalid='ignore', divide='ignore'):  # empty regions get the mean nan like in srg.mean_region
+        means = list(region_sums / region_counts.reshape((-1,) + (1,) * (region_sums.ndim - 1)))
+    merged_into = list(range(len(means)))
+    for region1, region2 in merge_pairs[:number_of_merges].tolist():
+        merged_into = merge_regions(merged_into, region1, region2)
+        means = update_mean_values(means, region1, region2, region_sums, region_counts)
+    reg, kept_regions = relabel_merged_regions(reg, merged_into)
+    # the neighbors of merged regions are the union of their neighbors, which are the neighbors in the result
+    return reg, find_neighboring_regions(reg, connectivity), [means[region] for region in kept_regions.tolist()]
+
+
 def minimal_distance_is_similar(threshold, min_distance):
     """
     compares minimal distance between 2 regions to a threshold
@@ -247,69 +460,99 @@ def minimal_distance_is_similar(threshold, min_distance):
     return False
 
 
+def region_pixel_counts(reg, minlength=0):
+    """
+    counts the pixels of every region, the array is read in blocks along the first axis like
+    seeded_region_growing.region_statistics, so it is not copied as a whole
+    :param reg: array with region numbers (2D/3D array)
+    :param minlength: smallest length of the result (int)
+    :return: number of pixels of every region, the region number is the index (1D array)
+    """
+    rows = srg.block_length(reg.shape)
+    region_counts = np.zeros(minlength, int)
+    for start in range(0, reg.shape[0], rows):
+        labels = np.asarray(reg[start:start + rows]).astype(np.intp, copy=False).ravel()
+        block_counts = np.bincount(labels, minlength=region_counts.size)
+        block_counts[:region_counts.size] += region_counts
+        region_counts = block_counts
+    return region_counts
+
+
 def calculate_regions_size(regions):
     """
     calculates number of assigned pixels of every region
-    :param regions: array with region numbers (2D array)
+    :param regions: array with region numbers (2D/3D array)
     :return: array with region size of every region (1D array with ints) (index is -1: region 1 has index 0)
     if region is empty because it is already merged to another one the value nan is assigned (no merging)
     """
-    max_region = np.amax(regions)
-    region_sizes = []
-    for region_number in range(1, int(max_region) + 1):
-        region_count = np.sum(regions == region_number)
-        region_sizes.append(region_count)
-    region_sizes = np.asarray(region_sizes, float)
+    region_sizes = region_pixel_counts(regions)[1:].astype(float)  # one pass for all
     pos_empty_regions = np.where(region_sizes == 0)[0]
     region_sizes[pos_empty_regions] = np.nan
     return region_sizes
 
 
-def find_smallest_region(region_sizes):
+def size_queue(region_sizes):
+    """
+    creates the priority queue of the regions, ordered by size and for equal sizes by region number, so the smallest
+    region with the lowest region number is merged first, empty regions (nan) are left out
+    :param region_sizes: array of size of every region (1D array)
+    :return: heap of (size, region number -1) (list)
+    """
+    queue = [(size, region) for region, size in enumerate(region_sizes.tolist()) if size == size]
+    heapq.heapify(queue)
+    return queue
+
+
+def pop_smallest_region(queue, region_sizes):
     """
-    determines smallest region
-    :param region_sizes: array of size of every region (1D array with ints)
-    :return: region number of the smallest region (int) (-1 to match index)
+    takes the smallest region out of the size queue, a changed size is pushed as new entry, so entries whose size does
+    not match region_sizes anymore are skipped
+    :param queue: heap of (size, region number -1) (list, see size_queue)
+    :param region_sizes: array of size of every region, nan for merged regions (1D array)
+    :return: size, inf if the queue is empty (float), region number -1, None if the queue is empty (int)
     """
-    smallest_size = np.nanmin(region_sizes)
-    smallest_region = np.where(region_sizes == smallest_size)[0]
-    smallest_region = smallest_region[0]
-    return smallest_region
+    while queue:
+        size, region = heapq.heappop(queue)
+        if region_sizes[region] == size:
+            return size, region
+    return np.inf, None
 
 
-def find_most_similar_region(means, smallest_region, inter_region_neighbors, img):
+def find_most_similar_region(means, smallest_region, inter_region_neighbors, img, norm=2, max_intensity=None):
     """
-    determines the region with the most similar mean intensity value of the smallest region
+    determines the neighboring region with the most similar mean intensity value of the smallest region, for equal
+    distances the smallest region number, a region without neighbors gets the first other region
     :param means: mean values of all regions (list of floats)
     :param smallest_region: region number of the smallest region (int) (-1 to match index)
-    :param inter_region_neighbors: all neighbors have values from 1 or higher in an array where region numbers are row
-    and col numbers (2D array)
-    :param img: array with intensity values (2D array)
+    :param inter_region_neighbors: one set of neighboring regions per region (list of sets)
+    :param img: array with intensity values (2D/3D array, with an additional last axis for several channels)
+    :param norm: order of the norm that combines the channels, e.g. 1, 2 or np.inf (see np.linalg.norm)
+    :param max_intensity: maximal intensity value (int, 1D array for several channels), None calculates it from img
     :return: region number with the most similar mean intensity value of the smallest region (int) (-1 to match index)
     """
-    means = np.asarray(means)
-    max_intensity = int(np.amax(img))
-    distances = np.ones(means.shape)
-    neighboring_regions = np.where(inter_region_neighbors[smallest_region, :] != 0)[0]
-    distances[neighboring_regions] = abs(means[neighboring_regions] - means[smallest_region]) / max_intensity
-    smallest_distance = np.amin(distances)
-    closest_neighbor = np.where(distances == smallest_distance)[0]
-    closest_neighbor = closest_neighbor[0]
-    return closest_neighbor  # number of region starts with 0
+    multi_channel = np.ndim(means[smallest_region]) > 0
+    if max_intensity is None:
+        max_intensity = most_similar_max_intensity(img, means[smallest_region])
+    neighboring_regions = sorted(inter_region_neighbors[smallest_region])
+    if neighboring_regions:
+        # only neighbors are compared, the distances of several channels can be larger than 1
+        distances = srg.channel_distance(
+            (np.asarray([means[region] for region in neighboring_regions]) - means[smallest_region]) / max_intensity,
+            multi_channel, norm).tolist()
+        return min(zip(distances, neighboring_regions))[1]  # number of region starts with 0
+    return 1 if smallest_region == 0 else 0  # a region without neighbors is merged into the first other region
 
 
-def update_regions(reg, closest_neighbor, smallest_region):  # merging
+def most_similar_max_intensity(img, mean):
     """
-    updates region numbers
-    :param reg: array with region numbers (2D array)
-    :param closest_neighbor: region number of the region with the most similar mean intensity to smallest region (int)
-    (-1 to match index)
-    :param smallest_region: region number of the smallest region (int) (-1 to match index)
-    :return: updated region number array (2D array)
+    calculates the maximal intensity that find_most_similar_region divides the distances by
+    :param img: array with intensity values (2D/3D array, with an additional last axis for several channels)
+    :param mean: mean value of one region (float, 1D array for several channels)
+    :return: maximal intensity value (int, 1D array for several channels)
     """
-    pos_smallest_region = np.where(reg == smallest_region + 1)
-    reg[pos_smallest_region[0], pos_smallest_region[1]] = closest_neighbor + 1
-    return reg
+    if np.ndim(mean) > 0:
+        return np.amax(np.asarray(img).reshape(-1, len(mean)), axis=0)
+    return int(np.amax(img))
 
 
 def update_region_sizes(region_sizes, smallest_region, closest_neighbor):
@@ -326,45 +569,92 @@ def update_region_sizes(region_sizes, smallest_region, closest_neighbor):
     return region_sizes
 
 
-def region_merging_size(img, reg, inter_region_neighbors, means, threshold):
+def region_merging_size(img, reg, inter_region_neighbors, means, threshold, norm=2, kept_regions=None):
     """
     region merging algorithm by size of regions
-    :param img: array with intensity values (2D array)
-    :param reg: array with region numbers (2D array)
-    :param inter_region_neighbors: all neighbors have values from 1 or higher in an array where region numbers are row
-    and col numbers (2D array)
+    :param img: array with intensity values (2D/3D array)
+    :param reg: array with region numbers (2D/3D array)
+    :param inter_region_neighbors: one set of neighboring regions per region (list of sets)
     :param means: mean values of all regions (list of floats)
     :param threshold: size value below which regions are merged (int)
-    :return: merged regions by size (2D array)
+    :param norm: order of the norm that combines the channels, e.g. 1, 2 or np.inf (see np.linalg.norm)
+    :param kept_regions: list that gets the former region number -1 of every remaining region, new region number -1 is
+    the index, None for no record (list)
+    :return: merged regions by size, numbered from 1 to the number of regions in the smallest unsigned integer type
+    for them (2D/3D array)
     """
     region_sizes = calculate_regions_size(reg)
-    smallest_region = find_smallest_region(region_sizes)
-    #  print(len(np.unique(reg.flatten())))
-    #  i = 0
-    while region_sizes[smallest_region] < threshold:
-        #  i += 1
-        #  if i % 100 == 0:
-            #  print(i)
-
-        closest_neighbor = find_most_similar_region(means, smallest_region, inter_region_neighbors, img)
-        reg = update_regions(reg, closest_neighbor, smallest_region)
-        means = update_mean_values(means, closest_neighbor, smallest_region, img, reg)
+    region_sums, region_counts = srg.region_statistics(img, reg)
+    region_sums, region_counts = region_sums[1:], region_counts[1:]
+    merged_into = list(range(len(means)))
+    if len(means) == 0:
+        return relabel_merged_regions(reg, merged_into)[0]  # no region is kept
+    max_intensity = most_similar_max_intensity(img, means[0])
+    queue = size_queue(region_sizes)  # only the size of the merged region is added, not all sizes
+    smallest_size, smallest_region = pop_smallest_region(queue, region_sizes)
+    while smallest_size < threshold:
+        closest_neighbor = find_most_similar_region(means, smallest_region, inter_region_neighbors, img, norm,
+                                                    max_intensity)
+        merged_into = merge_regions(merged_into, closest_neighbor, smallest_region)
+        means = update_mean_values(means, closest_neighbor, smallest_region, region_sums, region_counts)
         region_sizes = update_region_sizes(region_sizes, smallest_region, closest_neighbor)
         inter_region_neighbors = update_neighboring_regions(inter_region_neighbors, closest_neighbor, smallest_region)
-        smallest_region = find_smallest_region(region_sizes)
+        if region_sizes[closest_neighbor] == region_sizes[closest_neighbor]:
+            heapq.heappush(queue, (region_sizes[closest_neighbor], closest_neighbor))
+        smallest_size, smallest_region = pop_smallest_region(queue, region_sizes)
+    reg, kept = relabel_merged_regions(reg, merged_into)
+    if kept_regions is not None:
+        kept_regions.extend(kept.tolist())
     return reg
 
 
-def region_merging(reg, img, distance_threshold, size_threshold):
+def region_merging(reg, img, distance_threshold, size_threshold, connectivity=4, norm=2, keep_region_numbers=False):
     """
     performs the distance region merging algorithm and the size region merging algorithm after each other
-    :param reg: array with region numbers (2D array)
-    :param img: array with intensity values (2D array)
+    :param reg: array with region numbers (2D/3D array)
+    :param img: array with intensity values (2D/3D array)
     :param distance_threshold: regions with smaller intensity distance than the threshold will be merged (float)
     :param size_threshold: regions that are smaller than this threshold will be merged (int)
-    :return:
-    """
-    results_region_merging_similarity = distance_merging_while(reg, distance_threshold, img)
+    :param connectivity: 4, 8 (2D), 6, 26 (3D) or a footprint (int or array), see connectivity.neighbor_offsets
+    :param norm: order of the norm that combines the channels, e.g. 1, 2 or np.inf (see np.linalg.norm)
+    :param keep_region_numbers: True to give every merged region the region number in reg of the region the others
+    were merged into instead of numbering the regions from 1 to their number (bool)
+    :return: array with the merged regions numbered from 1 to their number, or with the region numbers of reg if
+    keep_region_numbers is True, in the smallest unsigned integer type for them (2D/3D array)
+    """
+    distance_kept_regions, size_kept_regions = [], []
+    results_region_merging_similarity = distance_merging_while(reg, distance_threshold, img, connectivity, norm=norm,
+                                                               kept_regions=distance_kept_regions)
     image_rm_similarity, inter_region_neighbors, means = results_region_merging_similarity
-    image_rm_size = region_merging_size(img, image_rm_similarity, inter_region_neighbors, means, size_threshold)
+    image_rm_size = region_merging_size(img, image_rm_similarity, inter_region_neighbors, means, size_threshold, norm,
+                                        size_kept_regions)
+    if keep_region_numbers:
+        kept_regions = np.asarray(distance_kept_regions, np.intp)[np.asarray(size_kept_regions, np.intp)]
+        region_numbers = np.concatenate(([0], kept_regions + 1))
+        image_rm_size = region_numbers.astype(srg.label_dtype(int(region_numbers[-1])))[image_rm_size]
     return image_rm_size
+
+
+def region_merging_sweep(reg, img, distance_thresholds, size_threshold, connectivity=4, norm=2):
+    """
+    performs region_merging for several distance thresholds with one merging by similarity, the result for every
+    threshold is cut from the merge tree (see distance_merging_tree and cut_merging_tree)
+    :param reg: array with region numbers (2D/3D array)
+    :param img: array with intensity values (2D/3D array)
+    :param distance_thresholds: regions with smaller intensity distance than the threshold will be merged (list)
+    :param size_threshold: regions that are smaller than this threshold will be merged (int)
+    :param connectivity: 4, 8 (2D), 6, 26 (3D) or a footprint (int or array), see connectivity.neighbor_offsets
+    :param norm: order of the norm that combines the channels, e.g. 1, 2 or np.inf (see np.linalg.norm)
+    :return: merged regions for every distance threshold (list of 2D/3D arrays)
+    """
+    merge_pairs, merge_distances, _ = distance_merging_tree(reg, img, max(distance_thresholds), connectivity,
+                                                           norm=norm)
+    statistics = srg.region_statistics(img, reg)  # one pass for all thresholds
+    results = []
+    for distance_threshold in distance_thresholds:
+        image_rm_similarity, inter_region_neighbors, means = cut_merging_tree(reg, img, merge_pairs, merge_distances,
+                                                                              distance_threshold, connectivity,
+                                                                              statistics)
+        results.append(region_merging_size(img, image_rm_similarity, inter_region_neighbors, means, size_threshold,
+                                           norm))
+    return results
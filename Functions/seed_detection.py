@@ -1,6 +1,9 @@
 import numpy as np
 import math as m
+import scipy.ndimage as ndimage
 from Functions import image_processing as ip
+from Functions import connectivity as con
+from Functions import seeded_region_growing as srg
 from skimage.filters import threshold_otsu
 
 
@@ -13,7 +16,7 @@ def standard_deviation(img, size):
     standard_dev = np.zeros(img.shape)
     n = (size - 1) // 2
     for p in np.ndindex(img.shape):  # iterates over every pixel
-        neighborhood_sum = 0
+        neighborhood_sum = 0.0  # a float sum, so uint8/uint16 intensities don't overflow
         deviation = 0
         if not ip.is_border_pixel(p, img):
             for q in np.ndindex(size, size):  # iterates over filter mask (nxn neighborhood)
@@ -44,7 +47,7 @@ def euclidean_relative(img, size):
             for q in np.ndindex(size, size):
                 i = p[0] - n + q[0]
                 j = p[1] - n + q[1]
-                neighborhood_distance.append((np.float(img[p]) - np.float(img[i, j])) / (np.float(img[p]) + 0.00000001))
+                neighborhood_distance.append((float(img[p]) - float(img[i, j])) / (float(img[p]) + 0.00000001))
                 # adds relative euclidean distance to list, adds 0.000001 to prevent division by 0
             maximal_euclidean_distance[p] = max(neighborhood_distance)  # chooses maximum distance
     return maximal_euclidean_distance
@@ -64,7 +67,7 @@ def euclidean_n(img, size):
             for q in np.ndindex(size, size):
                 i = p[0] - n + q[0]
                 j = p[1] - n + q[1]
-                neighborhood_distance.append((img[p] - img[i, j]))
+                neighborhood_distance.append(float(img[p]) - float(img[i, j]))
             result[p] = max(neighborhood_distance)
     return result
 
@@ -81,14 +84,51 @@ def otsu_thresholding(img):
     return otsu_threshold
 
 
+def background_start_pixels(img, number=4, size=5):
+    """
+    picks start pixels for unseeded region growing in flat background areas: pixels darker than the otsu threshold
+    with the smallest intensity variance in their size x size neighborhood, at least size pixels apart
+    :param img: intensity values of image (2d array)
+    :param number: number of start pixels (int)
+    :param size: size of the neighborhood and smallest distance between two start pixels (int)
+    :return: start pixels, flattest first (list of tuples)
+    """
+    img = np.asarray(img, float)
+    local_mean = ndimage.uniform_filter(img, size)
+    local_variance = ndimage.uniform_filter(img ** 2, size) - local_mean ** 2
+    background = img < threshold_otsu(img)
+    start_pixels = []
+    for position in np.argsort(np.where(background, local_variance, np.inf), axis=None, kind="stable"):
+        if not background.flat[position] or len(start_pixels) == number:
+            break
+        pixel = tuple(int(i) for i in np.unravel_index(position, img.shape))
+        if all(max(abs(a - b) for a, b in zip(pixel, other)) >= size for other in start_pixels):
+            start_pixels.append(pixel)
+    return start_pixels
+
+
+def channel_norm(img, ndim=2):
+    """
+    combines the channels of an image into one intensity value per pixel for the seed detection
+    :param img: intensity values of image (2d array, with an additional last axis for several channels)
+    :param ndim: number of axes without the channels (int)
+    :return: euclidean norm of the channels of every pixel, img itself if it has no channels (2d array)
+    """
+    if img.ndim == ndim:
+        return img
+    return np.linalg.norm(np.asarray(img, float), axis=-1)
+
+
 def seeds(img, threshold_distance):
     """ automatic seed selection algorithm
-    :param img: intensity values of image (2d array)
+    :param img: intensity values of image (2d array, with an additional last axis for several channels, the seeds are
+    detected on the euclidean norm of the channels, see channel_norm)
     :param threshold_distance: Threshold for the relative euclidean distance
-    :return: all seeds get intensity value 1 every other pixel has intensity value 0 (2d array)
+    :return: all seeds get intensity value 1 every other pixel has intensity value 0 (2d uint8 array)
              every border pixel is here detected as a seed but will be removed in seed merging
     """
-    result = np.zeros(img.shape)
+    img = channel_norm(img)
+    result = np.zeros(img.shape, np.uint8)
     threshold_similarity = otsu_thresholding(img)
     sd_seeds = standard_deviation(img, 3)
     sd_flat = sd_seeds.flatten()
@@ -100,24 +140,85 @@ def seeds(img, threshold_distance):
     return result
 
 
-def seed_merging(img):
-    """
-    :param img: array where every seed has the value 1 and every other pixel the value 0 (2d array)
-    :return: array with merged seeds (2d array)
-    """
-    regions = np.zeros(img.shape)  # creates new array for region numbers for every image pixel
-    count = 1  # keep track of region number
-    neighbors = [(-1, 0), (1, 0), (0, -1), (0, 1)]
-    for pixel in np.ndindex(img.shape):  # iterates over every pixel of the image
-        if img[pixel] == 1:  # tests if pixel is seed
-            if not ip.is_border_pixel(pixel, img):  # no calculation of border pixels
-                for element in neighbors:  # iterates over neighbors
-                    neighbor = (pixel[0] + element[0], pixel[1] + element[1])
-                    if regions[neighbor] != 0:  # tests if neighbors are also seeds
-                        regions[pixel] = regions[neighbor]  # merge neighboring seeds; Zuordnung zur letzten Region
-                if regions[pixel] == 0:  # tests if no neighbors are seeds
-                    regions[pixel] = count  # creates new region from new seed
-                    count += 1
+def seed_merging(img, connectivity=4):
+    """
+    labels the seeds, every seed gets the region number of the neighboring seed that was visited last (in raster
+    order), seeds without visited neighboring seeds start a new region
+    :param img: array where every seed has the value 1 and every other pixel the value 0 (2d/3d array)
+    :param connectivity: 4, 8 (2D), 6, 26 (3D) or a footprint (int or array), see connectivity.neighbor_offsets
+    :return: array with merged seeds in the smallest unsigned integer type for the region numbers (2d/3d array)
+    """
+    is_seed = np.asarray(img == 1)
+    for axis in range(is_seed.ndim):  # no calculation of border pixels
+        np.moveaxis(is_seed, axis, 0)[[0, -1]] = False
+    seed_positions = np.flatnonzero(is_seed)
+
+    neighbors, sources, _ = con.neighbor_pixels(img.shape, seed_positions, con.neighbor_offsets(connectivity))
+    visited_seed = (neighbors < seed_positions[sources]) & is_seed.flat[neighbors]
+    last_neighbor = np.full(seed_positions.size, -1)
+    np.maximum.at(last_neighbor, sources[visited_seed], neighbors[visited_seed])
+
+    # every seed points to the seed it gets its region number from, seeds without such a neighbor are new regions
+    is_new_region = last_neighbor == -1
+    origin = np.where(is_new_region, np.arange(seed_positions.size), np.searchsorted(seed_positions, last_neighbor))
+    while np.any(origin != origin[origin]):
+        origin = origin[origin]
+    region_numbers = np.cumsum(is_new_region)  # keep track of region number
+    # creates new array for region numbers for every image pixel
+    regions = np.zeros(img.shape, srg.label_dtype(region_numbers[-1] if region_numbers.size else 0))
+    regions.flat[seed_positions] = region_numbers[origin]
+    return regions
+
+
+def warm_start_seeds(previous_labels, erosion=3, connectivity=4, img=None, threshold_drift=None):
+    """
+    derives the seeds of a frame from the segmentation of the previous frame of a time-lapse sequence, every region is
+    eroded and keeps its region number, regions that would disappear keep the pixels of the last erosion step they
+    survived, so every region of the previous frame gets a seed
+    with img and threshold_drift, seed pixels whose intensity in the new frame differs from the mean of their seed
+    by more than threshold_drift (relative to the maximal intensity) are removed, e.g. where a cell moved into
+    the background
+    :param previous_labels: region numbers of the previous frame (2d/3d array)
+    :param erosion: number of erosion steps, about the distance a border moves between two frames (int)
+    :param connectivity: 4, 8 (2D), 6, 26 (3D) or a footprint (int or array), see connectivity.neighbor_offsets
+    :param img: intensity values of the new frame (2d/3d array, with an additional last axis for several channels,
+    see channel_norm)
+    :param threshold_drift: relative intensity distance 0 < threshold < 1, None keeps all seed pixels (float)
+    :return: array with the seeds labeled with the region numbers of the previous frame, in the smallest unsigned
+    integer type for them (2d/3d array)
+    """
+    previous_labels = srg.compact_labels(previous_labels)
+    offsets = con.neighbor_offsets(connectivity)
+    regions = previous_labels.copy()
+    for _ in range(erosion):
+        eroded = regions.copy()
+        for offset in offsets:
+            pixels, neighbors = con.shifted_views(regions, offset)
+            eroded_pixels, _ = con.shifted_views(eroded, offset)
+            eroded_pixels[pixels != neighbors] = 0
+        lost_regions = np.setdiff1d(regions[regions != 0], eroded[eroded != 0])
+        lost_pixels = np.isin(regions, lost_regions)
+        eroded[lost_pixels] = regions[lost_pixels]
+        regions = eroded
+    if img is not None and threshold_drift is not None:
+        regions = remove_drifted_seeds(regions, img, threshold_drift)
+    return regions
+
+
+def remove_drifted_seeds(regions, img, threshold_drift):
+    """
+    removes the seed pixels whose intensity in the new frame differs from the mean of their seed by more than
+    threshold_drift (relative to the maximal intensity), e.g. where a cell moved into the background
+    :param regions: seeds from the previous frame (2d/3d array, see warm_start_seeds), changed in place
+    :param img: intensity values of the new frame (2d/3d array, with an additional last axis for several channels,
+    see channel_norm)
+    :param threshold_drift: relative intensity distance 0 < threshold < 1 (float)
+    :return: seeds without the drifted pixels (2d/3d array)
+    """
+    img = channel_norm(img, regions.ndim)
+    seed_means = np.bincount(regions.ravel(), weights=np.ravel(img)) / np.maximum(np.bincount(regions.ravel()), 1)
+    distance = np.abs(img - seed_means[regions]) / np.amax(img)
+    regions[distance >= threshold_drift] = 0
     return regions
 
 
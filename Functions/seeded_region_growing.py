@@ -1,434 +1,353 @@
 import numpy as np
+from Functions import connectivity as con
+from Functions import checkpoint as cp
 
+# the frontier has one record for every unlabeled pixel and direction from which a region touches it,
+# so its size depends on the length of the region borders and not on the image size
+FRONTIER_DTYPE = np.dtype([('position', np.int32), ('direction', np.int8), ('region', np.int32),
+                           ('distance', np.float64)])
 
-def calculate_left_neighbors(reg, seeds):
-    """
-    determines the region number of the left neighbor pixel of every seed
-    :param reg: array with region numbers (2D array)
-    :param seeds: array where every seed has the value 1 and every other pixel the value 0 (2D array)
-    :return: array saving the region number of the left pixel of every seed (2D array)
-    """
-    left_neighbors = np.zeros((reg.shape[0], reg.shape[1] + 1))
-    left_neighbors[seeds[0], seeds[1]] = reg[seeds[0], seeds[1]]
-    left_neighbors = np.delete(left_neighbors, 0, axis=1)
-    left_neighbors[seeds[0], seeds[1]] = 0  # remove already labeled pixels
-    return left_neighbors
+# number of pixels that are read at once when the region statistics are calculated
+STATISTICS_BLOCK_SIZE = 2 ** 22
 
 
-def calculate_right_neighbors(reg, seeds):
+def label_dtype(max_label):
     """
-    determines the region number of the right neighbor pixel of every seed
-    :param reg: array with region numbers (2D array)
-    :param seeds: array where every seed has the value 1 and every other pixel the value 0 (2D array)
-    :return: array saving the region number of the right pixel of every seed (2D array)
+    determines the smallest unsigned integer type for region numbers
+    :param max_label: largest region number (int)
+    :return: uint8, uint16, uint32 or uint64 (dtype)
     """
-    right_neighbors = np.zeros((reg.shape[0], reg.shape[1] + 1))
-    right_neighbors[seeds[0], seeds[1] + 1] = reg[seeds[0], seeds[1]]
-    right_neighbors = np.delete(right_neighbors, reg.shape[1] - 1, axis=1)
-    right_neighbors[seeds[0], seeds[1]] = 0
-    return right_neighbors
+    return np.min_scalar_type(max(int(max_label), 0))
 
 
-def calculate_top_neighbors(reg, seeds):
+def compact_labels(reg):
     """
-    determines the region number of the upper neighbor pixel of every seed
-    :param reg: array with region numbers (2D array)
-    :param seeds: array where every seed has the value 1 and every other pixel the value 0 (2D array)
-    :return: array saving the region number of the upper pixel of every seed (2D array)
+    stores region numbers in the smallest unsigned integer type that holds them, without a copy if they already are
+    :param reg: array with region numbers (2D/3D array)
+    :return: array with region numbers (2D/3D array)
     """
-    top_neighbors = np.zeros((reg.shape[0] + 1, reg.shape[1]))
-    top_neighbors[seeds[0], seeds[1]] = reg[seeds[0], seeds[1]]
-    top_neighbors = np.delete(top_neighbors, 0, axis=0)
-    top_neighbors[seeds[0], seeds[1]] = 0
-    return top_neighbors
+    reg = np.asarray(reg)
+    return reg.astype(label_dtype(np.amax(reg) if reg.size else 0), copy=False)
 
 
-def calculate_bottom_neighbors(reg, seeds):
+def frontier_records(reg, labeled_pixels, connectivity=4):
     """
-    determines the region number of the lower neighbor pixel of every seed
-    :param reg: array with region numbers (2D array)
-    :param seeds: array where every seed has the value 1 and every other pixel the value 0 (2D array)
-    :return: array saving the region number of the lower pixel of every seed (2D array)
+    creates frontier records for the unlabeled neighbors of labeled pixels
+    :param reg: array with region numbers (2D/3D array)
+    :param labeled_pixels: flat indices of labeled pixels (1D array)
+    :param connectivity: 4, 8 (2D), 6, 26 (3D) or a footprint (int or array), see connectivity.neighbor_offsets
+    :return: frontier records with the region number of the labeled pixel, distance not yet calculated (1D array)
     """
-    bottom_neighbors = np.zeros((reg.shape[0] + 1, reg.shape[1]))
-    bottom_neighbors[seeds[0] + 1, seeds[1]] = reg[seeds[0], seeds[1]]
-    bottom_neighbors = np.delete(bottom_neighbors, reg.shape[0] - 1, axis=0)
-    bottom_neighbors[seeds[0], seeds[1]] = 0
-    return bottom_neighbors
+    neighbors, sources, directions = con.neighbor_pixels(reg.shape, labeled_pixels, con.neighbor_offsets(connectivity))
+    unlabeled = reg.flat[neighbors] == 0
+    records = np.zeros(np.count_nonzero(unlabeled), FRONTIER_DTYPE)
+    records['position'] = neighbors[unlabeled]
+    records['direction'] = directions[unlabeled]
+    records['region'] = reg.flat[np.asarray(labeled_pixels)[sources[unlabeled]]]
+    records['distance'] = np.inf
+    return records
 
 
-def find_seed_neighbors(reg):
+def find_seed_neighbors(reg, connectivity=4):
     """
-    creates four arrays with the region numbers of the neighbors in all directions
-    :param reg: array with region numbers (2D array)
-    :return: four arrays with the region numbers of the neighbors in one direction (2D arrays)
+    creates the frontier of the seeds: a record for every unlabeled pixel next to a seed and every direction
+    :param reg: array with region numbers (2D/3D array)
+    :param connectivity: 4, 8 (2D), 6, 26 (3D) or a footprint (int or array), see connectivity.neighbor_offsets
+    :return: frontier records (1D array with FRONTIER_DTYPE)
     """
-    seeds = np.where(reg != 0)
-
-    left_neighbors = calculate_left_neighbors(reg, seeds).astype(int)
-    right_neighbors = calculate_right_neighbors(reg, seeds).astype(int)
-    top_neighbors = calculate_top_neighbors(reg, seeds).astype(int)
-    bottom_neighbors = calculate_bottom_neighbors(reg, seeds).astype(int)
+    return frontier_records(reg, np.flatnonzero(reg), connectivity)
 
-    return left_neighbors, right_neighbors, top_neighbors, bottom_neighbors
 
-
-def mean_region(img, reg):
+def is_multi_channel(img, reg):
     """
-    calculates mean intensity value of every region
-    :param img: intensity values (2D array)
-    :param reg: array with region numbers (2D array)
-    :return: list with mean values of the regions, region number 1 has index 0 (list)
+    tests whether an image has several intensity values (channels) per pixel
+    :param img: intensity values (2D/3D array, with an additional last axis for the channels)
+    :param reg: array with region numbers (2D/3D array)
+    :return: True if the last axis of img are channels (bool)
     """
-    mean_value = []
-    region_max = int(max(reg.flatten()))  # calculates amount of regions
-    for region_number in range(1, region_max + 1):  # iterates over every region
-        pos_reg_number = np.where(reg == region_number)
-        reg_mean = np.mean(img[pos_reg_number[0], pos_reg_number[1]])
-        mean_value.append(reg_mean)
-    return mean_value  # returns list with average of every region
+    return img.ndim > reg.ndim
 
 
-def one_region_mean(img, reg, new_pixel):
+def pixel_intensities(img, reg, positions):
     """
-    recalculates mean value of region with added pixel
-    :param img: intensity values of image (2d array)
-    :param reg: region numbers of image pixels (2d array)
-    :param new_pixel: position of newly labeled pixel (tuple)
-    :return: updated mean value of changed region (float)
+    reads the intensity values of pixels
+    :param img: intensity values (2D/3D array, with an additional last axis for the channels)
+    :param reg: array with region numbers (2D/3D array)
+    :param positions: flat indices of the pixels (1D array)
+    :return: intensity values (1D array, 2D array with one row per pixel for several channels)
     """
-    pos_new_reg = np.where(reg == reg[new_pixel])
-    single_mean = np.mean(img[pos_new_reg[0], pos_new_reg[1]])
-    return single_mean
+    if is_multi_channel(img, reg):
+        return np.asarray(img).reshape(reg.size, -1)[positions]
+    return img.flat[positions]
 
 
-def calculate_one_distance(max_intensity, means, pixel_intensity, region_number):
+def maximal_intensity(img, reg):
     """
-    calculates the distance of a pixel to the region with a specific region number
-    :param max_intensity: maximal intensity value (float)
-    :param means: list of means (list)
-    :param pixel_intensity: intensity of a pixel (float)
-    :param region_number: number of a specific region (int)
-    :return: the calculated distance for this pixel (float)
+    calculates the maximal intensity value, for several channels every channel has its own maximum so all channels
+    are scaled to the same range
+    :param img: intensity values (2D/3D array, with an additional last axis for the channels)
+    :param reg: array with region numbers (2D/3D array)
+    :return: maximal intensity value (float, 1D array for several channels)
     """
-    dist = np.abs((pixel_intensity - means[int(region_number) - 1]) / max_intensity)
-    return dist
+    if is_multi_channel(img, reg):
+        return np.amax(np.asarray(img).reshape(reg.size, -1), axis=0)
+    return np.amax(img)
 
 
-def calculate_one_border_distances(max_intensity, means, img, max_region, one_border_neighbors):
+def channel_distance(difference, multi_channel, norm=2):
     """
-    calculates the distance of a pixel to the regions of the neighbors of one side
-    :param max_intensity: maximal intensity value (float)
-    :param means: list of means (list)
-    :param img: array with intensity values (2D array)
-    :param max_region: highest region number (int)
-    :param one_border_neighbors:
-    :return: array with the region numbers of the neighbors to one side (2D array)
-    """
-    one_border_distances = np.ones(img.shape)
-    for region_number in range(1, max_region + 1):
-        pos_reg_bor = np.where(one_border_neighbors == region_number)
-        one_border_distances[pos_reg_bor[0], pos_reg_bor[1]] = calculate_one_distance(max_intensity, means,
-                                                                                      img[pos_reg_bor[0],
-                                                                                          pos_reg_bor[1]],
-                                                                                      region_number)
-    return one_border_distances
-
-
-def calculate_distances(img, reg, left_neighbors, right_neighbors, top_neighbors, bottom_neighbors):
-    """
-    creates four arrays with the distances of the pixels to their neighboring regions to all sides
-    :param img: array with intensity values (2D array)
-    :param reg: array with region numbers (2D array)
-    :param left_neighbors: array with the region numbers of the neighbors to the left side (2D array)
-    :param right_neighbors: array with the region numbers of the neighbors to the right side (2D array)
-    :param top_neighbors: array with the region numbers of the neighbors to the upper side (2D array)
-    :param bottom_neighbors: array with the region numbers of the neighbors to lower side (2D array)
-    :return: means: list of means (list), and four arrays with the calculated distances to all the sides (2D arrays)
-    """
-    max_intensity = np.amax(img)
-    means = mean_region(img, reg)
-    max_region = int(np.amax(reg))
-
-    left_distances = calculate_one_border_distances(max_intensity, means, img, max_region, left_neighbors)
-    right_distances = calculate_one_border_distances(max_intensity, means, img, max_region, right_neighbors)
-    top_distances = calculate_one_border_distances(max_intensity, means, img, max_region, top_neighbors)
-    bottom_distances = calculate_one_border_distances(max_intensity, means, img, max_region, bottom_neighbors)
-
-    return means, left_distances, right_distances, top_distances, bottom_distances
-
-
-def update_list_of_means(means, img, reg, new_pixel):
+    combines intensity differences to a distance
+    :param difference: differences of intensity values (float or array, channels in the last axis)
+    :param multi_channel: True if the last axis of difference are channels (bool)
+    :param norm: order of the norm that combines the channels, e.g. 1, 2 or np.inf (see np.linalg.norm)
+    :return: distances (float or array)
     """
-    updates the list of means with the new mean of the changed region
-    :param means: list of means (list)
-    :param img: array with intensity values (2D array)
-    :param reg: array with region numbers (2D array)
-    :param new_pixel: pixel which was lastly assigned to a region (tuple)
-    :return: updated list of means (list)
-    """
-    new_mean = one_region_mean(img, reg, new_pixel)
-    means[int(reg[new_pixel] - 1)] = new_mean
-    return means
+    if multi_channel:
+        return np.linalg.norm(difference, ord=norm, axis=-1)
+    return np.abs(difference)
 
 
-def update_one_distance(img, reg, means, max_intensity, new_pixel, one_border_neighbors, one_border_distances):
+def block_length(shape):
     """
-    updates the distance array of one direction
-    :param img: array with intensity values (2D array)
-    :param reg: array with region numbers (2D array)
-    :param means: list of means (list)
-    :param max_intensity: maximal intensity value (float)
-    :param new_pixel: pixel which was lastly assigned to a region (tuple)
-    :param one_border_neighbors: array with the region numbers of the neighbors to one side (2D array)
-    :param one_border_distances: array with the calculated distances of the pixel to one side (2D array)
-    :return: updated array with the calculated distances of the pixel to one side (2D array)
+    determines how many entries along the first axis are read at once, so a block has about STATISTICS_BLOCK_SIZE
+    pixels and memory mapped volumes are never loaded completely
+    :param shape: shape of the array (tuple)
+    :return: number of entries along the first axis per block (int)
     """
-    positions_to_update = np.where(one_border_neighbors == reg[new_pixel])
-    one_border_distances[positions_to_update[0],
-                         positions_to_update[1]] = calculate_one_distance(max_intensity, means,
-                                                                          img[positions_to_update[0],
-                                                                              positions_to_update[1]], reg[new_pixel])
-    one_border_distances[new_pixel] = 1
-    return one_border_distances
+    return max(1, STATISTICS_BLOCK_SIZE // max(1, int(np.prod(shape[1:]))))
 
 
-def update_distances(img, reg, means, new_pixel, left_neighbors, right_neighbors, top_neighbors, bottom_neighbors,
-                     left_distances, right_distances, top_distances, bottom_distances):
+def region_statistics(img, reg):
     """
-    updates the list of means and the four distance arrays for all directions
-    :param img: array with intensity values (2D array)
-    :param reg: array with region numbers (2D array)
-    :param means: list of means (list)
-    :param new_pixel: pixel which was lastly assigned to a region (tuple)
-    :param left_neighbors: array with the region numbers of the neighbors to the left side (2D array)
-    :param right_neighbors: array with the region numbers of the neighbors to the right side (2D array)
-    :param top_neighbors: array with the region numbers of the neighbors to the upper side (2D array)
-    :param bottom_neighbors: array with the region numbers of the neighbors to lower side (2D array)
-    :param left_distances: array with the calculated distances of the pixel to region of left neighbors (2D array)
-    :param right_distances: array with the calculated distances of the pixel to region of right neighbors (2D array)
-    :param top_distances: array with the calculated distances of the pixel to region of upper neighbors (2D array)
-    :param bottom_distances: array with the calculated distances of the pixel to region of lower neighbors (2D array)
-    :return: four updated distance arrays (2D arrays)
+    calculates the intensity sum and the number of pixels of every region in one pass,
+    the arrays are read in blocks along the first axis, so memory mapped volumes are never loaded completely
+    :param img: intensity values (2D/3D array, with an additional last axis for the channels)
+    :param reg: array with region numbers (2D/3D array)
+    :return: sums of intensity values (1D array, 2D array with one column per channel) and pixel counts (1D array),
+    the region number is the index
     """
-    means = update_list_of_means(means, img, reg, new_pixel)
-    max_intensity = np.amax(img)
+    rows = block_length(reg.shape)
+    channels = int(np.prod(img.shape[reg.ndim:]))
+    region_sums = np.zeros((1, channels))
+    region_counts = np.zeros(1, int)
+    for start in range(0, reg.shape[0], rows):
+        labels = np.asarray(reg[start:start + rows]).astype(int).ravel()
+        values = np.asarray(img[start:start + rows]).reshape(labels.size, channels)
+        block_sums = np.stack([np.bincount(labels, weights=values[:, channel]) for channel in range(channels)], axis=1)
+        if len(block_sums) > len(region_sums):
+            region_sums = np.pad(region_sums, ((0, len(block_sums) - len(region_sums)), (0, 0)))
+            region_counts = np.pad(region_counts, (0, len(block_sums) - region_counts.size))
+        region_sums[:len(block_sums)] += block_sums
+        region_counts += np.bincount(labels, minlength=region_counts.size)
+    if not is_multi_channel(img, reg):
+        region_sums = region_sums[:, 0]
+    return region_sums, region_counts
 
-    left_distances = update_one_distance(img, reg, means, max_intensity, new_pixel, left_neighbors, left_distances)
-    right_distances = update_one_distance(img, reg, means, max_intensity, new_pixel, right_neighbors, right_distances)
-    top_distances = update_one_distance(img, reg, means, max_intensity, new_pixel, top_neighbors, top_distances)
-    bottom_distances = update_one_distance(img, reg, means, max_intensity, new_pixel, bottom_neighbors,
-                                           bottom_distances)
 
-    return left_distances, right_distances, top_distances, bottom_distances
-
-
-def is_labeled(reg, position):
+def mean_region(img, reg):
     """
-    determines whether a pixel is already assigned to a region or not
-    :param reg: array with region numbers (2D array)
-    :param position: pixel that is tested (tuple)
-    :return: True/False
+    calculates mean intensity value of every region
+    :param img: intensity values (2D/3D array, with an additional last axis for the channels)
+    :param reg: array with region numbers (2D/3D array)
+    :return: list with mean values (mean vectors for several channels) of the regions, region number 1 has index 0
+    (list)
     """
-    if reg[position] != 0:
-        return True
-    return False
+    region_sums, region_counts = region_statistics(img, reg)
+    with np.errstate(invalid='ignore', divide='ignore'):  # empty regions get the mean nan
+        mean_value = region_sums[1:] / region_counts[1:].reshape((-1,) + (1,) * (region_sums.ndim - 1))
+    return list(mean_value)  # returns list with average of every region
 
 
-def unlabeled_pixel_exist(reg):
+def add_to_region_statistics(region_sums, region_counts, pixel_intensity, region_number):
     """
-    determines whether unlabeled pixels exist
-    :param reg: array with region numbers (2D array)
-    :return: True/False
+    adds a newly labeled pixel to the running sum and count of its region
+    :param region_sums: sums of intensity values, the region number is the index (1D/2D array)
+    :param region_counts: pixel counts, the region number is the index (1D array)
+    :param pixel_intensity: intensity value of the newly labeled pixel (float, 1D array for several channels)
+    :param region_number: region number of the newly labeled pixel (int)
+    :return: updated mean value of the region (float, 1D array for several channels)
     """
-    if 0 in reg:
-        return True
-    return False
+    region_sums[region_number] += pixel_intensity
+    region_counts[region_number] += 1
+    return region_sums[region_number] / region_counts[region_number]
 
 
-def position_of_smallest_distance_one_border(one_border_distance):
+def calculate_one_distance(max_intensity, means, pixel_intensity, region_number, norm=2):
     """
-    finds the position of the pixel with the smallest distance value in an array
-    :param one_border_distance: array with distances of the pixels to the neighbors in one direction (2D array)
-    :return: pixel with the smallest distance in the array (tuple)
+    calculates the distance of pixels to the regions with specific region numbers, for several channels the
+    differences of all channels are combined with the norm in one call for all pixels
+    :param max_intensity: maximal intensity value (float, 1D array for several channels)
+    :param means: list of means (list)
+    :param pixel_intensity: intensity of pixels (float or 1D array, one row per pixel for several channels)
+    :param region_number: number of specific regions (int or 1D array)
+    :param norm: order of the norm that combines the channels, e.g. 1, 2 or np.inf (see np.linalg.norm)
+    :return: the calculated distances for these pixels (float or 1D array)
     """
-    minimal_distances = np.where(one_border_distance == np.amin(one_border_distance))
-    pos_min_dist = list(zip(minimal_distances[0], minimal_distances[1]))[0]
-    pos_min_dist = (int(pos_min_dist[0]), int(pos_min_dist[1]))
-    return pos_min_dist
+    difference = (pixel_intensity - np.take(means, np.asarray(region_number, int) - 1, axis=0)) / max_intensity
+    dist = channel_distance(difference, np.ndim(max_intensity) > 0, norm)
+    return dist
 
 
-def position_of_smallest_distance(left_distances, right_distances, top_distances, bottom_distances):
+def calculate_distances(img, reg, frontier, norm=2):
     """
-    finds the pixel with the smallest distance in all four arrays and saves the number of the border
-    :param left_distances: array with the calculated distances of the pixel to region of left neighbors (2D array)
-    :param right_distances: array with the calculated distances of the pixel to region of right neighbors (2D array)
-    :param top_distances: array with the calculated distances of the pixel to region of upper neighbors (2D array)
-    :param bottom_distances: array with the calculated distances of the pixel to region of lower neighbors (2D array)
-    :return: position of the pixel with the smallest distance (tuple), number ob the used border array (int)
+    calculates the distances of all frontier pixels to their neighboring regions
+    :param img: array with intensity values (2D/3D array, with an additional last axis for the channels)
+    :param reg: array with region numbers (2D/3D array)
+    :param frontier: frontier records (1D array with FRONTIER_DTYPE)
+    :param norm: order of the norm that combines the channels, e.g. 1, 2 or np.inf (see np.linalg.norm)
+    :return: means: list of means (list), frontier records with calculated distances (1D array with FRONTIER_DTYPE)
     """
-    left_min_dist = position_of_smallest_distance_one_border(left_distances)
-    right_min_dist = position_of_smallest_distance_one_border(right_distances)
-    top_min_dist = position_of_smallest_distance_one_border(top_distances)
-    bottom_min_dist = position_of_smallest_distance_one_border(bottom_distances)
-
-    pos_min_distances = [left_min_dist, right_min_dist, top_min_dist, bottom_min_dist]
-    min_distances = np.asarray(
-        [left_distances[left_min_dist], right_distances[right_min_dist], top_distances[top_min_dist],
-         bottom_distances[bottom_min_dist]])
-    border_number = np.where(min_distances == np.amin(min_distances))  # left:0, right:1, top:2, bottom:3
-    border_number = border_number[0][0]
-    pos_min_dist = pos_min_distances[border_number]
-
-    return pos_min_dist, border_number
+    max_intensity = maximal_intensity(img, reg)
+    means = mean_region(img, reg)
+    frontier['distance'] = calculate_one_distance(max_intensity, means,
+                                                  pixel_intensities(img, reg, frontier['position']),
+                                                  frontier['region'], norm)
+    return means, frontier
 
 
-def choose_border_number(border_number, left_neighbors, right_neighbors, top_neighbors, bottom_neighbors):
+def update_list_of_means(means, img, reg, new_pixel, region_sums, region_counts):
     """
-    chooses one of the four neighbor arrays by the number of the array
-    :param border_number: number of the array which should be used (int)
-    :param left_neighbors: array with the region numbers of the neighbors to the left side (2D array)
-    :param right_neighbors: array with the region numbers of the neighbors to the right side (2D array)
-    :param top_neighbors: array with the region numbers of the neighbors to the upper side (2D array)
-    :param bottom_neighbors: array with the region numbers of the neighbors to lower side (2D array)
-    :return: name of the neighbor array which should be used (name of variable)
+    updates the list of means with the new mean of the changed region
+    :param means: list of means (list)
+    :param img: array with intensity values (2D/3D array, with an additional last axis for the channels)
+    :param reg: array with region numbers (2D/3D array)
+    :param new_pixel: pixel which was lastly assigned to a region (tuple)
+    :param region_sums: running sums of intensity values, the region number is the index (1D/2D array)
+    :param region_counts: running pixel counts, the region number is the index (1D array)
+    :return: updated list of means (list)
     """
-    if border_number == 0:
-        return left_neighbors
-    elif border_number == 1:
-        return right_neighbors
-    elif border_number == 2:
-        return top_neighbors
-    return bottom_neighbors
+    new_mean = add_to_region_statistics(region_sums, region_counts, img[new_pixel], int(reg[new_pixel]))
+    means[int(reg[new_pixel] - 1)] = new_mean
+    return means
 
 
-def update_left_neighbors(reg, left_neighbors, pos_min_dist):
+def update_distances(img, reg, means, region_sums, region_counts, new_pixel, frontier, norm=2, max_intensity=None):
     """
-    updates the left neighbor array
-    :param reg: array with region numbers (2D array)
-    :param left_neighbors: array with the region numbers of the neighbors to the left side (2D array)
-    :param pos_min_dist: pixel which was lastly added to a region (tuple)
-    :return: updated left neighbor array (2D array)
+    updates the list of means and the distances of the frontier pixels next to the changed region
+    :param img: array with intensity values (2D/3D array, with an additional last axis for the channels)
+    :param reg: array with region numbers (2D/3D array)
+    :param means: list of means (list)
+    :param region_sums: running sums of intensity values, the region number is the index (1D/2D array)
+    :param region_counts: running pixel counts, the region number is the index (1D array)
+    :param new_pixel: pixel which was lastly assigned to a region (tuple)
+    :param frontier: frontier records (1D array with FRONTIER_DTYPE)
+    :param norm: order of the norm that combines the channels, e.g. 1, 2 or np.inf (see np.linalg.norm)
+    :param max_intensity: maximal intensity value, None calculates it (float, 1D array for several channels)
+    :return: frontier records with updated distances (1D array with FRONTIER_DTYPE)
     """
-    if pos_min_dist[1] != 0:  # not border
-        left_neighbor_pos = (pos_min_dist[0], pos_min_dist[1] - 1)
-        if not is_labeled(reg, left_neighbor_pos):
-            left_neighbors[left_neighbor_pos] = reg[pos_min_dist]
-    left_neighbors[pos_min_dist] = 0
-    return left_neighbors
-
+    means = update_list_of_means(means, img, reg, new_pixel, region_sums, region_counts)
+    if max_intensity is None:
+        max_intensity = maximal_intensity(img, reg)
 
-def update_right_neighbors(reg, right_neighbors, pos_min_dist):
-    """
-    updates the right neighbor array
-    :param reg: array with region numbers (2D array)
-    :param right_neighbors: array with the region numbers of the neighbors to the right side (2D array)
-    :param pos_min_dist: pixel which was lastly added to a region (tuple)
-    :return: updated right neighbor array (2D array)
-    """
-    if pos_min_dist[1] != reg.shape[1] - 1:  # not border
-        right_neighbor_pos = (pos_min_dist[0], pos_min_dist[1] + 1)
-        if not is_labeled(reg, right_neighbor_pos):
-            right_neighbors[right_neighbor_pos] = reg[pos_min_dist]
-    right_neighbors[pos_min_dist] = 0
-    return right_neighbors
+    positions_to_update = np.where(frontier['region'] == reg[new_pixel])[0]
+    frontier['distance'][positions_to_update] = calculate_one_distance(
+        max_intensity, means, pixel_intensities(img, reg, frontier['position'][positions_to_update]),
+        reg[new_pixel], norm)
+    return frontier
 
 
-def update_top_neighbors(reg, top_neighbors, pos_min_dist):
+def position_of_smallest_distance(reg, frontier):
     """
-    updates the upper neighbor array
-    :param reg: array with region numbers (2D array)
-    :param top_neighbors: array with the region numbers of the neighbors to the upper side (2D array)
-    :param pos_min_dist: pixel which was lastly added to a region (tuple)
-    :return: updated upper neighbor array (2D array)
+    finds the frontier record with the smallest distance, for equal distances the record with the first direction
+    (see connectivity.neighbor_offsets) and then the first pixel is used
+    :param reg: array with region numbers (2D/3D array)
+    :param frontier: frontier records (1D array with FRONTIER_DTYPE)
+    :return: position of the pixel with the smallest distance (tuple), index of the record in the frontier (int)
     """
-    if pos_min_dist[0] != 0:  # not border
-        top_neighbor_pos = (pos_min_dist[0] - 1, pos_min_dist[1])
-        if not is_labeled(reg, top_neighbor_pos):
-            top_neighbors[top_neighbor_pos] = reg[pos_min_dist]
-    top_neighbors[pos_min_dist] = 0
-    return top_neighbors
+    minimal_distances = np.where(frontier['distance'] == np.amin(frontier['distance']))[0]
+    candidates = frontier[minimal_distances]
+    record_number = int(minimal_distances[np.lexsort((candidates['position'], candidates['direction']))[0]])
+    pos_min_dist = tuple(int(i) for i in np.unravel_index(frontier['position'][record_number], reg.shape))
+    return pos_min_dist, record_number
 
 
-def update_bottom_neighbors(reg, bottom_neighbors, pos_min_dist):
+def update_neighbors(reg, frontier, pos_min_dist, connectivity=4):
     """
-    updates the lower neighbor array
-    :param reg: array with region numbers (2D array)
-    :param bottom_neighbors: array with the region numbers of the neighbors to lower side (2D array)
+    removes the newly labeled pixel from the frontier and adds its unlabeled neighbors
+    :param reg: array with region numbers (2D/3D array)
+    :param frontier: frontier records (1D array with FRONTIER_DTYPE)
     :param pos_min_dist: pixel which was lastly added to a region (tuple)
-    :return: updated lower neighbor array (2D array)
-    """
-    if pos_min_dist[0] != reg.shape[0] - 1:  # not border
-        bottom_neighbor_pos = (pos_min_dist[0] + 1, pos_min_dist[1])
-        if not is_labeled(reg, bottom_neighbor_pos):
-            bottom_neighbors[bottom_neighbor_pos] = reg[pos_min_dist]
-    bottom_neighbors[pos_min_dist] = 0
-    return bottom_neighbors
-
-
-def label_new_pixel(reg, left_distances, right_distances, top_distances, bottom_distances, left_neighbors,
-                    right_neighbors, top_neighbors, bottom_neighbors):
-    """
-    determines the pixel with the smallest distance and decides how it should be labeled and
-    updates the neighbor arrays for all directions
-    :param reg: array with region numbers (2D array)
-    :param left_distances: array with the calculated distances of the pixel to region of left neighbors (2D array)
-    :param right_distances: array with the calculated distances of the pixel to region of right neighbors (2D array)
-    :param top_distances: array with the calculated distances of the pixel to region of upper neighbors (2D array)
-    :param bottom_distances: array with the calculated distances of the pixel to region of lower neighbors (2D array)
-    :param left_neighbors: array with the region numbers of the neighbors to the left side (2D array)
-    :param right_neighbors: array with the region numbers of the neighbors to the right side (2D array)
-    :param top_neighbors: array with the region numbers of the neighbors to the upper side (2D array)
-    :param bottom_neighbors: array with the region numbers of the neighbors to lower side (2D array)
-    :return: reg: array with region numbers (2D array), pos_min_dist: pixel that was lastly added to a region (tuple),
-    four arrays with region numbers of neighbors (2D arrays)
-    """
-    pos_min_dist_return = position_of_smallest_distance(left_distances, right_distances, top_distances,
-                                                        bottom_distances)
-    pos_min_dist = pos_min_dist_return[0]
-    border_number = pos_min_dist_return[1]
-    one_border_neighbors = choose_border_number(border_number, left_neighbors, right_neighbors, top_neighbors,
-                                                bottom_neighbors)
-
-    reg[pos_min_dist] = one_border_neighbors[pos_min_dist]
-
-    left_neighbors = update_left_neighbors(reg, left_neighbors, pos_min_dist)
-    right_neighbors = update_right_neighbors(reg, right_neighbors, pos_min_dist)
-    top_neighbors = update_top_neighbors(reg, top_neighbors, pos_min_dist)
-    bottom_neighbors = update_bottom_neighbors(reg, bottom_neighbors, pos_min_dist)
-
-    return reg, pos_min_dist, left_neighbors, right_neighbors, top_neighbors, bottom_neighbors  # one_border?
-
-
-def region_growing(img, reg):
-    """
-    performs region growing algorithm on image with defined seeds (reg)
-    :param img: intensity values (2D array)
-    :param reg: region numbers (2D array)
-    :return: labeled image with region numbers (2D array)
-    """
-    left_neighbors, right_neighbors, top_neighbors, bottom_neighbors = find_seed_neighbors(reg)
-
-    means, left_distances, right_distances, top_distances, bottom_distances = \
-        calculate_distances(img, reg, left_neighbors, right_neighbors, top_neighbors, bottom_neighbors)
-
-    reg, pos_min_dist, left_neighbors, right_neighbors, top_neighbors, bottom_neighbors = \
-        label_new_pixel(reg, left_distances, right_distances, top_distances, bottom_distances, left_neighbors,
-                        right_neighbors, top_neighbors, bottom_neighbors)
-
-    #  i = 0
-
-    while unlabeled_pixel_exist(reg):
-        
-        #  i += 1
-        #  if i % 5000 == 0:
-            #  print(i)
-
-        left_distances, right_distances, top_distances, bottom_distances = \
-            update_distances(img, reg, means, pos_min_dist, left_neighbors, right_neighbors, top_neighbors,
-                             bottom_neighbors, left_distances, right_distances, top_distances, bottom_distances)
-
-        reg, pos_min_dist, left_neighbors, right_neighbors, top_neighbors, bottom_neighbors = \
-            label_new_pixel(reg, left_distances, right_distances, top_distances, bottom_distances, left_neighbors,
-                            right_neighbors, top_neighbors, bottom_neighbors)
+    :param connectivity: 4, 8 (2D), 6, 26 (3D) or a footprint (int or array), see connectivity.neighbor_offsets
+    :return: updated frontier records (1D array with FRONTIER_DTYPE)
+    """
+    new_pixel = np.ravel_multi_index(pos_min_dist, reg.shape)
+    frontier = frontier[frontier['position'] != new_pixel]
+    return np.concatenate((frontier, frontier_records(reg, np.asarray([new_pixel]), connectivity)))
+
+
+def label_new_pixel(reg, frontier, connectivity=4):
+    """
+    determines the pixel with the smallest distance, labels it with the region of this frontier record and
+    updates the frontier
+    :param reg: array with region numbers (2D/3D array)
+    :param frontier: frontier records (1D array with FRONTIER_DTYPE)
+    :param connectivity: 4, 8 (2D), 6, 26 (3D) or a footprint (int or array), see connectivity.neighbor_offsets
+    :return: reg: array with region numbers (2D/3D array),
+    pos_min_dist: pixel that was lastly added to a region (tuple),
+    frontier: updated frontier records (1D array with FRONTIER_DTYPE)
+    """
+    pos_min_dist, record_number = position_of_smallest_distance(reg, frontier)
+    reg[pos_min_dist] = frontier['region'][record_number]
+    frontier = update_neighbors(reg, frontier, pos_min_dist, connectivity)
+    return reg, pos_min_dist, frontier
+
+
+def region_growing(img, reg, connectivity=4, norm=2, checkpoint_path=None, checkpoint_interval=10 ** 4,
+                   statistics=None):
+    """
+    performs region growing algorithm on image or volume with defined seeds (reg)
+    :param img: intensity values (2D/3D array, with an additional last axis for several channels)
+    :param reg: region numbers (2D/3D array)
+    :param connectivity: 4, 8 (2D), 6, 26 (3D) or a footprint (int or array), see connectivity.neighbor_offsets
+    :param norm: order of the norm that combines the channels, e.g. 1, 2 or np.inf (see np.linalg.norm)
+    :param checkpoint_path: file for the state of the growth, if it exists the growth continues from there with the
+    same result as without interruption, it is removed at the end, None for no checkpoints (str)
+    :param checkpoint_interval: number of labeled pixels between two checkpoints (int)
+    :param statistics: intensity sums and pixel counts of the regions (see region_statistics) and maximal intensity
+    (see maximal_intensity) to start from instead of the ones of img and reg, e.g. of the whole image when only a part
+    of it is grown, they are not changed, can not be combined with checkpoints (tuple)
+    :return: labeled image with region numbers (2D/3D array)
+    """
+    if statistics is not None and checkpoint_path is not None:
+        raise ValueError("statistics can not be combined with checkpoint_path")
+    max_intensity = None
+    # reg is labeled in place, so it is checked with the seeds of the checkpoint and not hashed
+    fingerprint = None if checkpoint_path is None else cp.run_fingerprint(
+        "seeded_region_growing.region_growing", img, None, connectivity=con.neighbor_offsets(connectivity), norm=norm)
+    state = cp.load_checkpoint(checkpoint_path, reg.shape, fingerprint, None if checkpoint_path is None else reg)
+    if state is None:
+        seeds = None if checkpoint_path is None else cp.seed_labels(reg)
+    else:
+        seeds = state["seed_positions"], state["seed_labels"]
+    if state is None and statistics is not None:
+        region_sums, region_counts = np.array(statistics[0], float), np.array(statistics[1])
+        max_intensity = statistics[2]
+        with np.errstate(invalid='ignore', divide='ignore'):  # empty regions get the mean nan like in mean_region
+            means = list(region_sums[1:] / region_counts[1:].reshape((-1,) + (1,) * (region_sums.ndim - 1)))
+        frontier = find_seed_neighbors(reg, connectivity)
+        frontier['distance'] = calculate_one_distance(max_intensity, means,
+                                                      pixel_intensities(img, reg, frontier['position']),
+                                                      frontier['region'], norm)
+    elif state is None:
+        frontier = find_seed_neighbors(reg, connectivity)
+        means, frontier = calculate_distances(img, reg, frontier, norm)
+        region_sums, region_counts = region_statistics(img, reg)
+    else:
+        reg[...] = state["labels"]
+        frontier = state["frontier"].astype(FRONTIER_DTYPE)
+        means = list(state["means"])
+        region_sums = state["sums"]
+        region_counts = state["counts"]
+
+    labeled_pixels = 0
+    while frontier.size != 0:
+        reg, pos_min_dist, frontier = label_new_pixel(reg, frontier, connectivity)
+        frontier = update_distances(img, reg, means, region_sums, region_counts, pos_min_dist, frontier, norm,
+                                    max_intensity)
+        labeled_pixels += 1
+        if checkpoint_path is not None and labeled_pixels % checkpoint_interval == 0:
+            cp.save_checkpoint(checkpoint_path, shape=np.asarray(reg.shape), fingerprint=np.asarray(fingerprint),
+                               labels=np.asarray(reg), seed_positions=seeds[0], seed_labels=seeds[1],
+                               frontier=frontier, means=np.asarray(means), sums=region_sums, counts=region_counts)
+    cp.remove_checkpoint(checkpoint_path)
     return reg
@@ -1,39 +1,138 @@
+import argparse
+import glob
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
 import skimage.io as sk
 import numpy as np
 from Functions import image_processing as ip
 from Functions import region_merging as rm
 from Functions import seeded_region_growing as srg
+from Functions import heap_region_growing as hrg
+from Functions import bucket_region_growing as brg
 from Functions import unseeded_region_growing as urg
 from Functions import seed_detection as sd
 from Functions import dice_score as ds
 from PIL import Image
 
 
-def seeded_segmentation(img, gt, threshold_seeds, threshold_merging_intensity, threshold_merging_size):
+def segmentation_from_seeds(img, gt, image_regions_from_seeds, threshold_merging_intensity, threshold_merging_size,
+                            connectivity=4, bucket_levels=None, keep_region_numbers=False):
+    """
+    region growing from labeled seeds followed by region merging
+    :param img: intensity values (2d array, with an additional last axis for several channels)
+    :param gt: ground truth, None if there is none (2d array)
+    :param image_regions_from_seeds: region numbers of the seeds (2d array)
+    :param threshold_merging_intensity: threshold for intensity distance between region (float, 0 < threshold < 1)
+    :param threshold_merging_size: threshold for region size (int)
+    :param connectivity: 4, 8 or a footprint of the neighborhood used by all steps (int or 2d array)
+    :param bucket_levels: number of distance levels for the bucket queue growth, None for the exact growth (int)
+    :param keep_region_numbers: True to keep the seed number of the region the others were merged into for every
+    merged region (bool)
+    :return: resulting image (2d array)
+    :return: unweighted dice score, None without ground truth (float)
+    :return: region numbers after region merging (2d array)
+    """
+    if bucket_levels is None:
+        image_srg = hrg.region_growing(img, image_regions_from_seeds, connectivity)
+    else:
+        image_srg = brg.bucket_region_growing(img, image_regions_from_seeds, bucket_levels, connectivity)
+    image_merged = rm.region_merging(image_srg, img, threshold_merging_intensity, threshold_merging_size, connectivity,
+                                     keep_region_numbers=keep_region_numbers)
+    image_clipped = ds.final_clipping(image_merged)
+
+    dice_value = None
+    if gt is not None:
+        dice_value = ds.dice_score(image_merged, gt)
+
+    return image_clipped, dice_value, image_merged
+
+
+def seeded_segmentation(img, gt, threshold_seeds, threshold_merging_intensity, threshold_merging_size,
+                        connectivity=4, bucket_levels=None):
     """
     total seeded region growing algorithm
-    :param img: intensity values (2d array)
-    :param gt: (2d array)
+    :param img: intensity values (2d array, with an additional last axis for several channels)
+    :param gt: ground truth, None if there is none (2d array)
     :param threshold_seeds: relative euclidean distance 0 < threshold < 1 (float)
     :param threshold_merging_intensity: threshold for intensity distance between region (float, 0 < threshold < 1)
     :param threshold_merging_size: threshold for region size (int)
+    :param connectivity: 4, 8 or a footprint of the neighborhood used by all steps (int or 2d array)
+    :param bucket_levels: number of distance levels for the bucket queue growth, None for the exact growth (int)
     :return: resulting image (2d array)
-    :return: unweighted dice score (float)
-    :return: weighted dice score (float)
+    :return: unweighted dice score, None without ground truth (float)
     """
     image_seeds = sd.seeds(img, threshold_seeds)
-    image_regions_from_seeds = sd.seed_merging(image_seeds)
-    image_srg = srg.region_growing(img, image_regions_from_seeds)
-    image_merged = rm.region_merging(image_srg, img, threshold_merging_intensity, threshold_merging_size)
-    image_clipped = ds.final_clipping(image_merged)
+    image_regions_from_seeds = sd.seed_merging(image_seeds, connectivity)
+    image_clipped, dice_value, _ = segmentation_from_seeds(img, gt, image_regions_from_seeds,
+                                                           threshold_merging_intensity, threshold_merging_size,
+                                                           connectivity, bucket_levels)
+    return image_clipped, dice_value
 
-    dice_value = ds.dice_score(image_merged, gt)
 
-    return image_clipped, dice_value
+def warm_start_segmentation(img, gt, previous_labels, threshold_seeds, threshold_merging_intensity,
+                            threshold_merging_size, erosion=3, detect_seeds=None, connectivity=4, threshold_drift=0.1,
+                            redetect_fraction=0.01):
+    """
+    seeded region growing algorithm for a frame of a time-lapse sequence, the seeds are the eroded regions of the
+    previous frame, so the regions keep their numbers from frame to frame
+    :param img: intensity values (2d array, with an additional last axis for several channels)
+    :param gt: ground truth, None if there is none (2d array)
+    :param previous_labels: region numbers of the previous frame after region merging (2d array)
+    :param threshold_seeds: relative euclidean distance 0 < threshold < 1 of the seed detection (float)
+    :param threshold_merging_intensity: threshold for intensity distance between region (float, 0 < threshold < 1)
+    :param threshold_merging_size: threshold for region size (int)
+    :param erosion: number of erosion steps for the seeds from the previous frame (int)
+    :param detect_seeds: True to take the background seeds from the seed detection instead of the previous frame and
+    to add the detected seeds that do not touch a seed from the previous frame, e.g. for cells that enter the image
+    or moved into the former background, without it the segmentation drifts away from cells that move further than
+    the erosion, False to only use the seeds of the previous frame, None to run the seed detection only if more than
+    redetect_fraction of the seed pixels from the previous frame drifted, so frames where the cells barely moved
+    skip it (bool)
+    :param connectivity: 4, 8 or a footprint of the neighborhood used by all steps (int or 2d array)
+    :param threshold_drift: relative intensity distance 0 < threshold < 1, seed pixels from the previous frame that
+    differ more from the mean of their seed in this frame are removed, None keeps all and never runs the seed
+    detection for detect_seeds None (float)
+    :param redetect_fraction: share of the seed pixels from the previous frame removed by threshold_drift above which
+    the seed detection runs if detect_seeds is None (float)
+    :return: resulting image (2d array)
+    :return: unweighted dice score, None without ground truth (float)
+    :return: region numbers after region merging, input for the next frame (2d array)
+    """
+    image_regions_from_seeds = sd.warm_start_seeds(previous_labels, erosion, connectivity)
+    carried_pixels = np.count_nonzero(image_regions_from_seeds)
+    if threshold_drift is not None:
+        image_regions_from_seeds = sd.remove_drifted_seeds(image_regions_from_seeds, img, threshold_drift)
+    if detect_seeds is None:
+        drifted_pixels = carried_pixels - np.count_nonzero(image_regions_from_seeds)
+        detect_seeds = drifted_pixels > redetect_fraction * carried_pixels
+    if detect_seeds:
+        detected_seeds = sd.seed_merging(sd.seeds(img, threshold_seeds), connectivity)
+        # the background of the previous frame is not carried over, it covers the cells that moved into it
+        image_regions_from_seeds[image_regions_from_seeds == ds.find_background_number(previous_labels)] = 0
+        overlapping = np.unique(detected_seeds[image_regions_from_seeds != 0])
+        new_seeds = (detected_seeds != 0) & ~np.isin(detected_seeds, overlapping)
+        image_regions_from_seeds = image_regions_from_seeds.astype(int)  # the new region numbers may not fit
+        image_regions_from_seeds[new_seeds] = detected_seeds[new_seeds] + int(np.amax(previous_labels))
+
+    # region merging works on region numbers 1..number of regions, the numbers are restored afterwards
+    region_numbers = srg.compact_labels(np.union1d(0, image_regions_from_seeds))
+    compact_seeds = srg.compact_labels(np.searchsorted(region_numbers, image_regions_from_seeds))
+    image_clipped, dice_value, image_merged = segmentation_from_seeds(img, gt, compact_seeds,
+                                                                      threshold_merging_intensity,
+                                                                      threshold_merging_size, connectivity,
+                                                                      keep_region_numbers=True)
+    labels = region_numbers[image_merged]
+    # every region keeps the number of a seed it grew from, so the number has to be found at the seed's pixels
+    carried_labels = np.unique(labels[labels == image_regions_from_seeds])
+    if np.setdiff1d(labels, np.union1d(0, carried_labels)).size:
+        raise ValueError("the merged regions lost the region numbers of their seeds")
+    return image_clipped, dice_value, labels
 
 
 def unseeded_segmentation(img, gt, start_pixel, threshold_region_growing, threshold_merging_intensity,
-                          threshold_merging_size):
+                          threshold_merging_size, connectivity=4, bucket_levels=None):
     """
     total unseeded region growing algorithm
     :param img: intensity values (2d array)
@@ -42,14 +141,20 @@ def unseeded_segmentation(img, gt, start_pixel, threshold_region_growing, thresh
     :param threshold_region_growing: threshold for region growing (float/int)
     :param threshold_merging_intensity: threshold for intensity distance between region (float, 0 < threshold < 1)
     :param threshold_merging_size: threshold for region size (int)
-    :return: resulting image (2d array)
+    :param connectivity: 4, 8 or a footprint of the neighborhood used by all steps (int or 2d array)
+    :param bucket_levels: number of distance levels for the bucket queue growth, None for the exact growth (int)
+    :return: resulting image (2d array), unweighted dice score, None without ground truth (float)
     """
-    image_urg = urg.unseeded_region_growing_algorithm(img, start_pixel, threshold_region_growing)
-    image_merged = rm.region_merging(image_urg, img, threshold_merging_intensity, threshold_merging_size)
+    if bucket_levels is None:
+        image_urg = urg.unseeded_region_growing_algorithm(img, start_pixel, threshold_region_growing, connectivity)
+    else:
+        image_urg = brg.bucket_unseeded_region_growing(img, start_pixel, threshold_region_growing, bucket_levels,
+                                                       connectivity)
+    image_merged = rm.region_merging(image_urg, img, threshold_merging_intensity, threshold_merging_size, connectivity)
     image_filtered = ip.median_filter(image_merged, 3)
     image_clipped = ds.final_clipping(image_filtered)
 
-    dice_value = ds.dice_score(image_merged, gt)
+    dice_value = None if gt is None else ds.dice_score(image_merged, gt)
 
     return image_clipped, dice_value
 
@@ -65,13 +170,342 @@ def manuel_segmentation():
     return image_segmented
 
 
+# settings of a batch run, set once per worker process by init_batch_worker
+batch_settings = {}
+
+
+def ground_truth_path(image_path):
+    """
+    finds the ground truth of a frame in the gt folder next to the img folder, the file name of the ground truth ends
+    with the same frame number as the image (e.g. img/t01.tif and gt/man_seg01.tif, img/dna-0.png and gt/0.png)
+    :param image_path: path of the image (str)
+    :return: path of the ground truth, None if there is none (str)
+    """
+    frame_number = re.search(r"(\d+)$", os.path.splitext(os.path.basename(image_path))[0])
+    gt_folder = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(image_path))), "gt")
+    if frame_number is None or not os.path.isdir(gt_folder):
+        return None
+    for gt_name in sorted(os.listdir(gt_folder)):
+        gt_number = re.search(r"(?<!\d)(\d+)$", os.path.splitext(gt_name)[0])
+        if gt_number is not None and gt_number.group(1) == frame_number.group(1):
+            return os.path.join(gt_folder, gt_name)
+    return None
+
+
+def init_batch_worker(output_folder, threshold_seeds, threshold_merging_intensity, threshold_merging_size,
+                      connectivity):
+    """
+    prepares a worker process of a batch run once, the settings are stored in the process instead of being sent with
+    every frame and the image libraries are loaded before the first frame
+    :param output_folder: folder for the resulting images (str)
+    :param threshold_seeds: relative euclidean distance 0 < threshold < 1 (float)
+    :param threshold_merging_intensity: threshold for intensity distance between region (float, 0 < threshold < 1)
+    :param threshold_merging_size: threshold for region size (int)
+    :param connectivity: 4, 8 or a footprint of the neighborhood used by all steps (int or 2d array)
+    :return: None
+    """
+    batch_settings.update(output_folder=output_folder, threshold_seeds=threshold_seeds,
+                          threshold_merging_intensity=threshold_merging_intensity,
+                          threshold_merging_size=threshold_merging_size, connectivity=connectivity)
+
+
+def segment_frame(image_path):
+    """
+    seeded segmentation of one frame of a batch run with the settings of the worker process,
+    the clipped image is saved in the output folder
+    :param image_path: path of the image (str)
+    :return: path of the saved image (str), dice score, None without ground truth (float)
+    """
+    img = sk.imread(image_path)
+    gt_path = ground_truth_path(image_path)
+    gt = None if gt_path is None else sk.imread(gt_path)
+    image_clipped, dice_value = seeded_segmentation(img, gt, batch_settings["threshold_seeds"],
+                                                    batch_settings["threshold_merging_intensity"],
+                                                    batch_settings["threshold_merging_size"],
+                                                    batch_settings["connectivity"])
+    name = os.path.splitext(os.path.basename(image_path))[0]
+    result_path = os.path.join(batch_settings["output_folder"], "{}_srg_clipped_{}_{}.tif".format(
+        name, batch_settings["threshold_merging_intensity"], batch_settings["threshold_merging_size"]))
+    Image.fromarray(image_clipped.astype(np.uint8)).save(result_path)
+    return result_path, dice_value
+
+
+def batch_segmentation(images, output_folder, threshold_seeds, threshold_merging_intensity, threshold_merging_size,
+                       workers=None, connectivity=4):
+    """
+    seeded segmentation of all frames of a time-lapse sequence, the frames are distributed to worker processes
+    :param images: folder with the frames or glob pattern of the frames (str)
+    :param output_folder: folder for the resulting images, created if it does not exist (str)
+    :param threshold_seeds: relative euclidean distance 0 < threshold < 1 (float)
+    :param threshold_merging_intensity: threshold for intensity distance between region (float, 0 < threshold < 1)
+    :param threshold_merging_size: threshold for region size (int)
+    :param workers: number of worker processes, None uses all cores (int)
+    :param connectivity: 4, 8 or a footprint of the neighborhood used by all steps (int or 2d array)
+    :return: path of the saved image and dice score (None without ground truth) for every frame (list of tuples)
+    """
+    if os.path.isdir(images):
+        images = os.path.join(images, "*")
+    image_paths = sorted(path for path in glob.glob(images) if os.path.isfile(path))
+    os.makedirs(output_folder, exist_ok=True)
+    with ProcessPoolExecutor(max_workers=workers, initializer=init_batch_worker,
+                             initargs=(output_folder, threshold_seeds, threshold_merging_intensity,
+                                       threshold_merging_size, connectivity)) as executor:
+        return list(executor.map(segment_frame, image_paths))
+
+
+def time_lapse_segmentation(images, output_folder, threshold_seeds, threshold_merging_intensity,
+                            threshold_merging_size, erosion=3, detect_seeds=None, connectivity=4, threshold_drift=0.1,
+                            redetect_fraction=0.01):
+    """
+    seeded segmentation of a time-lapse sequence frame by frame, the seeds of the first frame come from the seed
+    detection, the seeds of every other frame from the previous frame (see warm_start_segmentation)
+    :param images: folder with the frames or glob pattern of the frames (str)
+    :param output_folder: folder for the resulting images, created if it does not exist (str)
+    :param threshold_seeds: relative euclidean distance 0 < threshold < 1 (float)
+    :param threshold_merging_intensity: threshold for intensity distance between region (float, 0 < threshold < 1)
+    :param threshold_merging_size: threshold for region size (int)
+    :param erosion: number of erosion steps for the seeds from the previous frame (int)
+    :param detect_seeds: True to run the seed detection for every frame to find new cells and the background, False
+    for no frame, None only for frames whose seeds from the previous frame drifted (bool, see warm_start_segmentation)
+    :param connectivity: 4, 8 or a footprint of the neighborhood used by all steps (int or 2d array)
+    :param threshold_drift: relative intensity distance 0 < threshold < 1 for the seeds from the previous frame,
+    None keeps all (float, see warm_start_segmentation)
+    :param redetect_fraction: share of drifted seed pixels above which the seed detection runs if detect_seeds is
+    None (float, see warm_start_segmentation)
+    :return: path of the saved image and dice score (None without ground truth) for every frame (list of tuples)
+    """
+    if os.path.isdir(images):
+        images = os.path.join(images, "*")
+    image_paths = sorted(path for path in glob.glob(images) if os.path.isfile(path))
+    os.makedirs(output_folder, exist_ok=True)
+    results = []
+    previous_labels = None
+    for image_path in image_paths:
+        img = sk.imread(image_path)
+        gt_path = ground_truth_path(image_path)
+        gt = None if gt_path is None else sk.imread(gt_path)
+        if previous_labels is None:
+            image_regions_from_seeds = sd.seed_merging(sd.seeds(img, threshold_seeds), connectivity)
+            image_clipped, dice_value, previous_labels = segmentation_from_seeds(
+                img, gt, image_regions_from_seeds, threshold_merging_intensity, threshold_merging_size, connectivity)
+        else:
+            image_clipped, dice_value, previous_labels = warm_start_segmentation(
+                img, gt, previous_labels, threshold_seeds, threshold_merging_intensity, threshold_merging_size,
+                erosion, detect_seeds, connectivity, threshold_drift, redetect_fraction)
+        name = os.path.splitext(os.path.basename(image_path))[0]
+        result_path = os.path.join(output_folder, "{}_srg_clipped_{}_{}.tif".format(
+            name, threshold_merging_intensity, threshold_merging_size))
+        Image.fromarray(image_clipped.astype(np.uint8)).save(result_path)
+        results.append((result_path, dice_value))
+    return results
+
+
+# image, ground truth and settings of the unseeded runs of multi_start_segmentation and threshold_sweep,
+# set once per worker process by init_unseeded_worker
+unseeded_settings = {}
+
+
+def share_array(array):
+    """
+    copies an array into a block of shared memory that worker processes can use without their own copy
+    :param array: (nd array)
+    :return: shared memory block, has to be closed and unlinked by the caller (SharedMemory),
+    name, shape and dtype of the array to attach to it (tuple)
+    """
+    array = np.ascontiguousarray(array)
+    block = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+    np.ndarray(array.shape, array.dtype, buffer=block.buf)[...] = array
+    return block, (block.name, array.shape, array.dtype.str)
+
+
+def attach_array(description):
+    """
+    attaches to an array in shared memory created by share_array
+    :param description: name, shape and dtype of the array (tuple)
+    :return: shared memory block, has to be kept as long as the array is used (SharedMemory), array (nd array)
+    """
+    name, shape, dtype = description
+    block = shared_memory.SharedMemory(name=name)
+    return block, np.ndarray(shape, dtype, buffer=block.buf)
+
+
+def init_unseeded_worker(img_description, gt_description, threshold_merging_intensity, threshold_merging_size,
+                         connectivity, bucket_levels):
+    """
+    prepares a worker process for unseeded runs once, the image and the ground truth are attached from shared
+    memory instead of being sent with every run
+    :param img_description: name, shape and dtype of the image in shared memory (tuple)
+    :param gt_description: name, shape and dtype of the ground truth in shared memory, None without (tuple)
+    :param threshold_merging_intensity: threshold for intensity distance between region (float, 0 < threshold < 1)
+    :param threshold_merging_size: threshold for region size (int)
+    :param connectivity: 4, 8 or a footprint of the neighborhood used by all steps (int or 2d array)
+    :param bucket_levels: number of distance levels for the bucket queue growth, None for the exact growth (int)
+    :return: None
+    """
+    blocks = []
+    for key, description in (("img", img_description), ("gt", gt_description)):
+        array = None
+        if description is not None:
+            block, array = attach_array(description)
+            blocks.append(block)
+        unseeded_settings[key] = array
+    unseeded_settings.update(blocks=blocks, threshold_merging_intensity=threshold_merging_intensity,
+                             threshold_merging_size=threshold_merging_size, connectivity=connectivity,
+                             bucket_levels=bucket_levels)
+
+
+def segment_unseeded(run):
+    """
+    unseeded segmentation with the image and the settings of the worker process
+    :param run: start pixel (tuple) and threshold for region growing (float/int) (tuple)
+    :return: clipped image (2d array), dice score, None without ground truth (float), separation score (float)
+    """
+    start_pixel, threshold_region_growing = run
+    img = unseeded_settings["img"]
+    image_clipped, dice_value = unseeded_segmentation(img, unseeded_settings["gt"], start_pixel,
+                                                      threshold_region_growing,
+                                                      unseeded_settings["threshold_merging_intensity"],
+                                                      unseeded_settings["threshold_merging_size"],
+                                                      unseeded_settings["connectivity"],
+                                                      unseeded_settings["bucket_levels"])
+    return image_clipped, dice_value, ds.separation_score(img, image_clipped)
+
+
+def parallel_unseeded_segmentation(img, gt, runs, threshold_merging_intensity, threshold_merging_size, workers=None,
+                                   connectivity=4, bucket_levels=None):
+    """
+    performs unseeded segmentations in worker processes that share the image and the ground truth
+    :param img: intensity values (2d array)
+    :param gt: ground truth, None without (2d array)
+    :param runs: start pixel and threshold for region growing of every run (list of tuples)
+    :param threshold_merging_intensity: threshold for intensity distance between region (float, 0 < threshold < 1)
+    :param threshold_merging_size: threshold for region size (int)
+    :param workers: number of worker processes, None uses all cores (int)
+    :param connectivity: 4, 8 or a footprint of the neighborhood used by all steps (int or 2d array)
+    :param bucket_levels: number of distance levels for the bucket queue growth, None for the exact growth (int)
+    :return: clipped image, dice score (None without ground truth) and separation score of every run
+    (list of tuples)
+    """
+    blocks = []
+    try:
+        img_block, img_description = share_array(img)
+        blocks.append(img_block)
+        gt_description = None
+        if gt is not None:
+            gt_block, gt_description = share_array(gt)
+            blocks.append(gt_block)
+        with ProcessPoolExecutor(max_workers=workers, initializer=init_unseeded_worker,
+                                 initargs=(img_description, gt_description, threshold_merging_intensity,
+                                           threshold_merging_size, connectivity, bucket_levels)) as executor:
+            return list(executor.map(segment_unseeded, runs))
+    finally:
+        for block in blocks:
+            block.close()
+            block.unlink()
+
+
+def best_run(keys, results, with_gt):
+    """
+    chooses the best of several unseeded segmentations, by the dice score with ground truth, otherwise by the
+    separation score (see dice_score.separation_score)
+    :param keys: what distinguishes the runs, e.g. start pixels or thresholds (list)
+    :param results: clipped image, dice score and separation score of every run (list of tuples)
+    :param with_gt: True if the dice scores were calculated (bool)
+    :return: clipped image of the best run (2d array), its dice score, None without ground truth (float),
+    key of the best run, dice score (with ground truth) or separation score of every run (dict)
+    """
+    scores = {key: dice_value if with_gt else separation for key, (_, dice_value, separation) in zip(keys, results)}
+    best_key = max(scores, key=scores.get)  # the first run for equal scores
+    image_clipped, dice_value, _ = results[list(scores).index(best_key)]
+    return image_clipped, dice_value, best_key, scores
+
+
+def multi_start_segmentation(img, gt, threshold_region_growing, threshold_merging_intensity, threshold_merging_size,
+                             start_pixels=None, number_of_starts=4, workers=None, connectivity=4, bucket_levels=None):
+    """
+    unseeded segmentation from several start pixels in parallel worker processes that share the image,
+    the best result is chosen by the dice score with ground truth, otherwise by the separation score
+    (see dice_score.separation_score)
+    :param img: intensity values (2d array)
+    :param gt: ground truth, None without (2d array)
+    :param threshold_region_growing: threshold for region growing (float/int)
+    :param threshold_merging_intensity: threshold for intensity distance between region (float, 0 < threshold < 1)
+    :param threshold_merging_size: threshold for region size (int)
+    :param start_pixels: start pixels to try, None picks them in the background (see
+    seed_detection.background_start_pixels) (list of tuples)
+    :param number_of_starts: number of start pixels picked if start_pixels is None (int)
+    :param workers: number of worker processes, None uses all cores (int)
+    :param connectivity: 4, 8 or a footprint of the neighborhood used by all steps (int or 2d array)
+    :param bucket_levels: number of distance levels for the bucket queue growth, None for the exact growth (int)
+    :return: clipped image of the best start pixel (2d array), its dice score, None without ground truth (float),
+    the best start pixel (tuple), dice score (with ground truth) or separation score of every start pixel (dict)
+    """
+    if start_pixels is None:
+        start_pixels = sd.background_start_pixels(img, number_of_starts)
+    start_pixels = list(dict.fromkeys(tuple(int(i) for i in start_pixel) for start_pixel in start_pixels))
+    if not start_pixels:
+        raise ValueError("no start pixel for the unseeded segmentation")
+    results = parallel_unseeded_segmentation(img, gt, [(start_pixel, threshold_region_growing)
+                                                       for start_pixel in start_pixels],
+                                             threshold_merging_intensity, threshold_merging_size, workers,
+                                             connectivity, bucket_levels)
+    return best_run(start_pixels, results, gt is not None)
+
+
+def threshold_sweep(img, gt, thresholds, threshold_merging_intensity, threshold_merging_size, start_pixel=(0, 0),
+                    workers=None, connectivity=4, bucket_levels=None):
+    """
+    unseeded segmentation with several thresholds for region growing in one call, the thresholds run in parallel
+    worker processes that load the image and the ground truth once from shared memory
+    :param img: intensity values (2d array)
+    :param gt: ground truth, None without (2d array)
+    :param thresholds: thresholds for region growing to try (list of floats/ints)
+    :param threshold_merging_intensity: threshold for intensity distance between region (float, 0 < threshold < 1)
+    :param threshold_merging_size: threshold for region size (int)
+    :param start_pixel: start pixel for unseeded region growing (tuple)
+    :param workers: number of worker processes, None uses all cores (int)
+    :param connectivity: 4, 8 or a footprint of the neighborhood used by all steps (int or 2d array)
+    :param bucket_levels: number of distance levels for the bucket queue growth, None for the exact growth (int)
+    :return: clipped image of the best threshold (2d array), its dice score, None without ground truth (float),
+    the best threshold (float/int), dice score (with ground truth) or separation score of every threshold (dict)
+    """
+    thresholds = list(dict.fromkeys(thresholds))
+    if not thresholds:
+        raise ValueError("no threshold for the threshold sweep")
+    start_pixel = tuple(int(i) for i in start_pixel)
+    results = parallel_unseeded_segmentation(img, gt, [(start_pixel, threshold) for threshold in thresholds],
+                                             threshold_merging_intensity, threshold_merging_size, workers,
+                                             connectivity, bucket_levels)
+    return best_run(thresholds, results, gt is not None)
+
+
 if __name__ == '__main__':
-    image_intensity = sk.imread("../Data/N2DH-GOWT1/img/man_seg01.tif")
-    img_gt = sk.imread("../Data/N2DH-GOWT1/gt/man_seg01.tif")
-    image_final_srg, dice_srg = seeded_segmentation(image_intensity, img_gt, 0.1, 0.05, 400)
-    image_final_srg_save = Image.fromarray(image_final_srg.copy())
-    image_final_srg_save.save("../Result_Pictures/Seeded_Region_Growing/NIH3T3/dna-42_srg_merged.tif")
-
-    image_final_urg, dice_urg = unseeded_segmentation(image_intensity, img_gt, (0, 0), 5, 0.001, 10000)
-    image_final_urg_save = Image.fromarray(image_final_urg.copy())
-    image_final_urg_save.save("../Result_Pictures/Seeded_Region_Growing/NIH3T3/dna-42_srg_clipped.tif")
+    parser = argparse.ArgumentParser(description="seeded segmentation of a time-lapse sequence")
+    parser.add_argument("images", nargs="?", default="../Data/N2DH-GOWT1/img", help="folder or glob pattern")
+    parser.add_argument("--output", default="../Result_Pictures/Seeded_Region_Growing/N2DH-GOWT1")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--threshold-seeds", type=float, default=0.1)
+    parser.add_argument("--threshold-merging-intensity", type=float, default=0.05)
+    parser.add_argument("--threshold-merging-size", type=int, default=400)
+    parser.add_argument("--connectivity", type=int, default=4)
+    parser.add_argument("--warm-start", action="store_true", help="seeds from the previous frame, one process")
+    parser.add_argument("--erosion", type=int, default=3)
+    parser.add_argument("--detect-seeds", dest="detect_seeds", action="store_const", const=True, default=None,
+                        help="warm start with the seed detection in every frame, by default only after drift")
+    parser.add_argument("--no-detect-seeds", dest="detect_seeds", action="store_const", const=False,
+                        help="warm start only from the previous frame without the seed detection")
+    parser.add_argument("--redetect-fraction", type=float, default=0.01)
+    parser.add_argument("--threshold-drift", type=float, default=0.1)
+    arguments = parser.parse_args()
+
+    if arguments.warm_start:
+        results = time_lapse_segmentation(arguments.images, arguments.output, arguments.threshold_seeds,
+                                          arguments.threshold_merging_intensity, arguments.threshold_merging_size,
+                                          arguments.erosion, arguments.detect_seeds, arguments.connectivity,
+                                          arguments.threshold_drift, arguments.redetect_fraction)
+    else:
+        results = batch_segmentation(arguments.images, arguments.output, arguments.threshold_seeds,
+                                     arguments.threshold_merging_intensity, arguments.threshold_merging_size,
+                                     arguments.workers, arguments.connectivity)
+    for result_path, dice_value in results:
+        print(result_path, dice_value)
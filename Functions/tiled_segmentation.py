@@ -0,0 +1,243 @@
+import itertools
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from scipy.sparse import coo_matrix
+from scipy.sparse.csgraph import connected_components
+from Functions import seed_detection as sd
+from Functions import seeded_region_growing as srg
+from Functions import heap_region_growing as hrg
+from Functions import region_merging as rm
+from Functions import dice_score as ds
+from Functions import segmentation as sg
+
+# image shared by tiled_region_growing, set once per worker process by init_tile_worker
+tile_settings = {}
+
+
+def tile_grid(shape, tile_size, halo):
+    """
+    splits an image into tiles, every tile has a core and a halo that overlaps with the neighboring tiles
+    :param shape: shape of the image (tuple)
+    :param tile_size: side length of the core of a tile (int)
+    :param halo: width of the overlap around the core (int)
+    :return: dictionary from grid index (tuple) to the window with halo and the core, both as slices of the image,
+    and the core as slices of the window (tuple of tuples of slices)
+    """
+    tiles = {}
+    starts = [range(0, size, tile_size) for size in shape]
+    for grid_index in itertools.product(*(range(len(axis_starts)) for axis_starts in starts)):
+        window, core, core_in_window = [], [], []
+        for axis, index in enumerate(grid_index):
+            core_start = starts[axis][index]
+            core_stop = min(core_start + tile_size, shape[axis])
+            window_start = max(core_start - halo, 0)
+            window_stop = min(core_stop + halo, shape[axis])
+            window.append(slice(window_start, window_stop))
+            core.append(slice(core_start, core_stop))
+            core_in_window.append(slice(core_start - window_start, core_stop - window_start))
+        tiles[grid_index] = (tuple(window), tuple(core), tuple(core_in_window))
+    return tiles
+
+
+def grow_tile(img_tile, threshold_seeds, connectivity=4):
+    """
+    seed detection, seed merging and seeded region growing of one tile (runs in a worker process)
+    :param img_tile: intensity values of the tile with halo (2d array)
+    :param threshold_seeds: relative euclidean distance 0 < threshold < 1 (float)
+    :param connectivity: 4 or 8 or a footprint (int or array), see connectivity.neighbor_offsets
+    :return: region numbers of the tile, starting at 1 (2d array)
+    """
+    image_seeds = sd.seeds(img_tile, threshold_seeds)
+    image_regions_from_seeds = sd.seed_merging(image_seeds, connectivity)
+    return hrg.region_growing(img_tile, image_regions_from_seeds, connectivity)
+
+
+def init_tile_worker(img_description):
+    """
+    prepares a worker process for tiles once, the image is attached from shared memory instead of being sent with
+    every tile
+    :param img_description: name, shape and dtype of the image in shared memory (tuple, see segmentation.share_array)
+    :return: None
+    """
+    tile_settings["block"], tile_settings["img"] = sg.attach_array(img_description)
+
+
+def grow_shared_tile(window, threshold_seeds, connectivity=4):
+    """
+    grow_tile for a window of the image of the worker process
+    :param window: window of the tile with halo (tuple of slices)
+    :param threshold_seeds: relative euclidean distance 0 < threshold < 1 (float)
+    :param connectivity: 4 or 8 or a footprint (int or array), see connectivity.neighbor_offsets
+    :return: region numbers of the tile, starting at 1 (2d array)
+    """
+    return grow_tile(tile_settings["img"][window], threshold_seeds, connectivity)
+
+
+def fill_shared_window(window, reg_description, connectivity=4):
+    """
+    grows the regions of a window of the stitched region numbers into its pixels without region
+    :param window: window of the image (tuple of slices)
+    :param reg_description: name, shape and dtype of the stitched region numbers in shared memory (tuple)
+    :param connectivity: 4 or 8 or a footprint (int or array), see connectivity.neighbor_offsets
+    :return: region numbers of the window (2d array)
+    """
+    block, reg = sg.attach_array(reg_description)
+    try:
+        labels = np.array(reg[window], np.int64)
+    finally:
+        del reg
+        block.close()
+    return hrg.region_growing(tile_settings["img"][window], labels, connectivity)
+
+
+def fill_window(reg, core, halo):
+    """
+    finds the window a core without regions is grown in: the core with halo, the halo is doubled until the window
+    contains a region
+    :param reg: stitched region numbers (2d array)
+    :param core: core of a tile (tuple of slices)
+    :param halo: width of the overlap around the core of a tile (int)
+    :return: window (tuple of slices)
+    """
+    halo = max(halo, 1)
+    while True:
+        window = tuple(slice(max(axis_slice.start - halo, 0), min(axis_slice.stop + halo, size))
+                       for axis_slice, size in zip(core, reg.shape))
+        if np.any(reg[window]) or all(axis_slice.stop - axis_slice.start == size
+                                      for axis_slice, size in zip(window, reg.shape)):
+            return window
+        halo *= 2
+
+
+def overlap_pairs(window1, labels1, window2, labels2):
+    """
+    determines which regions of two neighboring tiles are the same region, a pair of regions is the same if more than
+    half of the smaller one of them in the overlap of the two windows is covered by the other one
+    :param window1: window of the first tile (tuple of slices)
+    :param labels1: region numbers of the first tile (with offset, 2d array)
+    :param window2: window of the second tile (tuple of slices)
+    :param labels2: region numbers of the second tile (with offset, 2d array)
+    :return: region numbers of the first and of the second tile that belong together (1D arrays)
+    """
+    overlap = tuple(slice(max(s1.start, s2.start), min(s1.stop, s2.stop)) for s1, s2 in zip(window1, window2))
+    if any(axis_slice.start >= axis_slice.stop for axis_slice in overlap):
+        return np.zeros(0, int), np.zeros(0, int)
+    overlap1 = labels1[tuple(slice(o.start - w.start, o.stop - w.start) for o, w in zip(overlap, window1))].ravel()
+    overlap2 = labels2[tuple(slice(o.start - w.start, o.stop - w.start) for o, w in zip(overlap, window2))].ravel()
+    labeled = (overlap1 != 0) & (overlap2 != 0)
+    pairs, pair_sizes = np.unique(np.stack((overlap1[labeled], overlap2[labeled])), axis=1, return_counts=True)
+    sizes1 = dict(zip(*np.unique(overlap1, return_counts=True)))
+    sizes2 = dict(zip(*np.unique(overlap2, return_counts=True)))
+    smaller_size = np.asarray([min(sizes1[region1], sizes2[region2]) for region1, region2 in pairs.T], int)
+    same_region = pair_sizes * 2 > smaller_size
+    return pairs[0, same_region], pairs[1, same_region]
+
+
+def stitch_tiles(shape, tiles, tile_labels):
+    """
+    stitches the regions of the tiles together, regions of neighboring tiles that cover each other in the overlap of
+    their windows get one region number (see overlap_pairs)
+    :param shape: shape of the image (tuple)
+    :param tiles: windows and cores of the tiles (dict, see tile_grid)
+    :param tile_labels: region numbers of every tile, starting at 1 (dict from grid index to 2d array)
+    :return: region numbers 1 to the number of regions in the smallest unsigned integer type for them, 0 for pixels of
+    tiles without seeds (2d array)
+    """
+    # region numbers of different tiles must not collide
+    offset = 0
+    for grid_index in tiles:
+        labels = tile_labels[grid_index].astype(np.int64)
+        labels[labels != 0] += offset
+        tile_labels[grid_index] = labels
+        offset = max(offset, int(np.amax(labels)))
+
+    regions1, regions2 = [], []
+    for grid_index, (window, _, _) in tiles.items():
+        for step in itertools.product((-1, 0, 1), repeat=len(grid_index)):
+            neighbor_index = tuple(index + axis_step for index, axis_step in zip(grid_index, step))
+            if neighbor_index > grid_index and neighbor_index in tiles:  # every pair of neighboring tiles once
+                pairs = overlap_pairs(window, tile_labels[grid_index], tiles[neighbor_index][0],
+                                      tile_labels[neighbor_index])
+                regions1.append(pairs[0])
+                regions2.append(pairs[1])
+    regions1 = np.concatenate(regions1) if regions1 else np.zeros(0, int)
+    regions2 = np.concatenate(regions2) if regions2 else np.zeros(0, int)
+    same_region = coo_matrix((np.ones(regions1.size), (regions1, regions2)), shape=(offset + 1, offset + 1))
+    _, stitched_numbers = connected_components(same_region, directed=False)
+
+    reg = np.zeros(shape, np.int64)
+    for grid_index, (_, core, core_in_window) in tiles.items():
+        labels = tile_labels[grid_index][core_in_window]
+        reg[core] = np.where(labels != 0, stitched_numbers[labels] + 1, 0)
+    # region numbers 1..number of regions, the 0 in front keeps 0 for pixels without region also if there are none
+    _, reg = np.unique(np.concatenate(([0], reg.ravel())), return_inverse=True)
+    return srg.compact_labels(reg[1:].reshape(shape))
+
+
+def tiled_region_growing(img, threshold_seeds, tile_size=512, halo=32, workers=None, connectivity=4):
+    """
+    seeded region growing of large images in overlapping tiles that are processed in parallel worker processes that
+    share the image, regions that cross a tile border are stitched together by their overlap in the halo,
+    tiles without seeds are filled afterwards by growing the regions of their window (see fill_window) in parallel
+    :param img: intensity values (2d array)
+    :param threshold_seeds: relative euclidean distance 0 < threshold < 1 (float)
+    :param tile_size: side length of the core of a tile (int)
+    :param halo: width of the overlap around the core of a tile (int)
+    :param workers: number of worker processes, None uses all cores (int)
+    :param connectivity: 4 or 8 or a footprint (int or array), see connectivity.neighbor_offsets
+    :return: region numbers, starting at 1 (2d array)
+    """
+    tiles = tile_grid(img.shape, tile_size, halo)
+    blocks = []
+    try:
+        img_block, img_description = sg.share_array(img)
+        blocks.append(img_block)
+        with ProcessPoolExecutor(max_workers=workers, initializer=init_tile_worker,
+                                 initargs=(img_description,)) as executor:
+            futures = {grid_index: executor.submit(grow_shared_tile, window, threshold_seeds, connectivity)
+                       for grid_index, (window, _, _) in tiles.items()}
+            tile_labels = {grid_index: future.result() for grid_index, future in futures.items()}
+            reg = stitch_tiles(img.shape, tiles, tile_labels)
+            # tiles without seeds are filled by the regions around them, only their windows are grown
+            unfilled = [core for _, core, _ in tiles.values() if not np.all(reg[core])]
+            if unfilled:
+                reg_block, reg_description = sg.share_array(reg)
+                blocks.append(reg_block)
+                windows = [fill_window(reg, core, halo) for core in unfilled]
+                futures = [executor.submit(fill_shared_window, window, reg_description, connectivity)
+                           for window in windows]
+                for core, window, future in zip(unfilled, windows, futures):
+                    core_in_window = tuple(slice(c.start - w.start, c.stop - w.start) for c, w in zip(core, window))
+                    reg[core] = np.where(reg[core] != 0, reg[core], future.result()[core_in_window])
+    finally:
+        for block in blocks:
+            block.close()
+            block.unlink()
+    return reg
+
+
+def tiled_seeded_segmentation(img, gt, threshold_seeds, threshold_merging_intensity, threshold_merging_size,
+                              tile_size=512, halo=32, workers=None, connectivity=4):
+    """
+    total seeded region growing algorithm for large images, seed detection and region growing run in tiles
+    :param img: intensity values (2d array)
+    :param gt: ground truth, None if there is none (2d array)
+    :param threshold_seeds: relative euclidean distance 0 < threshold < 1 (float)
+    :param threshold_merging_intensity: threshold for intensity distance between region (float, 0 < threshold < 1)
+    :param threshold_merging_size: threshold for region size (int)
+    :param tile_size: side length of the core of a tile (int)
+    :param halo: width of the overlap around the core of a tile (int)
+    :param workers: number of worker processes, None uses all cores (int)
+    :param connectivity: 4 or 8 or a footprint (int or array), see connectivity.neighbor_offsets
+    :return: resulting image (2d array)
+    :return: unweighted dice score, None without ground truth (float)
+    """
+    image_srg = tiled_region_growing(img, threshold_seeds, tile_size, halo, workers, connectivity)
+    image_merged = rm.region_merging(image_srg, img, threshold_merging_intensity, threshold_merging_size, connectivity)
+    image_clipped = ds.final_clipping(image_merged)
+
+    dice_value = None
+    if gt is not None:
+        dice_value = ds.dice_score(image_merged, gt)
+
+    return image_clipped, dice_value
@@ -1,204 +1,139 @@
 import numpy as np
 from Functions import seeded_region_growing as srg
+from Functions import heap_region_growing as hrg
 
 
-def unseeded_calculate_one_distance(means, pixel_intensity, region_number):
+def unseeded_calculate_one_distance(means, pixel_intensity, region_number, norm=2):
     """
-    calculates the distance of a pixel to the region with a specific region number
-    :param means: array with intensity mean of the regions (1D array)
-    :param pixel_intensity: the pixel which distance is calculated (tuple)
-    :param region_number: number of a specific region (int)
-    :return: the calculated distance for this pixel (float)
+    calculates the distance of pixels to the regions with specific region numbers,
+    the distances are cut to whole numbers like in the integer distance arrays used before,
+    for several channels the differences of all channels are combined with the norm in one call for all pixels
+    :param means: array with intensity mean of the regions (1D array, one row per region for several channels)
+    :param pixel_intensity: intensity of the pixels which distances are calculated (float or 1D array, one row per
+    pixel for several channels)
+    :param region_number: number of specific regions (int or 1D array)
+    :param norm: order of the norm that combines the channels, e.g. 1, 2 or np.inf (see np.linalg.norm)
+    :return: the calculated distances for these pixels (float or 1D array)
     """
-    dist = np.abs(pixel_intensity - means[int(region_number) - 1])
+    difference = pixel_intensity - np.take(means, np.asarray(region_number, int) - 1, axis=0)
+    dist = np.trunc(srg.channel_distance(difference, np.ndim(means) > 1, norm))
     return dist
 
 
-def unseeded_calculate_one_border_distances(means, img, max_region, one_border_neighbors):
+def unseeded_calculate_distances(img, reg, frontier, norm=2):
     """
-    calculates the distance of a pixel to the regions of the neighbors of one side
-    :param means: array with intensity mean of the regions (1D array)
-    :param img: array with intensity values (2D array)
-    :param max_region: highest region number (int)
-    :param one_border_neighbors: array with the region numbers of the neighbors to one side (2D array)
-    :return: array with the calculated distances of the pixel to the region in the neighbors array (2D array)
-    """
-    one_border_distances = np.full(img.shape, 1000000)
-    for region_number in range(1, max_region + 1):
-        pos_reg_bor = np.where(one_border_neighbors == region_number)
-        one_border_distances[pos_reg_bor[0], pos_reg_bor[1]] = \
-            unseeded_calculate_one_distance(means, img[pos_reg_bor[0], pos_reg_bor[1]], region_number)
-    return one_border_distances
-
-
-def unseeded_calculate_distances(img, reg, left_neighbors, right_neighbors, top_neighbors, bottom_neighbors):
-    """
-    creates four arrays with the distances of the pixels to their neighboring regions to all sides
-    :param img: array with intensity values (2D array)
-    :param reg: array with region numbers (2D array)
-    :param left_neighbors: array with the region numbers of the neighbors to the left side (2D array)
-    :param right_neighbors: array with the region numbers of the neighbors to the right side (2D array)
-    :param top_neighbors: array with the region numbers of the neighbors to the upper side (2D array)
-    :param bottom_neighbors: array with the region numbers of the neighbors to lower side (2D array)
-    :return: means: array with means (1D array), four arrays with the calculated distances to all the sides (2D arrays)
+    calculates the distances of all frontier pixels to their neighboring regions
+    :param img: array with intensity values (2D/3D array, with an additional last axis for the channels)
+    :param reg: array with region numbers (2D/3D array)
+    :param frontier: frontier records (1D array with srg.FRONTIER_DTYPE)
+    :param norm: order of the norm that combines the channels, e.g. 1, 2 or np.inf (see np.linalg.norm)
+    :return: means: array with means (1D/2D array), frontier records with calculated distances (1D array)
     """
     means = np.asarray(srg.mean_region(img, reg))
-    max_region = int(np.amax(reg))
+    frontier['distance'] = unseeded_calculate_one_distance(means, srg.pixel_intensities(img, reg, frontier['position']),
+                                                           frontier['region'], norm)
+    return means, frontier
 
-    left_distances = unseeded_calculate_one_border_distances(means, img, max_region, left_neighbors)
-    right_distances = unseeded_calculate_one_border_distances(means, img, max_region, right_neighbors)
-    top_distances = unseeded_calculate_one_border_distances(means, img, max_region, top_neighbors)
-    bottom_distances = unseeded_calculate_one_border_distances(means, img, max_region, bottom_neighbors)
 
-    return means, left_distances, right_distances, top_distances, bottom_distances
-
-
-def unseeded_update_one_distance(img, reg, means, new_pixel, one_border_neighbors, one_border_distances):
+def unseeded_update_distances(img, reg, means, region_sums, region_counts, new_pixel, frontier, norm=2):
     """
-    updates the distance array of one direction
-    :param img: array with intensity values (2D array)
-    :param reg: array with region numbers (2D array)
-    :param means: array with intensity mean of the regions (1D array)
+    updates the array of means and the distances of the frontier pixels next to the changed region
+    :param img: array with intensity values (2D/3D array, with an additional last axis for the channels)
+    :param reg: array with region numbers (2D/3D array)
+    :param means: array with intensity mean of the regions (1D/2D array)
+    :param region_sums: running sums of intensity values, the region number is the index (1D/2D array)
+    :param region_counts: running pixel counts, the region number is the index (1D array)
     :param new_pixel: pixel which was lastly added to a region
-    :param one_border_neighbors: array with the region numbers of the neighbors to one side (2D array)
-    :param one_border_distances: array with the calculated distances of the pixel to one side (2D array)
-    :return: updated array with the calculated distances of the pixel to one side (2D array)
+    :param frontier: frontier records (1D array with srg.FRONTIER_DTYPE)
+    :param norm: order of the norm that combines the channels, e.g. 1, 2 or np.inf (see np.linalg.norm)
+    :return: frontier records with updated distances (1D array), means: array with means (1D/2D array)
     """
-    positions_to_update = np.where(one_border_neighbors == reg[new_pixel])
-    one_border_distances[positions_to_update[0],
-                         positions_to_update[1]] = unseeded_calculate_one_distance(means, img[positions_to_update[0],
-                                                                                              positions_to_update[1]],
-                                                                                   reg[new_pixel])
-    one_border_distances[new_pixel] = 1000000
-    return one_border_distances
+    means = srg.update_list_of_means(means, img, reg, new_pixel, region_sums, region_counts)
 
+    positions_to_update = np.where(frontier['region'] == reg[new_pixel])[0]
+    frontier['distance'][positions_to_update] = unseeded_calculate_one_distance(
+        means, srg.pixel_intensities(img, reg, frontier['position'][positions_to_update]), reg[new_pixel], norm)
+    return frontier, means
 
-def unseeded_update_distances(img, reg, means, new_pixel, left_neighbors, right_neighbors, top_neighbors,
-                              bottom_neighbors, left_distances, right_distances, top_distances, bottom_distances):
-    """
-    updates the array of means and the four distance arrays for all directions
-    :param img: array with intensity values (2D array)
-    :param reg: array with region numbers (2D array)
-    :param means: array with intensity mean of the regions (1D array)
-    :param new_pixel: pixel which was lastly added to a region
-    :param left_neighbors: array with the region numbers of the neighbors to the left side (2D array)
-    :param right_neighbors: array with the region numbers of the neighbors to the right side (2D array)
-    :param top_neighbors: array with the region numbers of the neighbors to the upper side (2D array)
-    :param bottom_neighbors: array with the region numbers of the neighbors to lower side (2D array)
-    :param left_distances: array with the calculated distances of the pixel to region of left neighbors (2D array)
-    :param right_distances: array with the calculated distances of the pixel to region of right neighbors (2D array)
-    :param top_distances: array with the calculated distances of the pixel to region of upper neighbors (2D array)
-    :param bottom_distances: array with the calculated distances of the pixel to region of lower neighbors (2D array)
-    :return: four updated distance arrays (2D arrays), means: array with means (1D array)
-    """
-    means = srg.update_list_of_means(means, img, reg, new_pixel)
-
-    left_distances = unseeded_update_one_distance(img, reg, means, new_pixel, left_neighbors, left_distances)
-    right_distances = unseeded_update_one_distance(img, reg, means, new_pixel, right_neighbors, right_distances)
-    top_distances = unseeded_update_one_distance(img, reg, means, new_pixel, top_neighbors, top_distances)
-    bottom_distances = unseeded_update_one_distance(img, reg, means, new_pixel, bottom_neighbors,
-                                                    bottom_distances)
 
-    return left_distances, right_distances, top_distances, bottom_distances, means
-
-
-def unseeded_choose_distance_array(border_number, left_distances, right_distances, top_distances, bottom_distances):
-    """
-    chooses one of the four distance arrays by the number of the array
-    :param border_number: number of the array which should be used (int)
-    :param left_distances: array with the calculated distances of the pixel to region of left neighbors (2D array)
-    :param right_distances: array with the calculated distances of the pixel to region of right neighbors (2D array)
-    :param top_distances: array with the calculated distances of the pixel to region of upper neighbors (2D array)
-    :param bottom_distances: array with the calculated distances of the pixel to region of lower neighbors (2D array)
-    :return: name of the distance array which should be used (name of variable)
-    """
-    if border_number == 0:
-        return left_distances
-    elif border_number == 1:
-        return right_distances
-    elif border_number == 2:
-        return top_distances
-    return bottom_distances
-
-
-def unseeded_label_new_pixel(reg, left_distances, right_distances, top_distances, bottom_distances, left_neighbors,
-                             right_neighbors, top_neighbors, bottom_neighbors, t, means, img):
+def unseeded_label_new_pixel(reg, frontier, t, means, region_sums, region_counts, img, connectivity=4, norm=2):
     """
     determines the pixel with the smallest distance and decides how it should be labeled to a neighboring region,
-    another region or should be a new region and updates the neighbor arrays for all directions
-    :param reg: array with region numbers (2D array)
-    :param left_distances: array with the calculated distances of the pixel to region of left neighbors (2D array)
-    :param right_distances: array with the calculated distances of the pixel to region of right neighbors (2D array)
-    :param top_distances: array with the calculated distances of the pixel to region of upper neighbors (2D array)
-    :param bottom_distances: array with the calculated distances of the pixel to region of lower neighbors (2D array)
-    :param left_neighbors: array with the region numbers of the neighbors to the left side (2D array)
-    :param right_neighbors: array with the region numbers of the neighbors to the right side (2D array)
-    :param top_neighbors: array with the region numbers of the neighbors to the upper side (2D array)
-    :param bottom_neighbors: array with the region numbers of the neighbors to lower side (2D array)
+    another region or should be a new region and updates the frontier
+    :param reg: array with region numbers (2D/3D array)
+    :param frontier: frontier records (1D array with srg.FRONTIER_DTYPE)
     :param t: threshold to decide whether a pixel is similar enough to a region (float)
-    :param means: array with intensity mean of the regions (1D array)
-    :param img: array with intensity values (2D array)
-    :return: reg: array with region numbers (2D array), pos_min_dist: pixel that was lastly added to a region (tuple),
-    four arrays with region numbers of neighbors (2D arrays), means: array of means (1D array)
-    """
-    pos_min_dist, border_number = srg.position_of_smallest_distance(left_distances, right_distances, top_distances,
-                                                                    bottom_distances)
-    one_border_neighbors = srg.choose_border_number(border_number, left_neighbors, right_neighbors, top_neighbors,
-                                                    bottom_neighbors)
-    one_border_distances = unseeded_choose_distance_array(border_number, left_distances, right_distances, top_distances,
-                                                          bottom_distances)
-
-    if one_border_distances[pos_min_dist] < t:
-        reg[pos_min_dist] = one_border_neighbors[pos_min_dist]
+    :param means: array with intensity mean of the regions (1D/2D array)
+    :param region_sums: running sums of intensity values, the region number is the index (1D/2D array)
+    :param region_counts: running pixel counts, the region number is the index (1D array)
+    :param img: array with intensity values (2D/3D array, with an additional last axis for the channels)
+    :param connectivity: 4, 8 (2D), 6, 26 (3D) or a footprint (int or array), see connectivity.neighbor_offsets
+    :param norm: order of the norm that combines the channels, e.g. 1, 2 or np.inf (see np.linalg.norm)
+    :return: reg: array with region numbers (2D/3D array),
+    pos_min_dist: pixel that was lastly added to a region (tuple),
+    frontier: updated frontier records (1D array), means: array of means (1D/2D array),
+    region_sums and region_counts with an entry for a newly created region (1D/2D arrays)
+    """
+    pos_min_dist, record_number = srg.position_of_smallest_distance(reg, frontier)
+
+    if frontier['distance'][record_number] < t:
+        reg[pos_min_dist] = frontier['region'][record_number]
     else:
-        distances = np.abs(img[pos_min_dist] - means)
+        distances = srg.channel_distance(img[pos_min_dist] - means, means.ndim > 1, norm)
         minimum = np.amin(distances)
         pos_minimum = np.where(distances == minimum)[0]
         if minimum < t:
             reg[pos_min_dist] = pos_minimum[0] + 1
         else:
-            region_max = int(max(reg.flatten()))
+            region_max = len(means)
             reg[pos_min_dist] = region_max + 1
-            means = np.append(means, img[pos_min_dist])
+            means = np.append(means, [img[pos_min_dist]], axis=0)
+            # the pixel itself is added when the means are updated
+            region_sums = np.append(region_sums, np.zeros((1,) + region_sums.shape[1:]), axis=0)
+            region_counts = np.append(region_counts, 0)
+
+    frontier = srg.update_neighbors(reg, frontier, pos_min_dist, connectivity)
+
+    return reg, pos_min_dist, frontier, means, region_sums, region_counts
 
-    left_neighbors = srg.update_left_neighbors(reg, left_neighbors, pos_min_dist)
-    right_neighbors = srg.update_right_neighbors(reg, right_neighbors, pos_min_dist)
-    top_neighbors = srg.update_top_neighbors(reg, top_neighbors, pos_min_dist)
-    bottom_neighbors = srg.update_bottom_neighbors(reg, bottom_neighbors, pos_min_dist)
 
-    return reg, pos_min_dist, left_neighbors, right_neighbors, top_neighbors, bottom_neighbors, means
+def whole_numbered(img):
+    """
+    tests whether all intensity values are whole numbers, integer images are not read at all, other images are read
+    in blocks along the first axis (see seeded_region_growing.block_length) until a fraction is found
+    :param img: intensity values (2D/3D array)
+    :return: True if all intensity values are whole numbers (bool)
+    """
+    if np.issubdtype(img.dtype, np.integer) or np.issubdtype(img.dtype, np.bool_):
+        return True
+    rows = srg.block_length(img.shape)
+    return all(np.all(np.mod(np.asarray(img[start:start + rows]), 1) == 0) for start in range(0, img.shape[0], rows))
 
 
-def unseeded_region_growing_algorithm(img, start_pixel, t):
+def unseeded_region_growing_algorithm(img, start_pixel, t, connectivity=4, norm=2):
     """
     performs the unseeded region growing algorithm on an image, with a set region array with a startpixel and
-    a threshold to decide whether a pixel is similar enough to be added to a certain region
+    a threshold to decide whether a pixel is similar enough to be added to a certain region, images with one channel
+    and whole-numbered intensity values are grown with the heaps of heap_region_growing.unseeded_region_growing
     :param start_pixel: pixel which defines the starting seed (tuple)
-    :param img: array with intensity values (2D array)
+    :param img: array with intensity values (2D/3D array, with an additional last axis for several channels)
     :param t: threshold to decide whether a pixel is similar enough to a region (float)
-    :return: array with region numbers (2D array)
+    :param connectivity: 4, 8 (2D), 6, 26 (3D) or a footprint (int or array), see connectivity.neighbor_offsets
+    :param norm: order of the norm that combines the channels, e.g. 1, 2 or np.inf (see np.linalg.norm)
+    :return: array with region numbers in the smallest unsigned integer type for them (2D/3D array)
     """
-    reg = np.zeros(img.shape, int)
+    reg = np.zeros(img.shape[:len(start_pixel)], int)
+    if not srg.is_multi_channel(img, reg) and whole_numbered(img):
+        return hrg.unseeded_region_growing(img, start_pixel, t, connectivity)
     reg[start_pixel] = 1
 
-    left_neighbors, right_neighbors, top_neighbors, bottom_neighbors = srg.find_seed_neighbors(reg)
-
-    means, left_distances, right_distances, top_distances, bottom_distances = \
-        unseeded_calculate_distances(img, reg, left_neighbors, right_neighbors, top_neighbors, bottom_neighbors)
-
-    reg, pos_min_dist, left_neighbors, right_neighbors, top_neighbors, bottom_neighbors, means = \
-        unseeded_label_new_pixel(reg, left_distances, right_distances, top_distances, bottom_distances, left_neighbors,
-                                 right_neighbors, top_neighbors, bottom_neighbors, t, means, img)
-
-    while srg.unlabeled_pixel_exist(reg):
-
-        left_distances, right_distances, top_distances, bottom_distances, means = \
-            unseeded_update_distances(img, reg, means, pos_min_dist, left_neighbors, right_neighbors, top_neighbors,
-                                      bottom_neighbors, left_distances, right_distances, top_distances,
-                                      bottom_distances)
+    frontier = srg.find_seed_neighbors(reg, connectivity)
+    means, frontier = unseeded_calculate_distances(img, reg, frontier, norm)
+    region_sums, region_counts = srg.region_statistics(img, reg)
 
-        reg, pos_min_dist, left_neighbors, right_neighbors, top_neighbors, bottom_neighbors, means = \
-            unseeded_label_new_pixel(reg, left_distances, right_distances, top_distances, bottom_distances,
-                                     left_neighbors, right_neighbors, top_neighbors, bottom_neighbors, t,
-                                     means, img)
-    return reg
+    while frontier.size != 0:
+        reg, pos_min_dist, frontier, means, region_sums, region_counts = \
+            unseeded_label_new_pixel(reg, frontier, t, means, region_sums, region_counts, img, connectivity, norm)
+        frontier, means = unseeded_update_distances(img, reg, means, region_sums, region_counts, pos_min_dist,
+                                                    frontier, norm)
+    return srg.compact_labels(reg)
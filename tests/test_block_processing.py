@@ -0,0 +1,37 @@
+import numpy as np
+import pytest
+from Functions import seeded_region_growing as srg
+from Functions import region_merging as rm
+from Functions import heap_region_growing as hrg
+from Functions import unseeded_region_growing as urg
+
+
+@pytest.mark.parametrize("shape, connectivity", [((23, 31), 4), ((23, 31), 8), ((7, 9, 11), 6), ((7, 9, 11), 26)])
+def test_blocks_give_the_result_of_the_whole_array(monkeypatch, shape, connectivity):
+    rng = np.random.default_rng(0)
+    reg = (rng.integers(0, 40, shape) // 3 * 3).astype(np.uint8)  # with pixels without region and empty regions
+    merged_into = list(range(int(np.amax(reg))))
+    merged_into[:-1:2] = range(1, len(merged_into), 2)
+    whole = (rm.region_adjacency(reg, connectivity), rm.calculate_regions_size(reg),
+             rm.relabel_merged_regions(reg, merged_into))
+    monkeypatch.setattr(srg, "STATISTICS_BLOCK_SIZE", 7)  # blocks of a single row
+    blocks = (rm.region_adjacency(reg, connectivity), rm.calculate_regions_size(reg),
+              rm.relabel_merged_regions(reg, merged_into))
+    for whole_pairs, block_pairs in zip(whole[0], blocks[0]):
+        assert np.array_equal(whole_pairs, block_pairs)
+    assert np.array_equal(whole[1], blocks[1], equal_nan=True)
+    assert np.array_equal(whole[2][0], blocks[2][0]) and whole[2][0].dtype == blocks[2][0].dtype
+    assert np.array_equal(whole[2][1], blocks[2][1])
+
+
+def test_unseeded_region_numbers_get_a_larger_type():
+    img = np.random.default_rng(1).integers(0, 60000, (30, 30)).astype(np.uint16)
+    reg = hrg.unseeded_region_growing(img, (0, 0), 2)
+    assert np.amax(reg) > 255 and reg.dtype == np.uint16
+    assert np.array_equal(reg, urg.unseeded_region_growing_algorithm(img.astype(float), (0, 0), 2))
+
+
+def test_whole_numbered():
+    assert urg.whole_numbered(np.arange(6, dtype=np.uint8).reshape(2, 3))
+    assert urg.whole_numbered(np.arange(6, dtype=float).reshape(2, 3))
+    assert not urg.whole_numbered(np.arange(6, dtype=float).reshape(2, 3) + 0.5)
@@ -0,0 +1,36 @@
+import numpy as np
+from Functions import bucket_region_growing as brg
+from Functions import heap_region_growing as hrg
+from Functions import unseeded_region_growing as urg
+
+
+def two_channel_image(shape=(40, 50)):
+    rng = np.random.default_rng(1)
+    img = rng.normal(20, 2, shape + (2,))
+    img[10:30, 10:25, 0] += 100
+    img[5:35, 20:45, 1] += 80
+    return np.clip(img, 0, 255).astype(np.uint8)
+
+
+def test_several_channels_are_grown_like_the_exact_engine():
+    img = two_channel_image()
+    reg = np.zeros(img.shape[:2], np.uint8)
+    reg[0, 0], reg[20, 15], reg[20, 40], reg[20, 22] = 1, 2, 3, 4
+    bucket = brg.bucket_region_growing(img, reg.copy(), levels=64)
+    assert bucket.shape == reg.shape
+    assert np.array_equal(bucket, hrg.region_growing(img, reg.copy()))
+
+
+def test_unseeded_several_channels_are_grown_like_the_exact_algorithm():
+    img = two_channel_image()
+    bucket = brg.bucket_unseeded_region_growing(img, (0, 0), 30, levels=64)
+    assert bucket.shape == img.shape[:2]
+    assert np.array_equal(bucket, urg.unseeded_region_growing_algorithm(img, (0, 0), 30))
+
+
+def test_single_channel_is_close_to_the_exact_engine():
+    img = two_channel_image()[..., 0]
+    reg = np.zeros(img.shape, np.uint8)
+    reg[0, 0], reg[20, 15] = 1, 2
+    bucket = brg.bucket_region_growing(img, reg.copy(), levels=256)
+    assert np.mean(bucket == hrg.region_growing(img, reg.copy())) > 0.99
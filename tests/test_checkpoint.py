@@ -0,0 +1,114 @@
+import numpy as np
+import pytest
+from Functions import checkpoint as cp
+from Functions import seeded_region_growing as srg
+from Functions import heap_region_growing as hrg
+from Functions import region_merging as rm
+
+
+def noisy_image(seed, shape=(30, 40)):
+    rng = np.random.default_rng(seed)
+    return rng.random(shape)
+
+
+def seed_array(shape=(30, 40)):
+    seeds = np.zeros(shape, int)
+    seeds[5, 5], seeds[20, 30], seeds[25, 8] = 1, 2, 3
+    return seeds
+
+
+def grow_with_srg(img, reg, path):
+    return srg.region_growing(img, reg, 4, checkpoint_path=path, checkpoint_interval=100)
+
+
+def grow_with_hrg(img, reg, path):
+    return hrg.region_growing(img, reg, 4, backend="numpy", checkpoint_path=path, checkpoint_interval=100)
+
+
+def merge(img, reg, path):
+    return rm.distance_merging_while(reg, 0.2, img, 4, backend="numpy", checkpoint_path=path, checkpoint_interval=20)[0]
+
+
+def start_regions(img):
+    return np.arange(1, img.size + 1).reshape(img.shape)  # every pixel is a region
+
+
+RUNS = [(grow_with_srg, lambda img: seed_array()), (grow_with_hrg, lambda img: seed_array()),
+        (merge, start_regions)]
+
+
+def leave_checkpoint(monkeypatch, run, img, reg, path):
+    """
+    runs an algorithm like an interrupted run: its last checkpoint is not removed
+    """
+    with monkeypatch.context() as patch:
+        patch.setattr(cp, "remove_checkpoint", lambda checkpoint_path: None)
+        run(img, reg, path)
+
+
+@pytest.mark.parametrize("run, regions", RUNS)
+def test_checkpoint_of_the_same_run_is_resumed(tmp_path, monkeypatch, run, regions):
+    path = str(tmp_path / "checkpoint.npz")
+    img = noisy_image(0)
+    expected = run(img, regions(img), None)
+    leave_checkpoint(monkeypatch, run, img, regions(img), path)
+    assert np.array_equal(run(img, regions(img), path), expected)
+
+
+@pytest.mark.parametrize("run, regions", RUNS)
+def test_stale_checkpoint_of_another_image_is_not_resumed(tmp_path, monkeypatch, run, regions):
+    path = str(tmp_path / "checkpoint.npz")
+    leave_checkpoint(monkeypatch, run, noisy_image(0), regions(noisy_image(0)), path)
+    img = noisy_image(1)
+    with pytest.raises(ValueError):
+        run(img, regions(img), path)
+
+
+def test_stale_checkpoint_with_other_seeds_is_not_resumed(tmp_path, monkeypatch):
+    path = str(tmp_path / "checkpoint.npz")
+    img = noisy_image(0)
+    leave_checkpoint(monkeypatch, grow_with_hrg, img, seed_array(), path)
+    other_seeds = seed_array()
+    other_seeds[10, 10] = 4
+    with pytest.raises(ValueError):
+        grow_with_hrg(img, other_seeds, path)
+
+
+def test_stale_checkpoint_with_other_connectivity_is_not_resumed(tmp_path, monkeypatch):
+    path = str(tmp_path / "checkpoint.npz")
+    img = noisy_image(0)
+    leave_checkpoint(monkeypatch, grow_with_srg, img, seed_array(), path)
+    with pytest.raises(ValueError):
+        srg.region_growing(img, seed_array(), 8, checkpoint_path=path)
+
+
+class Preempted(Exception):
+    pass
+
+
+@pytest.mark.parametrize("run", [grow_with_srg, grow_with_hrg])
+def test_interrupted_memory_mapped_labels_are_resumed(tmp_path, monkeypatch, run):
+    path = str(tmp_path / "checkpoint.npz")
+    label_path = str(tmp_path / "labels.npy")
+    img = noisy_image(0)
+    expected = run(img, seed_array(), None)
+    np.save(label_path, seed_array().astype(np.int64))
+    save_checkpoint = cp.save_checkpoint
+
+    def preempted_after_saving(checkpoint_path, **arrays):
+        save_checkpoint(checkpoint_path, **arrays)
+        raise Preempted()
+    with monkeypatch.context() as patch:
+        patch.setattr(cp, "save_checkpoint", preempted_after_saving)
+        with pytest.raises(Preempted):
+            run(img, np.load(label_path, mmap_mode='r+'), path)
+    interrupted = np.load(label_path)
+    assert np.count_nonzero(interrupted) > np.count_nonzero(seed_array())  # labeled in place before the interruption
+    reg = np.load(label_path, mmap_mode='r+')
+    assert np.array_equal(run(img, reg, path), expected)
+    assert np.array_equal(np.load(label_path), expected)
+    leave_checkpoint(monkeypatch, run, img, seed_array(), path)
+    other_labels = interrupted.copy()
+    other_labels[interrupted == 2] = 3
+    with pytest.raises(ValueError):  # the labels of another run are still not resumed
+        run(img, other_labels, path)
@@ -0,0 +1,49 @@
+import numpy as np
+import pytest
+from Functions import heap_region_growing as hrg
+from Functions import region_merging as rm
+
+pytest.importorskip("numba")
+
+
+def random_image(seed, image_type, shape=(25, 30)):
+    rng = np.random.default_rng(seed)
+    if image_type == np.uint8:
+        return rng.integers(0, 256, shape).astype(np.uint8)  # many equal distances
+    return rng.random(shape) * 255
+
+
+def random_seeds(seed, shape=(25, 30), number_of_seeds=6):
+    rng = np.random.default_rng(seed)
+    seeds = np.zeros(shape, np.int64)
+    for region in range(1, number_of_seeds + 1):
+        seeds[tuple(rng.integers(0, size) for size in shape)] = region
+    return seeds
+
+
+@pytest.mark.parametrize("connectivity", [4, 8])
+@pytest.mark.parametrize("image_type", [np.uint8, float])
+@pytest.mark.parametrize("case", range(3))
+def test_seeded_growth_kernel_grows_like_numpy(case, image_type, connectivity):
+    img, seeds = random_image(case, image_type), random_seeds(case)
+    assert np.array_equal(hrg.region_growing(img, seeds.copy(), connectivity, backend="numba"),
+                          hrg.region_growing(img, seeds.copy(), connectivity, backend="numpy"))
+
+
+@pytest.mark.parametrize("connectivity", [4, 8])
+@pytest.mark.parametrize("threshold", [0.05, 0.2, np.inf])
+@pytest.mark.parametrize("case", range(3))
+def test_distance_merging_kernel_merges_like_numpy(case, threshold, connectivity):
+    img = random_image(case, np.uint8)
+    reg = np.arange(1, img.size + 1).reshape(img.shape)  # every pixel is a region
+    results, merge_trees = [], []
+    for backend in ["numba", "numpy"]:
+        merge_tree = []
+        results.append(rm.distance_merging_while(reg, threshold, img, connectivity, backend, merge_tree=merge_tree))
+        merge_trees.append(merge_tree)
+    (compiled_reg, compiled_neighbors, compiled_means), (numpy_reg, numpy_neighbors, numpy_means) = results
+    assert np.array_equal(compiled_reg, numpy_reg)
+    assert compiled_neighbors == numpy_neighbors
+    assert np.allclose(compiled_means, numpy_means)
+    assert [merge[:2] + merge[3:] for merge in merge_trees[0]] == [merge[:2] + merge[3:] for merge in merge_trees[1]]
+    assert np.allclose([merge[2] for merge in merge_trees[0]], [merge[2] for merge in merge_trees[1]])
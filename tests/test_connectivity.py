@@ -0,0 +1,123 @@
+import numpy as np
+import pytest
+from Functions import connectivity as con
+from Functions import seeded_region_growing as srg
+from Functions import heap_region_growing as hrg
+
+
+@pytest.mark.parametrize("connectivity, number_of_neighbors", [(4, 4), (8, 8), (6, 6), (26, 26),
+                                                               (np.ones((3, 3)), 8), (np.ones((5, 5)), 24)])
+def test_neighbor_offsets_are_all_neighbors_once(connectivity, number_of_neighbors):
+    offsets = con.neighbor_offsets(connectivity)
+    assert len(offsets) == number_of_neighbors
+    assert len(np.unique(offsets, axis=0)) == number_of_neighbors
+    assert not np.any(np.all(offsets == 0, axis=1))
+
+
+def test_neighbor_offsets_order():
+    assert con.neighbor_offsets(4).tolist() == [[0, -1], [0, 1], [-1, 0], [1, 0]]
+    assert con.neighbor_offsets(8).tolist()[:4] == con.neighbor_offsets(4).tolist()
+    assert con.neighbor_offsets(26).tolist()[:6] == con.neighbor_offsets(6).tolist()
+    footprint = np.array([[0, 1, 0], [1, 1, 1], [0, 1, 0]])
+    assert con.neighbor_offsets(footprint).tolist() == [[-1, 0], [0, -1], [0, 1], [1, 0]]  # raster order
+
+
+@pytest.mark.parametrize("connectivity", [5, np.ones((2, 3))])
+def test_invalid_connectivity(connectivity):
+    with pytest.raises(ValueError):
+        con.neighbor_offsets(connectivity)
+
+
+@pytest.mark.parametrize("connectivity", [4, 8, 6, 26, np.ones((5, 3)), np.array([[1, 0, 0], [0, 0, 0], [0, 0, 0]])])
+def test_undirected_offsets_keep_one_direction_of_every_pair(connectivity):
+    offsets = con.neighbor_offsets(connectivity)
+    undirected = con.undirected_offsets(offsets)
+    directions = {tuple(offset) for offset in undirected.tolist()}
+    opposite_directions = {tuple(offset) for offset in (-undirected).tolist()}
+    assert not directions & opposite_directions
+    all_directions = np.concatenate((offsets, -offsets))
+    assert directions | opposite_directions == {tuple(offset) for offset in all_directions.tolist()}
+    assert np.all(undirected[np.arange(len(undirected)), np.argmax(undirected != 0, axis=1)] > 0)
+
+
+@pytest.mark.parametrize("shape, connectivity", [((5, 7), 8), ((4, 5, 6), 26), ((5, 7), np.ones((5, 5)))])
+def test_shifted_views_pair_every_pixel_with_its_neighbor(shape, connectivity):
+    array = np.arange(np.prod(shape)).reshape(shape)
+    for offset in con.neighbor_offsets(connectivity):
+        pixels, neighbors = con.shifted_views(array, offset)
+        assert np.shares_memory(pixels, array) and np.shares_memory(neighbors, array)  # views, no copies
+        assert pixels.shape == neighbors.shape
+        expected = set()
+        for position in np.ndindex(shape):
+            neighbor = tuple(np.add(position, offset))
+            if all(0 <= coordinate < size for coordinate, size in zip(neighbor, shape)):
+                expected.add((int(array[position]), int(array[neighbor])))
+        assert set(zip(pixels.ravel().tolist(), neighbors.ravel().tolist())) == expected
+
+
+def test_shifted_views_of_a_small_array():
+    pixels, neighbors = con.shifted_views(np.zeros((1, 3)), (2, 0))
+    assert pixels.size == neighbors.size == 0
+    with pytest.raises(ValueError):
+        con.shifted_views(np.zeros((3, 3)), (1, 0, 0))
+
+
+def test_flat_neighbor_offsets():
+    shape = (4, 5, 6)
+    offsets = con.neighbor_offsets(26)
+    center = np.ravel_multi_index((2, 2, 3), shape)
+    assert con.flat_neighbor_offsets(shape, offsets) == \
+        [np.ravel_multi_index(tuple(np.add((2, 2, 3), offset)), shape) - center for offset in offsets]
+
+
+def random_growth_case(seed, shape=(15, 18), number_of_seeds=4):
+    rng = np.random.default_rng(seed)
+    seeds = np.zeros(shape, np.int64)
+    for region in range(1, number_of_seeds + 1):
+        seeds[tuple(rng.integers(0, size) for size in shape)] = region
+    return rng.random(shape), seeds  # no equal distances, so the order of the neighbors does not matter
+
+
+@pytest.mark.parametrize("grow", [srg.region_growing,
+                                  lambda img, reg, connectivity: hrg.region_growing(img, reg, connectivity, "numpy")])
+@pytest.mark.parametrize("connectivity, footprint", [(4, [[0, 1, 0], [1, 1, 1], [0, 1, 0]]), (8, np.ones((3, 3)))])
+def test_footprint_grows_like_its_connectivity(grow, connectivity, footprint):
+    for case in range(3):
+        img, seeds = random_growth_case(case)
+        assert np.array_equal(grow(img, seeds.copy(), np.asarray(footprint)), grow(img, seeds.copy(), connectivity))
+
+
+@pytest.mark.parametrize("grow", [srg.region_growing,
+                                  lambda img, reg, connectivity: hrg.region_growing(img, reg, connectivity, "numpy")])
+def test_growth_only_reaches_the_neighbors_of_the_footprint(grow):
+    img, seeds = random_growth_case(0)
+    seeds[:] = 0
+    seeds[3, 5], seeds[8, 8] = 1, 2
+    rows = grow(img, seeds.copy(), np.array([[1, 0, 1]]))  # only left and right neighbors
+    assert np.all(rows[[3, 8]] == np.array([[1], [2]])) and np.all(np.delete(rows, [3, 8], axis=0) == 0)
+    diagonals = grow(img, seeds.copy(), np.array([[1, 0, 1], [0, 0, 0], [1, 0, 1]]))
+    rows, columns = np.indices(img.shape)
+    assert np.all(diagonals[(rows + columns) % 2 == 1] == 0) and np.all(diagonals[(rows + columns) % 2 == 0] != 0)
+
+
+def test_eight_connectivity_reaches_diagonal_pixels():
+    img = np.full((3, 3), 200.)
+    img[1, 1] = img[0, 0] = 10.  # dark pixels that only touch diagonally
+    seeds = np.zeros((3, 3), int)
+    seeds[1, 1], seeds[2, 2] = 1, 2
+    assert hrg.region_growing(img, seeds.copy(), 8, "numpy")[0, 0] == 1
+    assert hrg.region_growing(img, seeds.copy(), 4, "numpy")[0, 0] == 2
+    for connectivity in [4, 8]:
+        assert np.array_equal(srg.region_growing(img, seeds.copy(), connectivity),
+                              hrg.region_growing(img, seeds.copy(), connectivity, "numpy"))
+
+
+@pytest.mark.parametrize("connectivity", [6, 26])
+def test_volumes_are_grown_with_their_connectivity(connectivity):
+    rng = np.random.default_rng(connectivity)
+    img = rng.random((5, 6, 7))
+    seeds = np.zeros(img.shape, np.int64)
+    seeds[0, 0, 0], seeds[4, 5, 6], seeds[2, 3, 1] = 1, 2, 3
+    grown = hrg.region_growing(img, seeds.copy(), connectivity, "numpy")
+    assert np.all(grown != 0)
+    assert np.array_equal(grown, srg.region_growing(img, seeds.copy(), connectivity))
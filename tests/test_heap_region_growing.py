@@ -0,0 +1,43 @@
+import numpy as np
+import pytest
+import skimage.io as sk
+from Functions import heap_region_growing as hrg
+from Functions import seeded_region_growing as srg
+
+
+def random_seeds(seed, shape, number_of_seeds=6):
+    rng = np.random.default_rng(seed)
+    seeds = np.zeros(shape, np.int64)
+    for region in range(1, number_of_seeds + 1):
+        seeds[tuple(rng.integers(0, size) for size in shape)] = region
+    return seeds
+
+
+def synthetic_image(seed, image_type, shape=(30, 35)):
+    rng = np.random.default_rng(seed)
+    if image_type == np.uint8:
+        return rng.integers(0, 256, shape).astype(np.uint8)  # many equal distances
+    return rng.random(shape)
+
+
+@pytest.mark.parametrize("connectivity", [4, 8])
+@pytest.mark.parametrize("image_type", [np.uint8, float])
+@pytest.mark.parametrize("case", range(3))
+def test_heap_engine_grows_the_regions_of_the_record_engine(case, image_type, connectivity):
+    img = synthetic_image(case, image_type)
+    seeds = random_seeds(case, img.shape)
+    assert np.array_equal(hrg.region_growing(img, seeds.copy(), connectivity, backend="numpy"),
+                          srg.region_growing(img, seeds.copy(), connectivity))
+
+
+@pytest.mark.parametrize("connectivity", [4, 8])
+@pytest.mark.parametrize("path, crop", [("Data/NIH3T3/img/dna-0.png", (slice(300, 340), slice(600, 645))),
+                                        ("Data/NIH3T3/img/dna-33.png", (slice(250, 290), slice(950, 995)))])
+def test_heap_engine_grows_data_crops_like_the_record_engine(path, crop, connectivity):
+    img = sk.imread(path)[crop]
+    seeds = random_seeds(len(path), img.shape)
+    assert np.array_equal(hrg.region_growing(img, seeds.copy(), connectivity, backend="numpy"),
+                          srg.region_growing(img, seeds.copy(), connectivity))
+    float_img = img / float(np.amax(img))
+    assert np.array_equal(hrg.region_growing(float_img, seeds.copy(), connectivity, backend="numpy"),
+                          srg.region_growing(float_img, seeds.copy(), connectivity))
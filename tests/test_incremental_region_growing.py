@@ -0,0 +1,63 @@
+import numpy as np
+import pytest
+from Functions import incremental_region_growing as irg
+from Functions import heap_region_growing as hrg
+
+
+def smooth_image(seed, channels=None):
+    rng = np.random.default_rng(seed)
+    rows, columns = np.mgrid[:60, :70]
+    img = rng.normal(0, 0.05, rows.shape) + 0.5 * np.sin(columns / 9.0) * np.cos(rows / 7.0) + 1
+    if channels is not None:
+        img = np.stack([img ** (channel + 1) for channel in range(channels)], -1)
+    return img
+
+
+def random_seeds(seed, shape=(60, 70), number_of_seeds=11):
+    rng = np.random.default_rng(seed)
+    seeds = np.zeros(shape, np.int64)
+    for region in range(1, number_of_seeds + 1):
+        seeds[tuple(rng.integers(0, size) for size in shape)] = region
+    return seeds
+
+
+def full_regrowth(img, reg, seeds, added_seeds, removed_seeds):
+    """
+    clears the same pixels as regrow_after_seed_edit and grows them again with the whole image
+    """
+    edited_seeds, touched = irg.edit_seeds(seeds.copy(), reg, added_seeds, removed_seeds)
+    box, affected = irg.affected_pixels(reg, touched, added_seeds)
+    cleared = reg.astype(np.int64)
+    if box is not None:
+        cleared_box = cleared[box]
+        cleared_box[affected] = edited_seeds[box][affected]
+    return hrg.region_growing(img, cleared)
+
+
+@pytest.mark.parametrize("channels", [None, 2])
+@pytest.mark.parametrize("case", range(5))
+def test_regrowth_matches_growth_of_the_whole_image(case, channels):
+    rng = np.random.default_rng(case)
+    img = smooth_image(case, channels)
+    seeds = random_seeds(case)
+    reg = hrg.region_growing(img, seeds.copy())
+    boxes, statistics = irg.region_boxes(reg), irg.image_statistics(img, reg)
+    for edit in range(4):
+        if edit % 2:
+            seed_pixels = np.argwhere(seeds)
+            added_seeds, removed_seeds = [], [tuple(seed_pixels[rng.integers(len(seed_pixels))])]
+        else:
+            added_seeds, removed_seeds = [tuple(rng.integers(0, size) for size in seeds.shape)], []
+        expected = full_regrowth(img, reg, seeds, added_seeds, removed_seeds)
+        reg, seeds = irg.regrow_after_seed_edit(img, reg, seeds, added_seeds, removed_seeds, 4, boxes, statistics)
+        assert np.array_equal(reg, expected)
+
+
+def test_regrowth_without_kept_boxes_and_statistics():
+    img = smooth_image(0)
+    seeds = random_seeds(0)
+    reg = hrg.region_growing(img, seeds.copy())
+    expected = full_regrowth(img, reg, seeds, [(30, 35)], [])
+    reg, seeds = irg.regrow_after_seed_edit(img, reg, seeds, [(30, 35)])
+    assert np.array_equal(reg, expected)
+    assert seeds[30, 35] == 12
@@ -0,0 +1,39 @@
+import numpy as np
+import pytest
+from Functions import seeded_region_growing as srg
+from Functions import region_merging as rm
+
+
+@pytest.mark.parametrize("max_label, label_type", [(0, np.uint8), (-3, np.uint8), (255, np.uint8), (256, np.uint16),
+                                                   (65535, np.uint16), (65536, np.uint32), (2 ** 32, np.uint64)])
+def test_label_dtype_is_the_smallest_unsigned_type(max_label, label_type):
+    assert srg.label_dtype(max_label) == label_type
+
+
+def test_compact_labels_switches_to_uint16_at_256_regions():
+    reg = np.arange(256).reshape(16, 16)
+    assert srg.compact_labels(reg).dtype == np.uint8
+    reg[0, 0] = 256
+    assert srg.compact_labels(reg).dtype == np.uint16
+    assert np.array_equal(srg.compact_labels(reg), reg)
+    assert srg.compact_labels(np.zeros((0, 3), int)).dtype == np.uint8
+
+
+def test_compact_labels_does_not_copy_compact_labels():
+    reg = np.arange(1, 7, dtype=np.uint8).reshape(2, 3)
+    assert srg.compact_labels(reg) is reg
+
+
+@pytest.mark.parametrize("number_of_regions, label_type", [(255, np.uint8), (256, np.uint16)])
+def test_merging_result_gets_the_type_of_its_number_of_regions(number_of_regions, label_type):
+    # every region has its own intensity and 4 pixels, so nothing is merged
+    reg = np.repeat(np.arange(1, number_of_regions + 1), 4).reshape(-1, 4)
+    img = (reg * 3.).astype(float)
+    merged = rm.region_merging(reg, img, 0.001, 2)
+    assert merged.dtype == label_type
+    assert np.array_equal(merged, reg)
+    merged_into = list(range(number_of_regions))
+    merged_into[0] = 1  # region 1 is merged into region 2, one region less
+    relabeled, kept_regions = rm.relabel_merged_regions(reg, merged_into)
+    assert relabeled.dtype == srg.label_dtype(number_of_regions - 1)
+    assert np.array_equal(kept_regions, np.arange(1, number_of_regions))
@@ -0,0 +1,36 @@
+import bisect
+import random
+import numpy as np
+import pytest
+from Functions import mean_index as mi
+
+
+@pytest.mark.parametrize("block_size", [1, 2, 5, 512])
+def test_nearest_mean_is_the_argmin_over_all_regions(monkeypatch, block_size):
+    monkeypatch.setattr(mi, "MEAN_INDEX_BLOCK_SIZE", block_size)
+    rnd = random.Random(block_size)
+    mean_index, means = [], [np.nan]
+    for _ in range(2000):
+        if rnd.random() < 0.3:
+            means.append(rnd.randint(0, 40))  # equal means are frequent
+            mi.insert_mean(mean_index, means[-1], len(means) - 1)
+        elif len(means) > 1:
+            region = rnd.randrange(1, len(means))
+            mean = rnd.choice([rnd.randint(0, 40), rnd.random() * 40])
+            mi.update_mean(mean_index, means[region], mean, region)
+            means[region] = mean
+        assert [entry for block in mean_index for entry in block] == sorted(zip(means[1:], range(1, len(means))))
+        intensity = rnd.randint(-5, 45)
+        distance, region = mi.nearest_mean(mean_index, intensity)
+        if len(means) == 1:
+            assert (distance, region) == (float("inf"), 0)
+        else:
+            distances = np.abs(intensity - np.asarray(means[1:]))
+            assert (distance, region) == (np.amin(distances), int(np.argmin(distances)) + 1)
+
+
+def test_find_block_is_bisect_over_the_last_entries():
+    mean_index = [[(0, 1), (2, 4)], [(2, 5), (2, 7)], [(3, 2), (5, 3)]]
+    last_entries = [block[-1] for block in mean_index]
+    for entry in [(-1, 0), (0, 1), (2,), (2, 4), (2, 6), (2, 8), (3,), (5, 3), (6,)]:
+        assert mi.find_block(mean_index, entry) == bisect.bisect_left(last_entries, entry)
@@ -0,0 +1,88 @@
+import numpy as np
+import pytest
+from multiprocessing import shared_memory
+from Functions import segmentation as seg
+from Functions import dice_score as ds
+
+
+def cells_image(shape=(40, 45)):
+    rng = np.random.default_rng(3)
+    rows, columns = np.mgrid[:shape[0], :shape[1]]
+    img = rng.normal(20, 2, shape)
+    gt = np.zeros(shape, np.uint8)
+    for cell, (row, column, radius) in enumerate([(12, 12, 7), (27, 30, 9)], 1):
+        inside = (rows - row) ** 2 + (columns - column) ** 2 < radius ** 2
+        img[inside] = rng.normal(160, 2, np.count_nonzero(inside))
+        gt[inside] = cell
+    return np.clip(img, 0, 255).astype(np.uint8), gt
+
+
+def record_shared_blocks(monkeypatch):
+    """
+    records the names of the shared memory blocks created by segmentation.share_array
+    """
+    names = []
+    share_array = seg.share_array
+
+    def recording_share_array(array):
+        block, description = share_array(array)
+        names.append(block.name)
+        return block, description
+    monkeypatch.setattr(seg, "share_array", recording_share_array)
+    return names
+
+
+def test_shared_memory_is_unlinked_after_an_exception(monkeypatch):
+    img, gt = cells_image()
+    names = record_shared_blocks(monkeypatch)
+    with pytest.raises(ValueError):  # start pixel outside of the image
+        seg.multi_start_segmentation(img, gt, 30, 0.1, 20, start_pixels=[(100, 100)], workers=1)
+    assert len(names) == 2
+    for name in names:
+        with pytest.raises(FileNotFoundError):
+            shared_memory.SharedMemory(name=name)
+
+
+def test_best_run_uses_dice_with_and_separation_without_ground_truth():
+    clipped = [np.full((2, 2), run) for run in range(3)]
+    results = [(clipped[0], 0.5, 0.9), (clipped[1], 0.8, 0.1), (clipped[2], 0.8, 0.3)]
+    image_clipped, dice_value, best_key, scores = seg.best_run(["a", "b", "c"], results, True)
+    assert (best_key, dice_value, scores) == ("b", 0.8, {"a": 0.5, "b": 0.8, "c": 0.8})  # first of equal scores
+    assert image_clipped is clipped[1]
+    image_clipped, _, best_key, scores = seg.best_run(["a", "b", "c"], results, False)
+    assert (best_key, scores) == ("a", {"a": 0.9, "b": 0.1, "c": 0.3})
+    assert image_clipped is clipped[0]
+
+
+def test_multi_start_segmentation_removes_duplicate_start_pixels(monkeypatch):
+    img, gt = cells_image()
+    names = record_shared_blocks(monkeypatch)
+    start_pixels = [(0, 0), (np.int64(0), np.int64(0)), [39, 44], (39, 44), (0, 0)]
+    image_clipped, dice_value, best_start_pixel, scores = seg.multi_start_segmentation(img, gt, 30, 0.1, 20,
+                                                                                       start_pixels, workers=1)
+    assert list(scores) == [(0, 0), (39, 44)]
+    assert dice_value == scores[best_start_pixel] == max(scores.values())
+    assert image_clipped.shape == img.shape
+    expected_clipped, expected_dice = seg.unseeded_segmentation(img, gt, best_start_pixel, 30, 0.1, 20)
+    assert np.array_equal(image_clipped, expected_clipped) and dice_value == expected_dice
+    _, dice_value, best_start_pixel, scores = seg.multi_start_segmentation(img, None, 30, 0.1, 20, start_pixels,
+                                                                           workers=1)
+    assert dice_value is None
+    assert scores[best_start_pixel] == max(scores.values())
+    assert scores[(0, 0)] == ds.separation_score(img, seg.unseeded_segmentation(img, None, (0, 0), 30, 0.1, 20)[0])
+    for name in names:  # also removed after a successful run
+        with pytest.raises(FileNotFoundError):
+            shared_memory.SharedMemory(name=name)
+
+
+def test_threshold_sweep_removes_duplicate_thresholds():
+    img, gt = cells_image()
+    image_clipped, dice_value, best_threshold, scores = seg.threshold_sweep(img, gt, [30, 60, 30, 60.0, 10], 0.1,
+                                                                            20, workers=1)
+    assert list(scores) == [30, 60, 10]
+    assert dice_value == scores[best_threshold] == max(scores.values())
+    for threshold, dice_value in scores.items():
+        assert dice_value == seg.unseeded_segmentation(img, gt, (0, 0), threshold, 0.1, 20)[1]
+    _, dice_value, best_threshold, scores = seg.threshold_sweep(img, None, [30, 10], 0.1, 20, workers=1)
+    assert dice_value is None and list(scores) == [30, 10]
+    assert scores[best_threshold] == max(scores.values())
@@ -0,0 +1,216 @@
+import heapq
+import numpy as np
+import pytest
+from Functions import region_merging as rm
+from Functions import seeded_region_growing as srg
+
+
+def striped_regions(shape=(30, 40)):
+    """
+    random image with regions of three pixels in a row, every region has its own number
+    """
+    rng = np.random.default_rng(0)
+    img = rng.integers(0, 255, shape).astype(np.uint8)
+    reg = np.arange(np.prod(shape)).reshape(shape) // 3 + 1
+    return img, reg
+
+
+@pytest.mark.parametrize("label_type", [np.float32, np.float64])
+def test_float_region_numbers_are_merged_like_integers(label_type):
+    img, reg = striped_regions()
+    merged = rm.region_merging(reg.copy(), img, 0.1, 5)
+    float_merged = rm.region_merging(reg.astype(label_type), img, 0.1, 5)
+    assert float_merged.dtype == merged.dtype
+    assert np.array_equal(float_merged, merged)
+    assert np.array_equal(rm.distance_merging_while(reg.astype(label_type), 0.1, img, backend="numpy")[0],
+                          rm.distance_merging_while(reg, 0.1, img, backend="numpy")[0])
+
+
+def random_pixel_regions(seed, shape=(20, 25)):
+    """
+    random image in which every pixel is a region
+    """
+    img = np.random.default_rng(seed).integers(0, 256, shape).astype(np.uint8)
+    return img, np.arange(1, img.size + 1).reshape(shape)
+
+
+@pytest.mark.parametrize("connectivity", [4, 8])
+@pytest.mark.parametrize("case", range(3))
+def test_cut_tree_gives_the_result_of_merging_again(case, connectivity):
+    img, reg = random_pixel_regions(case)
+    merge_pairs, merge_distances, _ = rm.distance_merging_tree(reg, img, connectivity=connectivity, backend="numpy")
+    # thresholds between and exactly at the recorded distances
+    thresholds = np.concatenate((np.quantile(merge_distances, [0, 0.1, 0.3, 0.5, 0.9]), merge_distances[::97], [0.]))
+    for threshold in thresholds.tolist():
+        cut_reg, cut_neighbors, cut_means = rm.cut_merging_tree(reg, img, merge_pairs, merge_distances, threshold,
+                                                                connectivity)
+        merged_reg, merged_neighbors, merged_means = rm.distance_merging_while(reg, threshold, img, connectivity,
+                                                                               backend="numpy")
+        assert np.array_equal(cut_reg, merged_reg)
+        assert cut_neighbors == merged_neighbors
+        assert np.allclose(cut_means, merged_means)
+        # the merges before the largest recorded distance reaches the threshold are taken
+        assert np.amax(cut_reg) == reg.size - np.count_nonzero(np.maximum.accumulate(merge_distances) < threshold)
+
+
+@pytest.mark.parametrize("case", range(3))
+def test_tree_sizes_grow_along_the_merges(case):
+    img, reg = random_pixel_regions(case)
+    merge_pairs, merge_distances, merge_sizes = rm.distance_merging_tree(reg, img, backend="numpy")
+    assert np.all(merge_distances > 0) and np.all(np.isfinite(merge_distances))
+    sizes = np.ones(reg.size, int)  # size of the region every region belongs to, by its region number -1
+    merged = np.zeros(reg.size, bool)
+    for (region1, region2), size in zip(merge_pairs.tolist(), merge_sizes.tolist()):
+        assert not merged[region1] and not merged[region2]
+        assert size == sizes[region1] + sizes[region2] > max(sizes[region1], sizes[region2])
+        sizes[region1], merged[region2] = size, True
+    assert merge_sizes[-1] == reg.size  # without threshold everything ends in one region
+
+
+def brute_force_adjacency(reg, connectivity):
+    """
+    counts the touching pixel pairs of different regions pixel by pixel, every pair of pixels once
+    """
+    steps = [(0, 1), (1, 0)] + ([(1, 1), (1, -1)] if connectivity == 8 else [])
+    boundary_lengths = {}
+    for row, column in np.ndindex(reg.shape):
+        for row_step, column_step in steps:
+            neighbor_row, neighbor_column = row + row_step, column + column_step
+            if 0 <= neighbor_row < reg.shape[0] and 0 <= neighbor_column < reg.shape[1]:
+                region, neighbor = int(reg[row, column]), int(reg[neighbor_row, neighbor_column])
+                if region != neighbor and region != 0 and neighbor != 0:
+                    pair = (min(region, neighbor) - 1, max(region, neighbor) - 1)
+                    boundary_lengths[pair] = boundary_lengths.get(pair, 0) + 1
+    return boundary_lengths
+
+
+HAND_BUILT_REGIONS = np.array([[1, 1, 2, 2],
+                               [1, 0, 2, 3],
+                               [4, 4, 3, 3],
+                               [4, 5, 5, 3]])
+
+
+@pytest.mark.parametrize("connectivity, boundary_lengths", [
+    (4, {(0, 1): 1, (0, 3): 1, (1, 2): 3, (2, 3): 1, (2, 4): 2, (3, 4): 2}),
+    # the diagonals add the regions 2 and 4 as pair and longer boundaries to the pairs of connectivity 4
+    (8, {(0, 1): 2, (0, 3): 2, (1, 2): 5, (1, 3): 1, (2, 3): 1, (2, 4): 4, (3, 4): 4})])
+def test_adjacency_of_hand_built_regions(connectivity, boundary_lengths):
+    first_regions, second_regions, lengths = rm.region_adjacency(HAND_BUILT_REGIONS, connectivity)
+    assert dict(zip(zip(first_regions.tolist(), second_regions.tolist()), lengths.tolist())) == boundary_lengths
+    assert boundary_lengths == brute_force_adjacency(HAND_BUILT_REGIONS, connectivity)
+    neighbors = rm.find_neighboring_regions(HAND_BUILT_REGIONS, connectivity)
+    assert neighbors[4] == {region for pair in boundary_lengths if 4 in pair for region in pair} - {4}
+
+
+@pytest.mark.parametrize("connectivity", [4, 8])
+@pytest.mark.parametrize("case", range(3))
+def test_adjacency_matches_brute_force(case, connectivity):
+    reg = np.random.default_rng(case).integers(0, 8, (12, 15))  # with pixels without region
+    first_regions, second_regions, lengths = rm.region_adjacency(reg, connectivity)
+    assert list(zip(first_regions.tolist(), second_regions.tolist())) == sorted(zip(first_regions.tolist(),
+                                                                                    second_regions.tolist()))
+    assert dict(zip(zip(first_regions.tolist(), second_regions.tolist()), lengths.tolist())) == \
+        brute_force_adjacency(reg, connectivity)
+
+
+def argmin_pair(inter_region_distances):
+    """
+    first pair with the smallest distance in the order of a scan over the rows of a distance matrix,
+    like the merging before the merge queue
+    """
+    pairs = [pair for pair, distance in inter_region_distances.items() if distance == distance]
+    if not pairs:
+        return np.inf, None
+    distance, pair = min((inter_region_distances[pair], pair) for pair in pairs)
+    return distance, pair
+
+
+def test_merge_queue_pops_ties_in_the_order_of_the_scan():
+    inter_region_distances = {(3, 4): 0.5, (0, 2): 0.25, (1, 2): 0.25, (0, 1): 0.25, (2, 3): np.nan, (2, 4): 0.5}
+    queue = rm.merge_queue(inter_region_distances)
+    while inter_region_distances:
+        popped = rm.pop_minimal_distance(queue, inter_region_distances)
+        assert popped == argmin_pair(inter_region_distances)
+        if popped[1] is None:
+            break
+        del inter_region_distances[popped[1]]
+    assert rm.pop_minimal_distance(queue, {}) == (np.inf, None)
+
+
+def test_merge_queue_skips_changed_and_removed_pairs():
+    inter_region_distances = {(0, 1): 0.1, (0, 2): 0.2, (1, 2): 0.3, (2, 3): 0.4}
+    queue = rm.merge_queue(inter_region_distances)
+    del inter_region_distances[(0, 1)]  # removed by a merge
+    inter_region_distances[(0, 2)] = 0.35  # changed by a merge, pushed again like update_distances does
+    heapq.heappush(queue, (0.35, 0, 2))
+    assert rm.pop_minimal_distance(queue, inter_region_distances) == (0.3, (1, 2))
+    del inter_region_distances[(1, 2)]
+    assert rm.pop_minimal_distance(queue, inter_region_distances) == (0.35, (0, 2))
+    del inter_region_distances[(0, 2)]
+    assert rm.pop_minimal_distance(queue, inter_region_distances) == (0.4, (2, 3))
+
+
+def test_size_queue_pops_ties_and_skips_stale_sizes():
+    region_sizes = np.array([3., np.nan, 1., 1., 2., 1.])
+    queue = rm.size_queue(region_sizes)
+    assert rm.pop_smallest_region(queue, region_sizes) == (1., 2)  # smallest region number of the equal sizes
+    region_sizes = rm.update_region_sizes(region_sizes, 2, 3)  # region 3 has size 2 now, region 2 is empty
+    heapq.heappush(queue, (region_sizes[3], 3))
+    # the entry (1., 3) is stale, the smallest region is region 5 like np.where(sizes == np.nanmin(sizes))[0][0]
+    assert rm.pop_smallest_region(queue, region_sizes) == (1., 5)
+    assert rm.pop_smallest_region(queue, region_sizes) == (2., 3)
+    assert rm.pop_smallest_region(queue, region_sizes) == (2., 4)
+    assert rm.pop_smallest_region(queue, region_sizes) == (3., 0)
+    assert rm.pop_smallest_region(queue, region_sizes) == (np.inf, None)
+
+
+def scan_distance_merging(reg, threshold, img):
+    """
+    merging by similarity that searches the smallest distance in all pairs after every merge
+    """
+    inter_region_distances, means, inter_region_neighbors = rm.region_distance(img, reg)
+    region_sums, region_counts = srg.region_statistics(img, reg)
+    region_sums, region_counts = region_sums[1:], region_counts[1:]
+    maximal_intensity = srg.maximal_intensity(img, reg)
+    merged_pairs = []
+    min_distance, pair = argmin_pair(inter_region_distances)
+    while min_distance < threshold:
+        merged_pairs.append(pair)
+        inter_region_neighbors = rm.update_neighboring_regions(inter_region_neighbors, *pair)
+        means = rm.update_mean_values(means, pair[0], pair[1], region_sums, region_counts)
+        inter_region_distances = rm.update_distances(pair[0], pair[1], inter_region_distances, means,
+                                                     maximal_intensity, inter_region_neighbors)
+        min_distance, pair = argmin_pair(inter_region_distances)
+    return merged_pairs
+
+
+@pytest.mark.parametrize("case", range(3))
+def test_merge_queue_merges_in_the_order_of_the_scan(case):
+    img = np.random.default_rng(case).integers(0, 8, (12, 15)).astype(np.uint8)  # many equal distances
+    reg = np.arange(1, img.size + 1).reshape(img.shape)
+    merge_tree = []
+    rm.distance_merging_while(reg, 0.5, img, backend="numpy", merge_tree=merge_tree)
+    assert [merge[:2] for merge in merge_tree] == scan_distance_merging(reg, 0.5, img)
+
+
+@pytest.mark.parametrize("channels", [None, 2])
+def test_small_region_is_merged_into_a_neighbor(channels):
+    img = np.full((5, 6), 250.)
+    img[:, :2] = 100.
+    img[2, 4] = 0.  # a dark pixel in the bright region, every distance to it is maximal
+    reg = np.ones((5, 6), int)
+    reg[:, 2:] = 2
+    reg[2, 4] = 3
+    if channels is not None:
+        img = np.repeat(img[..., np.newaxis], channels, -1)
+    inter_region_neighbors = rm.find_neighboring_regions(reg)
+    means = srg.mean_region(img, reg)
+    assert rm.find_most_similar_region(means, 2, inter_region_neighbors, img) == 1
+    merged = rm.region_merging_size(img, reg, inter_region_neighbors, means, 2)
+    assert np.array_equal(merged, np.where(reg == 3, 2, reg))
+
+
+def test_region_without_neighbors_is_not_merged_into_itself():
+    means = [10., 20., 30.]
+    assert rm.find_most_similar_region(means, 0, [set(), set(), set()], np.array([[30.]])) == 1
+    assert rm.find_most_similar_region(means, 2, [set(), set(), set()], np.array([[30.]])) == 0
@@ -0,0 +1,32 @@
+import numpy as np
+from Functions import segmentation as seg
+from Functions import dice_score as ds
+
+
+def cells_image(channels, shape=(60, 70)):
+    """
+    cells that are bright in different channels
+    """
+    rng = np.random.default_rng(2)
+    rows, columns = np.mgrid[:shape[0], :shape[1]]
+    img = rng.normal(20, 2, shape + (channels,))
+    gt = np.zeros(shape, np.uint8)
+    for cell, (row, column, radius) in enumerate([(18, 20, 9), (40, 48, 12)], 1):
+        inside = (rows - row) ** 2 + (columns - column) ** 2 < radius ** 2
+        img[inside, (cell - 1) % channels] += 150
+        gt[inside] = cell
+    return np.clip(img, 0, 255).astype(np.uint8), gt
+
+
+def test_several_channels_run_through_the_pipeline():
+    img, gt = cells_image(3)
+    image_clipped, dice_value = seg.seeded_segmentation(img, gt, 0.1, 0.1, 20)
+    assert image_clipped.shape == gt.shape
+    assert dice_value > 0.9
+
+
+def test_several_channels_warm_start():
+    img, gt = cells_image(2)
+    _, _, labels = seg.warm_start_segmentation(img, gt, gt + 1, 0.1, 0.1, 20)
+    assert labels.shape == gt.shape
+    assert ds.dice_score(labels, gt) > 0.9
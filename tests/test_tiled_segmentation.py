@@ -0,0 +1,63 @@
+import numpy as np
+from Functions import tiled_segmentation as ts
+
+
+def cells_image(shape=(80, 90)):
+    rng = np.random.default_rng(0)
+    rows, columns = np.mgrid[:shape[0], :shape[1]]
+    img = rng.normal(10, 2, shape)
+    gt = np.zeros(shape, np.uint16)
+    for cell, (row, column, radius) in enumerate([(20, 20, 9), (40, 45, 12), (60, 70, 8)], 1):
+        inside = (rows - row) ** 2 + (columns - column) ** 2 < radius ** 2
+        img[inside] = rng.normal(150, 3, np.count_nonzero(inside))
+        gt[inside] = cell
+    return np.clip(img, 0, 255).astype(np.uint8), gt
+
+
+def test_segmentation_without_ground_truth():
+    img, gt = cells_image()
+    image_clipped, dice_value = ts.tiled_seeded_segmentation(img, None, 0.1, 0.1, 20, tile_size=40, halo=8, workers=2)
+    assert dice_value is None
+    assert image_clipped.shape == img.shape
+    assert ts.tiled_seeded_segmentation(img, gt, 0.1, 0.1, 20, tile_size=40, halo=8, workers=2)[1] > 0.95
+
+
+def test_tiled_region_growing_labels_every_pixel():
+    img, _ = cells_image()
+    reg = ts.tiled_region_growing(img, 0.1, tile_size=40, halo=8, workers=2)
+    assert np.all(reg != 0)
+    assert np.array_equal(np.unique(reg), np.arange(1, int(np.amax(reg)) + 1))
+
+
+def test_tiles_without_seeds_are_filled_from_their_windows(monkeypatch):
+    img, _ = cells_image()
+    img[30:, 30:] = 10  # constant, the tiles whose window lies in it have no seeds
+    stitched, windows = [], []
+    stitch_tiles, fill_window = ts.stitch_tiles, ts.fill_window
+
+    def recording_stitch_tiles(*arguments):
+        stitched.append(stitch_tiles(*arguments))
+        return stitched[-1].copy()
+
+    def recording_fill_window(*arguments):
+        windows.append(fill_window(*arguments))
+        return windows[-1]
+    monkeypatch.setattr(ts, "stitch_tiles", recording_stitch_tiles)
+    monkeypatch.setattr(ts, "fill_window", recording_fill_window)
+    reg = ts.tiled_region_growing(img, 0.1, tile_size=20, halo=4, workers=2)
+    assert not np.all(stitched[0]) and windows
+    for window in windows:  # only windows around the tiles without seeds are grown, not the whole image
+        assert any(axis_slice.stop - axis_slice.start < size for axis_slice, size in zip(window, img.shape))
+        assert np.any(stitched[0][window])
+    assert np.all(reg != 0)
+    assert np.array_equal(reg[stitched[0] != 0], stitched[0][stitched[0] != 0])
+    assert np.array_equal(np.unique(reg), np.arange(1, int(np.amax(stitched[0])) + 1))
+
+
+def test_fill_window_grows_its_halo_until_it_contains_a_region():
+    reg = np.zeros((50, 50), np.uint8)
+    reg[0, 0] = 1
+    window = ts.fill_window(reg, (slice(30, 40), slice(30, 40)), 4)
+    assert window == (slice(0, 50), slice(0, 50))
+    reg[25, 35] = 2
+    assert ts.fill_window(reg, (slice(30, 40), slice(30, 40)), 4) == (slice(22, 48), slice(22, 48))
@@ -0,0 +1,64 @@
+import numpy as np
+from Functions import segmentation as sg
+from Functions import seed_detection as sd
+
+
+def moving_cells(frame, shape=(96, 96), step=5):
+    """
+    frame of a synthetic time-lapse sequence: bright cells that move by step pixels per frame on a dark background
+    """
+    rng = np.random.default_rng(frame)
+    rows, columns = np.mgrid[:shape[0], :shape[1]]
+    img = rng.normal(10, 2, shape)
+    gt = np.zeros(shape, np.uint16)
+    for cell, (row, column, radius, intensity) in enumerate([(25, 20, 9, 150), (65, 25, 11, 200), (30, 60, 8, 120),
+                                                            (70, 65, 10, 180)], 1):
+        inside = (rows - row - step * frame) ** 2 + (columns - column) ** 2 < radius ** 2
+        img[inside] = rng.normal(intensity, 3, np.count_nonzero(inside))
+        gt[inside] = cell
+    return np.clip(img, 0, 255).astype(np.uint8), gt
+
+
+def segment_sequence(frames, detect_seeds):
+    img, gt = moving_cells(0)
+    _, dice_value, labels = sg.segmentation_from_seeds(img, gt, sd.seed_merging(sd.seeds(img, 0.1)), 0.1, 20)
+    dice_values = [dice_value]
+    for frame in range(1, frames):
+        img, gt = moving_cells(frame)
+        _, dice_value, labels = sg.warm_start_segmentation(img, gt, labels, 0.1, 0.1, 20, detect_seeds=detect_seeds)
+        dice_values.append(dice_value)
+    return dice_values
+
+
+def test_dice_stays_stable_over_the_frames():
+    dice_values = segment_sequence(5, detect_seeds=True)
+    assert dice_values[0] > 0.95
+    assert min(dice_values) > dice_values[0] - 0.02
+
+
+def test_cells_keep_their_region_numbers():
+    img, gt = moving_cells(0)
+    _, _, labels = sg.segmentation_from_seeds(img, gt, sd.seed_merging(sd.seeds(img, 0.1)), 0.1, 20)
+    next_img, _ = moving_cells(1)
+    _, _, next_labels = sg.warm_start_segmentation(next_img, None, labels, 0.1, 0.1, 20)
+    for row, column in [(27, 20), (67, 25), (32, 60), (72, 65)]:  # centers of the cells in both frames
+        assert next_labels[row, column] == labels[row, column] != 0
+
+
+def test_seeds_are_detected_again_only_after_drift(monkeypatch):
+    dice_values = segment_sequence(5, detect_seeds=None)  # cells move further than the erosion
+    assert min(dice_values) > dice_values[0] - 0.02
+    detections = []
+    seeds = sd.seeds
+
+    def counted_seeds(img, threshold):
+        detections.append(threshold)
+        return seeds(img, threshold)
+    monkeypatch.setattr(sd, "seeds", counted_seeds)
+    img, gt = moving_cells(0, step=1)
+    _, _, labels = sg.segmentation_from_seeds(img, gt, sd.seed_merging(sd.seeds(img, 0.1)), 0.1, 20)
+    for frame in range(1, 4):  # cells that move less than the erosion keep their seeds
+        img, gt = moving_cells(frame, step=1)
+        _, dice_value, labels = sg.warm_start_segmentation(img, gt, labels, 0.1, 0.1, 20)
+        assert dice_value > 0.95
+    assert len(detections) == 1  # only the first frame